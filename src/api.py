@@ -0,0 +1,273 @@
+import json
+import asyncio
+import logging
+import threading
+import time
+import functools
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+from core import METRICS, log_context
+
+API_REQUESTS = METRICS.counter("api_requests_total", "本地 API 请求数")
+API_ERRORS = METRICS.counter("api_errors_total", "本地 API 返回错误的请求数")
+
+# ==========================================
+# 本地 HTTP/JSON 接口
+# ==========================================
+class ApiError(Exception):
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra # 附加到错误回复中的字段
+
+
+class ApiServer(threading.Thread):
+    """可选的本地 HTTP/JSON 接口，只监听 127.0.0.1，运行在独立线程的 asyncio 事件循环中
+
+      GET  /health               运行状态
+      GET  /tasks                全部任务
+      GET  /tasks/next-due?limit=N   最近到期的任务（由调度线程计算，不阻塞事件循环）
+      POST /tasks/batch          {"upsert": [任务...], "delete": [id...]}，全部校验通过后在一个事务中写入
+      GET  /events               触发提醒的 SSE 推送流
+      GET  /metrics              运行指标（Prometheus 文本格式）
+
+    只接受 Host 为 127.0.0.1:端口 或 localhost:端口 的请求：DNS 重绑定后的网页与接口"同源"，
+    CORS 拦不住它，但它发出的请求 Host 仍是攻击者的域名。
+
+    所有客户端共用一个事件循环，慢速的 SSE 客户端只会丢弃自己队列中最旧的事件，
+    调度线程只做一次 call_soon_threadsafe，永远不会被 API 阻塞。
+    """
+    MAX_BODY = 4 * 1024 * 1024
+    MAX_HEADERS = 100
+    READ_TIMEOUT = 10.0
+    EVENT_BACKLOG = 256 # 每个 SSE 客户端最多缓存的事件数
+    KEEPALIVE = 15.0
+
+    def __init__(self, engine, port, host="127.0.0.1"):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.stopping = None
+        self.streams = set() # 每个 SSE 客户端一个 asyncio.Queue
+        self.dropped_events = 0
+        self.ready = threading.Event()
+
+    def start(self):
+        super().start()
+        self.ready.wait(5.0)
+        return self
+
+    def stop(self):
+        loop = self.loop
+        if loop is not None and self.stopping is not None:
+            try:
+                loop.call_soon_threadsafe(self.stopping.set)
+            except RuntimeError:
+                pass # 事件循环已经结束
+        self.join(timeout=2.0)
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            with log_context(phase="api"):
+                self.loop.run_until_complete(self._serve())
+        except Exception as e:
+            logging.error(f"本地 API 启动失败: {e}")
+        finally:
+            self.ready.set()
+            self.loop.close()
+
+    async def _serve(self):
+        self.stopping = asyncio.Event()
+        server = await asyncio.start_server(self.handle_client, self.host, self.port, backlog=512)
+        self.port = server.sockets[0].getsockname()[1] # 端口为 0 时取系统分配的端口
+        self.engine.subscribe(self.on_engine_event)
+        self.ready.set()
+
+        await self.stopping.wait()
+        server.close()
+        for stream in self.streams:
+            self._put(stream, None)
+        # 让正在处理的请求和 SSE 连接自行结束，超时仍未结束的再取消
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        if pending:
+            _, pending = await asyncio.wait(pending, timeout=1.0)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    # ---------- 触发事件推送 ----------
+    def on_engine_event(self, event, payload):
+        # 在调度线程中调用：只把事件交给事件循环，立即返回
+        if event != "fired" or self.loop is None:
+            return
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        try:
+            self.loop.call_soon_threadsafe(self._broadcast, data)
+        except RuntimeError:
+            pass # 事件循环已经结束
+
+    def _broadcast(self, data):
+        for stream in self.streams:
+            self._put(stream, data)
+
+    def _put(self, stream, data):
+        if stream.full():
+            stream.get_nowait() # 客户端太慢：丢弃最旧的事件
+            self.dropped_events += 1
+        stream.put_nowait(data)
+
+    async def stream_events(self, writer):
+        stream = asyncio.Queue(self.EVENT_BACKLOG)
+        self.streams.add(stream)
+        try:
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/event-stream; charset=utf-8\r\n"
+                b"Cache-Control: no-cache\r\n"
+                b"Connection: close\r\n\r\n"
+            )
+            await writer.drain()
+            while True:
+                try:
+                    data = await asyncio.wait_for(stream.get(), self.KEEPALIVE)
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                else:
+                    if data is None:
+                        break
+                    writer.write(b"event: fired\ndata: " + data + b"\n\n")
+                await writer.drain()
+        finally:
+            self.streams.discard(stream)
+
+    # ---------- 请求处理 ----------
+    async def handle_client(self, reader, writer):
+        try:
+            try:
+                method, target, headers, body = await asyncio.wait_for(
+                    self.read_request(reader), self.READ_TIMEOUT
+                )
+                API_REQUESTS.inc()
+                self.check_host(headers)
+                url = urlsplit(target)
+                if method == "GET" and url.path == "/events":
+                    await self.stream_events(writer)
+                    return
+                if method == "GET" and url.path == "/metrics":
+                    self.send(writer, HTTPStatus.OK, METRICS.render().encode("utf-8"),
+                              "text/plain; version=0.0.4; charset=utf-8")
+                    await writer.drain()
+                    return
+                status, reply = HTTPStatus.OK, await self.route(method, url, headers, body)
+            except ApiError as e:
+                API_ERRORS.inc()
+                status, reply = e.status, dict(e.extra, ok=False, error=str(e))
+            self.send_json(writer, status, reply)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass # 客户端超时或断开
+        except Exception as e:
+            logging.error(f"处理 API 请求失败: {e}")
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        try:
+            method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "请求行格式错误")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= self.MAX_HEADERS:
+                raise ApiError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "请求头过多")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Content-Length 格式错误")
+        if length > self.MAX_BODY:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "请求体过大")
+        body = await reader.readexactly(length) if length > 0 else b""
+        return method.upper(), target, headers, body
+
+    def check_host(self, headers):
+        host = headers.get("host", "").lower()
+        if host not in (f"127.0.0.1:{self.port}", f"localhost:{self.port}"):
+            raise ApiError(HTTPStatus.MISDIRECTED_REQUEST, f"不接受的 Host: {host or '(空)'}")
+
+    async def route(self, method, url, headers, body):
+        if method == "GET" and url.path == "/health":
+            return {"ok": True, "tasks": len(self.engine.tasks), "streams": len(self.streams),
+                    "dropped_events": self.dropped_events}
+        if method == "GET" and url.path == "/tasks":
+            # 任务快照不可变，直接读取，不需要加锁
+            return {"ok": True, "tasks": self.engine.tasks.to_dicts()}
+        if method == "GET" and url.path == "/tasks/next-due":
+            return await self.next_due(parse_qs(url.query))
+        if method == "POST" and url.path == "/tasks/batch":
+            # 要求 JSON 类型：其他网站的网页无法在不经过 CORS 预检的情况下发出这类请求
+            # （DNS 重绑定绕过同源限制的情况由 check_host 拦截）
+            if not headers.get("content-type", "").startswith("application/json"):
+                raise ApiError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "请求体必须是 application/json")
+            return await self.apply_batch(body)
+        raise ApiError(HTTPStatus.NOT_FOUND, f"未知接口: {method} {url.path}")
+
+    async def next_due(self, query):
+        try:
+            limit = max(1, min(int(query.get("limit", ["10"])[0]), 1000))
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "limit 必须是整数")
+        future = asyncio.wrap_future(self.engine.next_due(limit))
+        try:
+            result = await asyncio.wait_for(future, 5.0)
+        except asyncio.TimeoutError:
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "调度线程没有响应")
+        now = time.time()
+        return {"ok": True, "tasks": [
+            dict(task, next_due=due, due_in=round(max(0.0, due - now), 3)) for due, task in result
+        ]}
+
+    async def apply_batch(self, body):
+        try:
+            request = json.loads(body.decode("utf-8"))
+            upserts = request.get("upsert", [])
+            deletes = request.get("delete", [])
+            if not isinstance(upserts, list) or not isinstance(deletes, list):
+                raise ValueError("upsert 和 delete 必须是数组")
+        except (ValueError, AttributeError) as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"请求体格式错误: {e}")
+        # 校验与保存（含等待落盘）放到线程池，不阻塞事件循环
+        apply = functools.partial(self.engine.apply_batch, upserts, deletes, flush=True)
+        try:
+            tasks, deleted, persisted = await asyncio.get_running_loop().run_in_executor(None, apply)
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+        result = {"upserted": [t["id"] for t in tasks], "deleted": deleted}
+        if not persisted:
+            # 改动已生效并留在保存队列中，但没能确认写入磁盘（例如数据库被锁），客户端可以原样重试
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "任务已更新，但写入磁盘失败，将在后台重试",
+                           persisted=False, **result)
+        return dict(result, ok=True, persisted=True)
+
+    @staticmethod
+    def send_json(writer, status, reply):
+        body = json.dumps(reply, ensure_ascii=False).encode("utf-8")
+        ApiServer.send(writer, status, body, "application/json; charset=utf-8")
+
+    @staticmethod
+    def send(writer, status, body, content_type):
+        status = HTTPStatus(status)
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + body
+        )
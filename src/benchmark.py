@@ -0,0 +1,385 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import argparse
+import platform
+import tempfile
+
+from core import MemoryNotifier, NotificationDispatcher, Notifier, SchedulerStateLog, TaskScheduler
+
+# ==========================================
+# 调度器基准测试（虚拟时钟 + 假通知后端）
+# ==========================================
+# 用法：python benchmark.py [--sizes 10,1000,10000,100000] [--hours 24] [--output result.json]
+#       python benchmark.py --compare old.json new.json
+#       python benchmark.py --storm 1000 [--window 2] [--rate 20] [--burst 5] [--stagger 600]
+# 调度器不启动线程，由这里按虚拟时钟直接驱动：事件模式下每次跳到下一个到期时间（与真实的
+# 阻塞等待一致），tick 模式下按固定步长推进（模拟旧版每秒轮询）。
+# 结果以 JSON 输出，便于不同版本之间对比。
+# --storm 模式让大量同间隔、同相位的任务同时到期，经真实的派发线程池发给慢速的假通知后端，
+# 测量合并、限流和错开相位之后实际弹出的通知数、调度线程被占用的时间和全部送达的耗时。
+
+DEFAULT_SIZES = (10, 1000, 10000, 100000)
+INTERVALS = (15, 30, 45, 60, 90, 120, 180, 240, 480, 1440) # 分钟，模拟真实的提醒间隔分布
+START_TIME = 1_700_000_000.0
+
+
+class VirtualClock:
+    def __init__(self, start=START_TIME):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance_to(self, t):
+        self.now = max(self.now, t)
+
+
+class CountingNotifier(Notifier):
+    """假通知后端：只计数"""
+    def __init__(self):
+        self.count = 0
+
+    def notify(self, title, content):
+        self.count += 1
+
+
+class InlineDispatcher:
+    """同步派发：直接在驱动线程中调用通知后端，同时统计触发精度和派发延迟
+
+    漂移 = 实际触发的虚拟时间 - 理想网格时间（首次到期 + k * 间隔），
+    派发延迟 = 本轮唤醒开始到该任务交给通知后端的真实耗时。
+    """
+    def __init__(self, notifier, clock, grid):
+        self.notifier = notifier
+        self.clock = clock
+        self.grid = grid # task_id -> [首次到期时间, 间隔秒数, 已触发次数]
+        self.tick_started = 0.0
+        self.lags = []
+        self.max_drift = 0.0
+        self.total_drift = 0.0
+        self.fired = 0
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def submit(self, task):
+        self.lags.append(time.perf_counter() - self.tick_started)
+        for task_id in task.get("group") or (task["id"],): # 汇总通知逐个统计其中的任务
+            slot = self.grid[task_id]
+            drift = self.clock() - (slot[0] + slot[2] * slot[1])
+            slot[2] += 1
+            self.fired += 1
+            self.total_drift += drift
+            if drift > self.max_drift:
+                self.max_drift = drift
+        self.notifier.notify(task["title"], task["content"])
+        return True
+
+
+class PhaseStateLog:
+    """把每个任务的“上次触发时间”随机错开，避免所有任务在同一时刻到期
+
+    实现调度器需要的状态日志接口；inner 不为空时同时写入真实的状态日志以测量持久化开销。
+    """
+    def __init__(self, phases, inner=None):
+        self.phases = phases
+        self.inner = inner
+
+    def load(self):
+        if self.inner is not None:
+            self.inner.load()
+        return dict(self.phases)
+
+    def record(self, task_id, t, next_due=None):
+        if self.inner is not None:
+            self.inner.record(task_id, t, next_due)
+
+    def forget(self, task_id):
+        if self.inner is not None:
+            self.inner.forget(task_id)
+
+    def close(self):
+        if self.inner is not None:
+            self.inner.close()
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+def make_tasks(n, rng):
+    return [
+        {"id": str(i), "title": f"任务 {i}", "content": "时间到了！", "interval": float(rng.choice(INTERVALS))}
+        for i in range(n)
+    ]
+
+def run_case(n, hours=24.0, tick=None, seed=42, state_dir=None, window=0.0):
+    """对 n 个任务模拟 hours 小时，返回一个结果字典（耗时单位为微秒）"""
+    rng = random.Random(seed)
+    tasks = make_tasks(n, rng)
+    clock = VirtualClock()
+    # 每个任务的上次触发时间随机落在过去一个间隔内
+    phases = {t["id"]: START_TIME - rng.random() * t["interval"] * 60 for t in tasks}
+    grid = {t["id"]: [phases[t["id"]] + t["interval"] * 60, t["interval"] * 60, 0] for t in tasks}
+
+    inner = None
+    if state_dir is not None:
+        inner = SchedulerStateLog(os.path.join(state_dir, f"bench_state_{n}.log"))
+    notifier = CountingNotifier()
+    dispatcher = InlineDispatcher(notifier, clock, grid)
+    scheduler = TaskScheduler(queue.Queue(), dispatcher=dispatcher,
+                              state_log=PhaseStateLog(phases, inner), clock=clock, monotonic=clock,
+                              coalesce_window=window)
+
+    started = time.perf_counter()
+    scheduler.handle_message({"type": "replace", "tasks": tasks})
+    arm_us = (time.perf_counter() - started) * 1e6
+
+    # 空闲唤醒：只查看堆顶
+    idle = []
+    for _ in range(1000):
+        started = time.perf_counter()
+        scheduler.schedule.peek_due()
+        scheduler.fire_due(clock())
+        idle.append((time.perf_counter() - started) * 1e6)
+
+    # 模拟 hours 小时
+    end = START_TIME + hours * 3600
+    ticks = [] # 有触发的唤醒耗时
+    tick_count = 0
+    wall_started = time.perf_counter()
+    while True:
+        if tick is None:
+            due = scheduler.schedule.peek_due()
+            if due is None or due > end:
+                break
+            clock.advance_to(due)
+        else:
+            if clock() + tick > end:
+                break
+            clock.advance_to(clock() + tick)
+        dispatcher.tick_started = started = time.perf_counter()
+        fired = scheduler.fire_due(clock())
+        elapsed = (time.perf_counter() - started) * 1e6
+        tick_count += 1
+        if fired:
+            ticks.append(elapsed)
+    wall = time.perf_counter() - wall_started
+
+    # 单个任务的修改与删除（O(log n)）
+    sample = rng.sample(tasks, min(1000, n))
+    started = time.perf_counter()
+    for task in sample:
+        scheduler.handle_message({"type": "upsert", "task": dict(task, interval=task["interval"] + 1)})
+    upsert_us = (time.perf_counter() - started) * 1e6 / len(sample)
+    started = time.perf_counter()
+    for task in sample:
+        scheduler.handle_message({"type": "remove", "id": task["id"]})
+    remove_us = (time.perf_counter() - started) * 1e6 / len(sample)
+    scheduler.state_log.close()
+
+    lags = [lag * 1e6 for lag in dispatcher.lags]
+    return {
+        "tasks": n,
+        "mode": ("event" if tick is None else f"tick:{tick:g}s") + (f"+window:{window:g}s" if window else ""),
+        "simulated_hours": hours,
+        "wall_s": round(wall, 4),
+        "arm_us": round(arm_us, 1),
+        "ticks": tick_count,
+        "fires": dispatcher.fired,
+        "notifications": notifier.count,
+        "fires_per_s": round(dispatcher.fired / wall, 1) if wall > 0 else None,
+        "idle_tick_us": {"p50": round(percentile(idle, 50), 2), "p99": round(percentile(idle, 99), 2)},
+        "tick_us": {
+            "p50": round(percentile(ticks, 50), 2),
+            "p99": round(percentile(ticks, 99), 2),
+            "max": round(max(ticks, default=0.0), 2),
+        },
+        "per_fire_us": round(sum(ticks) / dispatcher.fired, 3) if dispatcher.fired else None,
+        "drift_s": {
+            "mean": round(dispatcher.total_drift / dispatcher.fired, 6) if dispatcher.fired else 0.0,
+            "max": round(dispatcher.max_drift, 6),
+        },
+        "dispatch_lag_us": {
+            "p50": round(percentile(lags, 50), 2),
+            "p99": round(percentile(lags, 99), 2),
+            "max": round(max(lags, default=0.0), 2),
+        },
+        "upsert_us": round(upsert_us, 3),
+        "remove_us": round(remove_us, 3),
+    }
+
+def run_suite(sizes, hours, tick=None, seed=42, with_state_log=False, label=None, window=0.0):
+    results = {
+        "label": label,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "state_log": with_state_log,
+        "seed": seed,
+        "cases": [],
+    }
+    with tempfile.TemporaryDirectory() as state_dir:
+        for n in sizes:
+            case = run_case(n, hours, tick, seed, state_dir if with_state_log else None, window)
+            results["cases"].append(case)
+            print(
+                f"[{n:>6} 个任务] 模拟 {hours:g} 小时用时 {case['wall_s']:.2f}s，"
+                f"触发 {case['fires']} 次（{case['fires_per_s']}/s），"
+                f"每次唤醒 p50 {case['tick_us']['p50']}µs / p99 {case['tick_us']['p99']}µs，"
+                f"最大漂移 {case['drift_s']['max']}s",
+                file=sys.stderr
+            )
+    return results
+
+# ---------- 通知风暴 ----------
+def run_storm(n, window=2.0, rate=None, burst=5, stagger=0.0, delay=0.005, interval=30):
+    """n 个间隔相同的任务在同一时刻创建，模拟一个间隔内的触发，返回结果字典
+
+    调度由虚拟时钟驱动，通知经真实的 NotificationDispatcher 发给每条耗时 delay 秒的假通知后端。
+    """
+    clock = VirtualClock()
+    notifier = MemoryNotifier(delay)
+    dispatcher = NotificationDispatcher(notifier, max_pending=max(100, n), timeout=3600, rate=rate, burst=burst)
+    scheduler = TaskScheduler(queue.Queue(), dispatcher=dispatcher, clock=clock, monotonic=clock,
+                              coalesce_window=window, stagger=stagger)
+    tasks = [
+        {"id": str(i), "title": f"任务 {i}", "content": "时间到了！", "interval": interval}
+        for i in range(n)
+    ]
+    scheduler.handle_message({"type": "replace", "tasks": tasks})
+    dispatcher.start()
+
+    end = clock() + interval * 60 + stagger
+    per_wakeup = []
+    busy = 0.0 # 调度线程花在触发上的真实时间
+    started = time.perf_counter()
+    while True:
+        due = scheduler.schedule.peek_due()
+        if due is None or due > end:
+            break
+        clock.advance_to(due)
+        t = time.perf_counter()
+        per_wakeup.append(scheduler.fire_due(clock()))
+        busy += time.perf_counter() - t
+    submitted = time.perf_counter()
+
+    # 等待全部通知送达（或超时）
+    settled = ("delivered", "dropped", "expired", "failed")
+    while sum(dispatcher.stats[k] for k in settled) < dispatcher.stats["submitted"]:
+        if time.perf_counter() - started > 60:
+            break
+        time.sleep(0.001)
+    drained = time.perf_counter() - started
+    dispatcher.stop()
+
+    sent = [t for _, _, t in notifier.sent]
+    wall_started = time.time() - (time.perf_counter() - started)
+    return {
+        "tasks": n,
+        "window_s": window,
+        "rate_per_s": rate,
+        "burst": burst,
+        "stagger_s": stagger,
+        "notify_delay_ms": delay * 1000,
+        "reminders": sum(per_wakeup),
+        "wakeups": len(per_wakeup),
+        "max_per_wakeup": max(per_wakeup, default=0),
+        "notifications": len(sent),
+        "scheduler_busy_ms": round(busy * 1000, 3),
+        "submit_ms": round((submitted - started) * 1000, 3),
+        "first_notification_ms": round((min(sent) - wall_started) * 1000, 2) if sent else None,
+        "drain_ms": round(drained * 1000, 2),
+        "reminders_per_s": round(sum(per_wakeup) / drained, 1) if drained > 0 else None,
+        "dispatcher": dict(dispatcher.stats),
+    }
+
+# ---------- 版本对比 ----------
+COMPARE_METRICS = (
+    ("arm_us", "载入"), ("tick_us.p50", "唤醒 p50"), ("tick_us.p99", "唤醒 p99"),
+    ("per_fire_us", "每次触发"), ("upsert_us", "修改"), ("remove_us", "删除"),
+    ("dispatch_lag_us.p99", "派发延迟 p99"),
+)
+
+def _metric(case, path):
+    value = case
+    for key in path.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+def compare(old, new, threshold=0.2):
+    """按任务数逐项对比两次结果，返回变慢超过 threshold 的指标数"""
+    old_cases = {(c["tasks"], c["mode"]): c for c in old["cases"]}
+    regressions = 0
+    for case in new["cases"]:
+        base = old_cases.get((case["tasks"], case["mode"]))
+        if base is None:
+            continue
+        for path, name in COMPARE_METRICS:
+            before, after = _metric(base, path), _metric(case, path)
+            if not before or after is None:
+                continue
+            ratio = after / before
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  <-- 变慢"
+                regressions += 1
+            print(f"[{case['tasks']:>6}] {name:<10} {before:>12.2f} -> {after:>12.2f}  x{ratio:.2f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="提醒调度器基准测试")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES), help="任务数，逗号分隔")
+    parser.add_argument("--hours", type=float, default=24.0, help="模拟的时长（小时）")
+    parser.add_argument("--tick", type=float, help="按固定步长（秒）推进虚拟时钟，默认直接跳到下一个到期时间")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--state-log", action="store_true", help="同时写入状态日志（临时目录），测量持久化开销")
+    parser.add_argument("--label", help="写入结果的版本标签")
+    parser.add_argument("--output", help="结果 JSON 文件，默认输出到标准输出")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="对比两次结果，有指标变慢超过 20%% 时返回 1")
+    parser.add_argument("--window", type=float, help="合并窗口（秒），默认不合并，--storm 模式默认 2")
+    parser.add_argument("--storm", type=int, metavar="N", help="N 个任务同时到期的通知风暴测试")
+    parser.add_argument("--rate", type=float, help="--storm：每秒最多弹出的通知数（令牌桶），默认不限流")
+    parser.add_argument("--burst", type=int, default=5, help="--storm：令牌桶允许的连续通知数")
+    parser.add_argument("--stagger", type=float, default=0.0, help="--storm：新任务首次触发错开的范围（秒）")
+    parser.add_argument("--notify-delay", type=float, default=0.005, help="--storm：假通知后端每条通知的耗时（秒）")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], 'r', encoding='utf-8') as f:
+            old = json.load(f)
+        with open(args.compare[1], 'r', encoding='utf-8') as f:
+            new = json.load(f)
+        return 1 if compare(old, new) else 0
+
+    if args.storm:
+        window = 2.0 if args.window is None else args.window
+        results = run_storm(args.storm, window, args.rate, args.burst, args.stagger, args.notify_delay)
+        results["label"] = args.label
+        print(
+            f"[{args.storm} 个任务] 弹出 {results['notifications']} 条通知，单次唤醒最多 {results['max_per_wakeup']} 个，"
+            f"调度线程占用 {results['scheduler_busy_ms']}ms，全部送达 {results['drain_ms']}ms",
+            file=sys.stderr
+        )
+    else:
+        sizes = [int(n) for n in args.sizes.split(",") if n.strip()]
+        results = run_suite(sizes, args.hours, args.tick, args.seed, args.state_log, args.label, args.window or 0.0)
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
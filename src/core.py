@@ -0,0 +1,2999 @@
+import os
+import sys
+import json
+import csv
+import logging
+import logging.handlers
+import contextvars
+import atexit
+import threading
+import time
+import queue
+import concurrent.futures
+import heapq
+import bisect
+import math
+import itertools
+import sqlite3
+import signal
+import tempfile
+import hashlib
+import zlib
+import datetime
+import functools
+import re
+import unicodedata
+from contextlib import contextmanager
+from multiprocessing.connection import Listener, Client
+
+APP_NAME = "提醒管家"
+
+# 确定基础路径
+if getattr(sys, 'frozen', False):
+    # 如果是打包后的 exe，配置文件保存在 exe 同级目录
+    BASE_DIR = os.path.dirname(sys.executable)
+else:
+    # 如果是源码运行，配置文件保存在当前脚本同级目录
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CONFIG_FILE = os.path.join(BASE_DIR, "config.json")
+JOURNAL_FILE = os.path.join(BASE_DIR, "config.journal")
+DB_FILE = os.path.join(BASE_DIR, "tasks.db")
+LOG_FILE = os.path.join(BASE_DIR, "error.log")
+STATE_FILE = os.path.join(BASE_DIR, "scheduler_state.log")
+# 注意：打包后 icon 仍然在临时目录中（资源文件），所以 icon 的路径逻辑可能需要单独处理
+# 这里我们假设 icon 是作为资源打包进去的，或者用户在目录下放了 icon
+# 为了兼容性，我们优先从资源目录找 icon，找不到再从 BASE_DIR 找
+if getattr(sys, 'frozen', False):
+    # PyInstaller 临时资源目录
+    RESOURCE_DIR = sys._MEIPASS
+else:
+    RESOURCE_DIR = BASE_DIR
+
+ICON_FILE = os.path.join(RESOURCE_DIR, "app_icon.ico")
+
+# 入口脚本（开机自启动和桌面快捷方式都指向它）
+MAIN_SCRIPT = os.path.join(BASE_DIR, "main.py")
+STARTUP_REPORT_FILE = os.path.join(BASE_DIR, "startup_report.json")
+METRICS_FILE = os.path.join(BASE_DIR, "metrics.prom")
+
+# ==========================================
+# 核心架构：日志与错误管理
+# ==========================================
+LOG_CONTEXT = contextvars.ContextVar("log_context", default={})
+
+@contextmanager
+def log_context(**fields):
+    """在当前线程（或协程）内给日志附加 task_id / phase 等字段"""
+    token = LOG_CONTEXT.set({**LOG_CONTEXT.get(), **fields})
+    try:
+        yield
+    finally:
+        LOG_CONTEXT.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """在调用日志的线程中把上下文字段（以及 extra 传入的 task_id / phase）写入记录"""
+    FIELDS = ("phase", "task_id")
+
+    def filter(self, record):
+        context = LOG_CONTEXT.get()
+        parts = []
+        for name in self.FIELDS:
+            value = getattr(record, name, None)
+            if value is None:
+                value = context.get(name)
+                setattr(record, name, value)
+            if value is not None:
+                parts.append(f"{name}={value}")
+        record.context = f" [{' '.join(parts)}]" if parts else ""
+        return True
+
+
+class LogManager:
+    """日志经队列交给后台线程写入轮转的 error.log，调用 logging 的线程不再等待磁盘
+
+      - 默认按大小轮转（log_max_bytes，保留 log_backups 份），log_rotation 为 "daily" 时按天轮转
+      - 每条记录带上 phase / task_id（来自 log_context 或 extra）
+      - set_level 可以在运行时切换日志级别，只修改 logger 的级别，不会阻塞调度线程；
+        之后重新载入配置时，只有配置中的 log_level 本身变化才会覆盖它
+    """
+    FORMAT = '%(asctime)s - %(levelname)s - %(message)s%(context)s'
+    LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+    queue = None
+    listener = None
+    options = None
+    config_level = None # 最近一次从配置文件应用的 log_level
+
+    @staticmethod
+    def _file_handler(rotation="size", max_bytes=1024 * 1024, backups=3):
+        if rotation == "daily":
+            handler = logging.handlers.TimedRotatingFileHandler(
+                LOG_FILE, when="midnight", backupCount=backups, encoding="utf-8", delay=True
+            )
+        else:
+            handler = logging.handlers.RotatingFileHandler(
+                LOG_FILE, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True
+            )
+        handler.setFormatter(logging.Formatter(LogManager.FORMAT))
+        return handler
+
+    @staticmethod
+    def start(level=logging.ERROR, **options):
+        LogManager.queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(LogManager.queue)
+        queue_handler.addFilter(ContextFilter())
+        root = logging.getLogger()
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+        LogManager.options = options
+        LogManager.listener = logging.handlers.QueueListener(LogManager.queue, LogManager._file_handler(**options))
+        LogManager.listener.start()
+        atexit.register(LogManager.stop)
+
+    @staticmethod
+    def stop():
+        """写完队列中剩余的记录"""
+        listener, LogManager.listener = LogManager.listener, None
+        if listener is not None:
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+
+    @staticmethod
+    def configure(config):
+        """按配置文件中的 log_level / log_rotation / log_max_bytes / log_backups 调整日志
+
+        log_level 只在配置中的值变化时才应用，重新载入配置不会覆盖运行时切换的级别
+        （--log-level 或托盘菜单）。
+        """
+        level = str(config.get("log_level", "ERROR")).upper()
+        if level != LogManager.config_level:
+            LogManager.config_level = level
+            LogManager.set_level(level)
+        options = {
+            "rotation": config.get("log_rotation", "size"),
+            "max_bytes": int(config.get("log_max_bytes", 1024 * 1024)),
+            "backups": int(config.get("log_backups", 3)),
+        }
+        if options == LogManager.options or LogManager.listener is None:
+            return
+        # 轮转方式变化时换一个写入线程，旧线程先把队列里已有的记录写完
+        LogManager.stop()
+        LogManager.options = options
+        LogManager.listener = logging.handlers.QueueListener(LogManager.queue, LogManager._file_handler(**options))
+        LogManager.listener.start()
+
+    @staticmethod
+    def set_level(level):
+        name = str(level).upper()
+        if name not in LogManager.LEVELS:
+            raise ValueError(f"未知的日志级别: {level}")
+        logging.getLogger().setLevel(name)
+        return name
+
+    @staticmethod
+    def get_level():
+        return logging.getLevelName(logging.getLogger().getEffectiveLevel())
+
+LogManager.start(rotation="size", max_bytes=1024 * 1024, backups=3)
+
+class StartupProfiler:
+    """启动耗时记录：分别统计每个启动阶段和每个重量级模块的首次导入耗时
+
+    时间均为相对于本模块导入时刻的秒数，报告写入 startup_report.json。
+    """
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.phases = [] # (阶段名, 开始, 耗时)
+        self.imports = [] # (模块名, 开始, 耗时)
+        self.marks = {} # 里程碑 -> 时间
+
+    def elapsed(self, t=None):
+        return (time.perf_counter() if t is None else t) - self.t0
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            with log_context(phase=name):
+                yield
+        finally:
+            self.phases.append((name, self.elapsed(start), time.perf_counter() - start))
+
+    @contextmanager
+    def timed_import(self, name):
+        """包住 import 语句使用：只记录首次导入（已导入的模块直接跳过）"""
+        if name in sys.modules:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.imports.append((name, self.elapsed(start), time.perf_counter() - start))
+
+    def mark(self, name, t=None):
+        self.marks.setdefault(name, self.elapsed(t))
+
+    def report(self):
+        return {
+            "phases": [{"name": n, "start": round(s, 4), "seconds": round(d, 4)} for n, s, d in self.phases],
+            "imports": [{"module": n, "start": round(s, 4), "seconds": round(d, 4)} for n, s, d in self.imports],
+            "marks": {k: round(v, 4) for k, v in self.marks.items()},
+        }
+
+    def write(self, path=STARTUP_REPORT_FILE):
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, indent=4, ensure_ascii=False)
+        except Exception as e:
+            logging.error(f"写入启动报告失败: {e}")
+
+STARTUP = StartupProfiler()
+
+# ==========================================
+# 运行指标
+# ==========================================
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500, 1000)
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self.lock:
+            self.value += n
+
+    def samples(self):
+        yield self.name, None, self.value
+
+
+class Gauge:
+    """读取时才调用 fn 取值，热路径上没有任何开销"""
+    def __init__(self, name, help_text, fn, kind="gauge"):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.kind = kind
+
+    @property
+    def value(self):
+        try:
+            return self.fn()
+        except Exception:
+            return None
+
+    def samples(self):
+        yield self.name, None, self.value
+
+
+class Histogram:
+    """固定分桶的直方图：observe 只做一次二分查找和几次加法
+
+    single_writer=True 表示只有一个线程写入（如调度线程），observe 不再加锁；
+    读取方只复制计数列表，最多看到稍旧的数据。
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, single_writer=False):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1) # 最后一格为 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+        self.lock = threading.Lock()
+        if single_writer:
+            self.observe = self._observe_unlocked
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+            if value > self.max:
+                self.max = value
+
+    def _observe_unlocked(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    @contextmanager
+    def time(self):
+        """计时上下文，也可以作为装饰器使用"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q):
+        """按分桶上界估算分位数"""
+        with self.lock:
+            counts, total, peak = list(self.counts), self.count, self.max
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, n in zip(self.buckets, counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, peak)
+        return peak
+
+    def samples(self):
+        with self.lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+        seen = 0
+        for bound, n in zip(self.buckets, counts):
+            seen += n
+            yield f"{self.name}_bucket", f'le="{bound:g}"', seen
+        yield f"{self.name}_bucket", 'le="+Inf"', total
+        yield f"{self.name}_sum", None, value_sum
+        yield f"{self.name}_count", None, total
+
+
+class MetricsRegistry:
+    """进程内的指标注册表：计数器、回调取值的仪表和延迟直方图
+
+    指标在模块导入时创建，热路径上只是一次加法或一次 observe；
+    render() 输出 Prometheus 文本格式，summary() 生成托盘菜单中查看用的中文摘要。
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None and not isinstance(metric, Gauge):
+                return existing
+            self.metrics[metric.name] = metric # 仪表重复注册时以最新的取值函数为准
+            return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, single_writer=False):
+        return self._register(Histogram(name, help_text, buckets, single_writer))
+
+    def gauge(self, name, help_text, fn, kind="gauge"):
+        return self._register(Gauge(name, help_text, fn, kind))
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if value is None:
+                    continue
+                value = repr(float(value)) if isinstance(value, float) else str(value)
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            if isinstance(metric, Histogram):
+                if metric.count == 0:
+                    lines.append(f"{metric.help}: 暂无数据")
+                    continue
+                p50, p99 = metric.quantile(0.5), metric.quantile(0.99)
+                if metric.name.endswith("_seconds"):
+                    fmt = lambda v: f"{v * 1000:.1f} ms"
+                else:
+                    fmt = lambda v: f"{v:g}"
+                lines.append(
+                    f"{metric.help}: {metric.count} 次，p50 ≤ {fmt(p50)}，p99 ≤ {fmt(p99)}，最大 {fmt(metric.max)}"
+                )
+            else:
+                value = metric.value
+                if value is None:
+                    text = "-"
+                elif metric.name.endswith("_bytes"):
+                    text = f"{value / 1048576:.1f} MB"
+                else:
+                    text = f"{value:g}"
+                lines.append(f"{metric.help}: {text}")
+        return lines
+
+    def write(self, path=None):
+        path = path or METRICS_FILE
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+            return path
+        except Exception as e:
+            logging.error(f"导出运行指标失败: {e}")
+            return None
+
+METRICS = MetricsRegistry()
+# 到期触发的提醒数即 reminder_fire_lateness_seconds_count
+FIRE_LATENESS = METRICS.histogram(
+    "reminder_fire_lateness_seconds", "提醒触发延迟（实际 - 计划）", single_writer=True
+)
+NOTIFY_SECONDS = METRICS.histogram("notify_duration_seconds", "通知发送耗时")
+NOTIFY_WAIT = METRICS.histogram("notify_queue_wait_seconds", "通知在派发队列中的等待时间")
+COMMANDS_PER_WAKEUP = METRICS.histogram(
+    "scheduler_commands_per_wakeup", "调度线程每次唤醒处理的指令数（指令队列深度）", COUNT_BUCKETS,
+    single_writer=True
+)
+CONFIG_LOAD_SECONDS = METRICS.histogram("config_load_seconds", "配置载入耗时")
+CONFIG_SAVE_SECONDS = METRICS.histogram("config_save_seconds", "配置快照保存耗时")
+CONFIG_WRITE_SECONDS = METRICS.histogram("config_write_seconds", "编辑落盘耗时（日志 / 数据库）")
+
+def resident_memory():
+    """当前进程的常驻内存（字节），无法获取时返回 None"""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            kernel32 = ctypes.windll.kernel32
+            kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+            psapi = ctypes.windll.psapi
+            psapi.GetProcessMemoryInfo.argtypes = [
+                wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD
+            ]
+            if psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+def trim_working_set():
+    """Windows 上把空闲页还给系统，让释放的界面内存立即体现在工作集上"""
+    if sys.platform != "win32":
+        return
+    try:
+        import ctypes
+        from ctypes import wintypes
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        ctypes.windll.psapi.EmptyWorkingSet.argtypes = [wintypes.HANDLE]
+        ctypes.windll.psapi.EmptyWorkingSet(kernel32.GetCurrentProcess())
+    except Exception as e:
+        logging.error(f"释放工作集失败: {e}")
+
+# ==========================================
+# 提醒规则（cron / 每天定时 / 工作时段）
+# ==========================================
+# 任务的 "schedule" 字段（可选）：
+#   "0 9 * * 1-5"              五段 cron 表达式：分 时 日 月 周（0 和 7 都表示周日）
+#   "工作日 09:00,14:30"        在指定的日子按时刻列表提醒（省略日子表示每天）
+#   "mon-fri 09:00-18:00"      在时段内从开始时刻起每隔 interval 分钟提醒
+# 每条规则只编译一次（相同的规则共用同一个求值器），调度器只向它询问下一次触发时间。
+WEEKDAY_NAMES = {
+    "sun": 0, "mon": 1, "tue": 2, "wed": 3, "thu": 4, "fri": 5, "sat": 6,
+    "周日": 0, "周天": 0, "周一": 1, "周二": 2, "周三": 3, "周四": 4, "周五": 5, "周六": 6,
+}
+MONTH_NAMES = {name: i + 1 for i, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+)}
+DAY_ALIASES = {
+    "每天": "sun-sat", "daily": "sun-sat", "*": "sun-sat",
+    "工作日": "mon-fri", "weekdays": "mon-fri",
+    "周末": "sat,sun", "weekends": "sat,sun",
+}
+ALL_DAYS = frozenset(range(7))
+WORK_DAYS = frozenset(range(1, 6))
+CHINESE_WEEKDAYS = "日一二三四五六"
+
+def _cron_weekday(day):
+    """date 对应的 cron 星期（0 = 周日）"""
+    return (day.weekday() + 1) % 7
+
+def _parse_clock(text):
+    """"HH:MM" -> 当天的秒数"""
+    try:
+        hour, minute = (int(x) for x in text.split(":"))
+    except ValueError:
+        raise ValueError(f"时刻格式应为 HH:MM: {text}")
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        raise ValueError(f"时刻超出范围: {text}")
+    return hour * 3600 + minute * 60
+
+def _format_clock(seconds):
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
+def _local_timestamp(day, seconds):
+    """本地日期 + 当天秒数 -> 时间戳（夏令时由系统时区处理）"""
+    return datetime.datetime.combine(day, datetime.time()).timestamp() + seconds
+
+def _parse_days(text):
+    text = DAY_ALIASES.get(text.lower(), text)
+    days = set()
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        try:
+            start = WEEKDAY_NAMES[first.strip().lower()]
+            end = WEEKDAY_NAMES[last.strip().lower()] if last else start
+        except KeyError:
+            raise ValueError(f"无法识别的日子: {part}")
+        days.update((start + i) % 7 for i in range((end - start) % 7 + 1)) # 支持 fri-mon 这样跨周末的范围
+    return frozenset(days)
+
+def _describe_days(days):
+    if days == ALL_DAYS:
+        return "每天"
+    if days == WORK_DAYS:
+        return "工作日"
+    if days == frozenset((0, 6)):
+        return "周末"
+    return "、".join(f"周{CHINESE_WEEKDAYS[d]}" for d in sorted(days, key=lambda d: (d - 1) % 7))
+
+
+class CronRule:
+    """五段 cron 表达式；各字段预先展开成有序列表，求下一次触发时间时逐级用 bisect 跳过不匹配的值"""
+    MAX_STEPS = 10000 # 防止永远不会匹配的表达式（如 2 月 31 日）死循环
+
+    def __init__(self, expr):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError("cron 表达式需要 5 段：分 时 日 月 周")
+        self.expr = " ".join(fields)
+        self.minutes = self._parse_field(fields[0], 0, 59)
+        self.hours = self._parse_field(fields[1], 0, 23)
+        self.days = frozenset(self._parse_field(fields[2], 1, 31))
+        self.months = self._parse_field(fields[3], 1, 12, MONTH_NAMES)
+        self.weekdays = frozenset(d % 7 for d in self._parse_field(fields[4], 0, 7, WEEKDAY_NAMES))
+        # 与标准 cron 一致：日和周都有限制时满足其一即可
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse_field(text, low, high, names=None):
+        values = set()
+        for part in text.split(","):
+            part, _, step = part.partition("/")
+            try:
+                step = int(step) if step else 1
+                if part == "*":
+                    start, end = low, high
+                else:
+                    first, _, last = part.partition("-")
+                    start = names[first.lower()] if names and first.lower() in names else int(first)
+                    end = (names[last.lower()] if names and last.lower() in names else int(last)) if last \
+                        else (high if step > 1 else start)
+            except ValueError:
+                raise ValueError(f"cron 字段无法解析: {text}")
+            if step <= 0 or not (low <= start <= end <= high):
+                raise ValueError(f"cron 字段超出范围 {low}-{high}: {text}")
+            values.update(range(start, end + 1, step))
+        return sorted(values)
+
+    def _day_matches(self, day):
+        if self.any_day:
+            return self.any_weekday or _cron_weekday(day) in self.weekdays
+        if self.any_weekday:
+            return day.day in self.days
+        return day.day in self.days or _cron_weekday(day) in self.weekdays
+
+    def next_after(self, t):
+        """t 之后（不含 t）的下一次触发时间戳，永远不会再触发时返回 None"""
+        dt = datetime.datetime.fromtimestamp(t).replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        for _ in range(self.MAX_STEPS):
+            if dt.month not in self.months:
+                i = bisect.bisect_left(self.months, dt.month)
+                year = dt.year if i < len(self.months) else dt.year + 1
+                dt = datetime.datetime(year, self.months[i % len(self.months)], 1)
+                continue
+            if not self._day_matches(dt):
+                dt = datetime.datetime.combine(dt.date() + datetime.timedelta(days=1), datetime.time())
+                continue
+            i = bisect.bisect_left(self.hours, dt.hour)
+            if i == len(self.hours):
+                dt = datetime.datetime.combine(dt.date() + datetime.timedelta(days=1), datetime.time())
+                continue
+            if self.hours[i] != dt.hour:
+                dt = dt.replace(hour=self.hours[i], minute=0)
+            j = bisect.bisect_left(self.minutes, dt.minute)
+            if j == len(self.minutes):
+                dt = dt.replace(minute=0) + datetime.timedelta(hours=1)
+                continue
+            dt = dt.replace(minute=self.minutes[j])
+            ts = dt.timestamp()
+            if ts > t:
+                return ts
+            dt += datetime.timedelta(minutes=1) # 夏令时回拨造成的重复时刻
+        return None
+
+    def describe(self):
+        return f"按 cron {self.expr} 提醒"
+
+
+class TimesRule:
+    """在指定的日子按时刻列表提醒；时刻预先排好序，当天用 bisect 查找，最多向后看一周"""
+    def __init__(self, days, times):
+        self.days = days
+        self.times = sorted(set(times))
+
+    def next_after(self, t):
+        now = datetime.datetime.fromtimestamp(t)
+        second_of_day = now.hour * 3600 + now.minute * 60 + now.second
+        for offset in range(8):
+            day = now.date() + datetime.timedelta(days=offset)
+            if _cron_weekday(day) not in self.days:
+                continue
+            i = bisect.bisect_right(self.times, second_of_day) if offset == 0 else 0
+            for seconds in self.times[i:]:
+                ts = _local_timestamp(day, seconds)
+                if ts > t:
+                    return ts
+        return None
+
+    def describe(self):
+        return f"{_describe_days(self.days)} {'、'.join(_format_clock(s) for s in self.times)} 提醒"
+
+
+class WindowRule:
+    """在指定日子的时段内，从开始时刻起每隔 step 秒提醒一次；结束时刻早于开始时刻表示跨过午夜"""
+    def __init__(self, days, start, end, step):
+        if step is None or step <= 0:
+            raise ValueError("时段规则需要有效的循环间隔")
+        if start == end:
+            raise ValueError("时段的开始和结束不能相同")
+        self.days = days
+        self.start = start
+        self.end = end
+        self.length = (end - start) % 86400
+        self.step = step
+
+    def next_after(self, t):
+        today = datetime.date.fromtimestamp(t)
+        for offset in range(-1, 8): # 从前一天开始：跨午夜的时段可能还没结束
+            day = today + datetime.timedelta(days=offset)
+            if _cron_weekday(day) not in self.days:
+                continue
+            begin = _local_timestamp(day, self.start)
+            if t < begin:
+                return begin
+            slot = begin + (math.floor((t - begin) / self.step) + 1) * self.step
+            if slot < begin + self.length:
+                return slot
+        return None
+
+    def describe(self):
+        minutes = self.step / 60
+        return (f"{_describe_days(self.days)} {_format_clock(self.start)}-{_format_clock(self.end)} "
+                f"每 {minutes:g} 分钟提醒")
+
+
+@functools.lru_cache(maxsize=256)
+def compile_schedule(text, step=None):
+    """把 schedule 字段编译成求值器（相同参数共用一个实例）；step 为循环间隔（秒），不合法时抛出 ValueError"""
+    text = str(text).strip().replace("，", ",")
+    if not text:
+        raise ValueError("提醒规则不能为空")
+    tokens = text.split()
+    if ":" not in text and (len(tokens) == 5 or any(c.isdigit() or c == "*" for c in text)):
+        return CronRule(text)
+    days, clock = ALL_DAYS, None
+    for token in tokens:
+        if ":" in token:
+            if clock is not None:
+                raise ValueError("只能指定一组时刻或一个时段")
+            clock = token
+        else:
+            days = _parse_days(token)
+    if clock is None:
+        raise ValueError("缺少时刻（如 09:00）或时段（如 09:00-18:00）")
+    if "-" in clock:
+        start, _, end = clock.partition("-")
+        return WindowRule(days, _parse_clock(start), _parse_clock(end), step)
+    return TimesRule(days, [_parse_clock(c) for c in clock.split(",") if c])
+
+def describe_schedule(task):
+    """任务卡片上显示的提醒频率"""
+    schedule = task.get("schedule")
+    if not schedule:
+        return f"每 {task['interval']} 分钟提醒"
+    rule = task.rule if isinstance(task, TaskRecord) else None
+    if rule is None:
+        try:
+            rule = compile_schedule(schedule, float(task.get("interval", 0)) * 60)
+        except (TypeError, ValueError):
+            return f"规则无效：{schedule}"
+    return rule.describe()
+
+# ==========================================
+# 任务校验
+# ==========================================
+_last_task_id = 0
+_task_id_lock = threading.Lock()
+
+def new_task_id():
+    """毫秒时间戳形式的任务 id；同一毫秒内连续创建时依次加一，保证不重复"""
+    global _last_task_id
+    with _task_id_lock:
+        _last_task_id = max(_last_task_id + 1, int(time.time() * 1000))
+        return str(_last_task_id)
+
+def reserve_task_ids(ids):
+    """已有的数字 id 不再分配：批量创建会让 id 领先当前时间，重启或再次导入后新 id 不能与它们重复"""
+    global _last_task_id
+    largest = max((int(i) for i in map(str, ids) if i.isdigit()), default=0)
+    if largest > _last_task_id:
+        with _task_id_lock:
+            _last_task_id = max(_last_task_id, largest)
+
+def validate_task(title, content, interval, task_id=None, schedule=None):
+    """按任务设置对话框的规则校验并生成任务，不合法时抛出 ValueError
+
+    schedule 为可选的提醒规则，设置后按规则提醒（interval 只作为时段规则内的间隔）。
+    """
+    title = str(title).strip()
+    content = str(content).strip()
+    interval_str = str(interval).strip()
+    schedule = str(schedule or "").strip()
+
+    if not title or not content:
+        raise ValueError("标题和内容不能为空哦~")
+
+    try:
+        interval = float(interval_str)
+    except ValueError:
+        raise ValueError("间隔必须是一个数字呢")
+    if not math.isfinite(interval):
+        raise ValueError("间隔必须是一个数字呢")
+
+    if interval <= 0:
+        raise ValueError("间隔需要大于 0 呀")
+
+    if task_id is not None:
+        reserve_task_ids([task_id])
+    task = {
+        "id": task_id if task_id is not None else new_task_id(),
+        "title": title,
+        "content": content,
+        "interval": interval
+    }
+    if schedule:
+        try:
+            compile_schedule(schedule, interval * 60)
+        except ValueError as e:
+            raise ValueError(f"提醒规则有误：{e}")
+        task["schedule"] = schedule
+    return task
+
+# ==========================================
+# 任务记录与快照（写时复制）
+# ==========================================
+class TaskRecord:
+    """编译后的任务：字段固定（__slots__），间隔已换算成秒，创建后不再修改
+
+    支持 record["title"]、record.get(...) 和 dict(record) 这样的只读字典式访问，
+    界面与接口代码不需要区分；持久化时用 to_dict() 还原为原始字典（保留未知字段）。
+    间隔无法解析或不大于 0 时 seconds 为 None，调度器不会为它排期。
+    有 schedule 字段时 rule 为编译好的提醒规则，规则无效时为 None。
+    """
+    __slots__ = ("id", "title", "content", "interval", "seconds", "schedule", "rule", "extra")
+    FIELDS = ("id", "title", "content", "interval")
+
+    def __init__(self, id, title, content, interval, extra=None, schedule=None):
+        self.id = id
+        self.title = title
+        self.content = content
+        self.interval = interval # 分钟，保持配置中的原值
+        try:
+            seconds = float(interval) * 60
+        except (TypeError, ValueError):
+            seconds = None
+        self.seconds = seconds if seconds is not None and 0 < seconds < math.inf else None
+        self.schedule = schedule or None
+        self.rule = None
+        if self.schedule:
+            try:
+                self.rule = compile_schedule(self.schedule, self.seconds)
+            except (TypeError, ValueError):
+                pass
+        self.extra = extra # 其他未知字段，没有时为 None
+
+    @classmethod
+    def compile(cls, task):
+        if isinstance(task, cls):
+            return task
+        extra = {k: v for k, v in task.items() if k not in cls.FIELDS and k != "schedule"} or None
+        return cls(task.get("id"), task.get("title", ""), task.get("content", ""), task.get("interval", 1), extra,
+                   task.get("schedule"))
+
+    @staticmethod
+    def plain(task):
+        """持久化用：记录转换为字典，字典原样返回"""
+        return task.to_dict() if isinstance(task, TaskRecord) else task
+
+    def to_dict(self):
+        task = {"id": self.id, "title": self.title, "content": self.content, "interval": self.interval}
+        if self.schedule:
+            task["schedule"] = self.schedule
+        if self.extra:
+            task.update(self.extra)
+        return task
+
+    def keys(self):
+        return self.FIELDS + (("schedule",) if self.schedule else ()) + tuple(self.extra or ())
+
+    def __getitem__(self, key):
+        if key in self.FIELDS or (key == "schedule" and self.schedule):
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self.FIELDS or (key == "schedule" and bool(self.schedule)) or \
+            bool(self.extra and key in self.extra)
+
+    def __eq__(self, other):
+        if isinstance(other, TaskRecord):
+            return (self.id, self.title, self.content, self.interval, self.schedule, self.extra) == \
+                   (other.id, other.title, other.content, other.interval, other.schedule, other.extra)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"TaskRecord({self.to_dict()!r})"
+
+
+class TaskSnapshot:
+    """不可变的任务快照：版本号 + 有序的记录元组 + id 索引
+
+    每次修改都生成新快照（写时复制），由引擎在写锁内整体替换引用；调度线程、界面、
+    本地接口和保存线程拿到的快照永远不会再变化，读取不需要加锁。
+    """
+    __slots__ = ("version", "records", "index")
+
+    def __init__(self, records=(), version=0, index=None):
+        self.records = tuple(records)
+        self.index = index if index is not None else {r.id: i for i, r in enumerate(self.records)}
+        self.version = version
+
+    @classmethod
+    def build(cls, tasks, version=0):
+        return cls((TaskRecord.compile(t) for t in tasks), version)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __contains__(self, task_id):
+        return task_id in self.index
+
+    def get(self, task_id):
+        i = self.index.get(task_id)
+        return None if i is None else self.records[i]
+
+    def apply(self, upserts=(), removes=()):
+        """返回应用了增删之后的新快照（版本号加一），自身不变"""
+        removed = {task_id for task_id in removes if task_id in self.index}
+        if removed:
+            records = [r for r in self.records if r.id not in removed]
+            index = {r.id: i for i, r in enumerate(records)}
+        else:
+            records = list(self.records)
+            index = dict(self.index)
+        for record in upserts:
+            i = index.get(record.id)
+            if i is None:
+                index[record.id] = len(records)
+                records.append(record)
+            else:
+                records[i] = record
+        return TaskSnapshot(records, self.version + 1, index)
+
+    def to_dicts(self):
+        return [r.to_dict() for r in self.records]
+
+# ==========================================
+# 任务搜索索引
+# ==========================================
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+# CJK 字符按连续片段切出，其余字母数字按单词切分（"喝水reminder09" -> "喝水", "reminder09"）
+_TERM_RE = re.compile(f"[{_CJK}]+|[^\\W_{_CJK}]+")
+
+def normalize_text(text):
+    """全角转半角、统一大小写，索引和查询使用同一种规范化"""
+    return unicodedata.normalize("NFKC", str(text)).casefold()
+
+def _is_cjk_term(term):
+    return "\u3040" <= term[0] <= "\ufaff"
+
+
+class TaskSearchIndex:
+    """标题与内容的增量倒排索引
+
+    拉丁字母、数字按单词索引，查询词按前缀匹配（有序单词表 + bisect）；CJK 文本没有分词，
+    按单字和相邻两字（bigram）索引，多于两个字的查询片段取各 bigram 的交集后再按原文核对。
+    add / remove 只改动该任务涉及的词条，不需要重建；查询各词条的结果取交集，返回任务 id 集合。
+    """
+    def __init__(self):
+        self.words = {}         # 单词 -> {task_id}
+        self.sorted_words = []  # 全部单词（有序），用于前缀查询
+        self.grams = {}         # CJK 单字 / bigram -> {task_id}
+        self.docs = {}          # task_id -> (规范化全文, 单词, CJK 词条)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, task_id):
+        return task_id in self.docs
+
+    @staticmethod
+    def _analyze(task):
+        text = normalize_text(f"{task.get('title', '')}\n{task.get('content', '')}")
+        words, grams = set(), set()
+        for term in _TERM_RE.findall(text):
+            if _is_cjk_term(term):
+                grams.update(term)
+                grams.update(term[i:i + 2] for i in range(len(term) - 1))
+            else:
+                words.add(term)
+        return text, words, grams
+
+    def build(self, tasks):
+        """整体重建（首次显示主界面或任务列表整体替换时）"""
+        self.words, self.grams, self.docs = {}, {}, {}
+        for task in tasks:
+            self._index(task, sort=False)
+        self.sorted_words = sorted(self.words)
+
+    def add(self, task):
+        """新增或修改一个任务"""
+        if task["id"] in self.docs:
+            self.remove(task["id"])
+        self._index(task, sort=True)
+
+    def _index(self, task, sort):
+        task_id = task["id"]
+        text, words, grams = self._analyze(task)
+        for word in words:
+            postings = self.words.get(word)
+            if postings is None:
+                postings = self.words[word] = set()
+                if sort:
+                    bisect.insort(self.sorted_words, word)
+            postings.add(task_id)
+        for gram in grams:
+            self.grams.setdefault(gram, set()).add(task_id)
+        self.docs[task_id] = (text, tuple(words), tuple(grams))
+
+    def remove(self, task_id):
+        doc = self.docs.pop(task_id, None)
+        if doc is None:
+            return
+        _, words, grams = doc
+        for word in words:
+            postings = self.words[word]
+            postings.discard(task_id)
+            if not postings:
+                del self.words[word]
+                i = bisect.bisect_left(self.sorted_words, word)
+                del self.sorted_words[i]
+        for gram in grams:
+            postings = self.grams[gram]
+            postings.discard(task_id)
+            if not postings:
+                del self.grams[gram]
+
+    def _prefix(self, word):
+        words = self.sorted_words
+        i = bisect.bisect_left(words, word)
+        j = bisect.bisect_left(words, word + "\U0010ffff")
+        if j - i == 1:
+            return self.words[words[i]]
+        result = set()
+        for k in range(i, j):
+            result |= self.words[words[k]]
+        return result
+
+    def search(self, query):
+        """返回同时匹配所有查询词的任务 id 集合；查询为空时返回 None（不过滤）"""
+        terms = _TERM_RE.findall(normalize_text(query))
+        if not terms:
+            return None
+        requirements = []
+        long_runs = []
+        for term in terms:
+            if not _is_cjk_term(term):
+                requirements.append(self._prefix(term))
+            elif len(term) <= 2:
+                requirements.append(self.grams.get(term, set()))
+            else:
+                requirements.extend(self.grams.get(term[i:i + 2], set()) for i in range(len(term) - 1))
+                long_runs.append(term)
+        requirements.sort(key=len)
+        result = set(requirements[0])
+        for postings in requirements[1:]:
+            if not result:
+                break
+            result &= postings
+        if long_runs:
+            # bigram 都命中不代表它们在原文中连续出现
+            docs = self.docs
+            result = {i for i in result if all(run in docs[i][0] for run in long_runs)}
+        return result
+
+    def matches(self, task_id, query):
+        """单个任务是否匹配查询（实时过滤时处理单条修改用）"""
+        doc = self.docs.get(task_id)
+        if doc is None:
+            return False
+        text, words, _ = doc
+        for term in _TERM_RE.findall(normalize_text(query)):
+            if _is_cjk_term(term):
+                if term not in text:
+                    return False
+            elif not any(word.startswith(term) for word in words):
+                return False
+        return True
+
+# ==========================================
+# 数据持久化与配置管理
+# ==========================================
+class AutoStartManager:
+    REG_PATH = r"Software\Microsoft\Windows\CurrentVersion\Run"
+    APP_NAME = "ReminderManager"
+
+    @staticmethod
+    def set_autostart(enable=True):
+        try:
+            with STARTUP.timed_import("winreg"):
+                import winreg # 用于操作 Windows 注册表实现自启动
+            # 获取当前可执行文件路径
+            if getattr(sys, 'frozen', False):
+                app_path = sys.executable
+            else:
+                # 开发环境下使用 pythonw.exe 运行入口脚本
+                app_path = f'"{sys.executable}" "{MAIN_SCRIPT}"'
+
+            key = winreg.OpenKey(
+                winreg.HKEY_CURRENT_USER, 
+                AutoStartManager.REG_PATH, 
+                0, 
+                winreg.KEY_ALL_ACCESS
+            )
+            
+            if enable:
+                winreg.SetValueEx(key, AutoStartManager.APP_NAME, 0, winreg.REG_SZ, app_path)
+            else:
+                try:
+                    winreg.DeleteValue(key, AutoStartManager.APP_NAME)
+                except FileNotFoundError:
+                    pass # 如果本来就没有设置，忽略错误
+                    
+            winreg.CloseKey(key)
+            return True
+        except Exception as e:
+            print(f"自启动设置失败: {e}")
+            return False
+
+    @staticmethod
+    def is_autostart_enabled():
+        try:
+            with STARTUP.timed_import("winreg"):
+                import winreg
+            key = winreg.OpenKey(
+                winreg.HKEY_CURRENT_USER, 
+                AutoStartManager.REG_PATH, 
+                0, 
+                winreg.KEY_READ
+            )
+            winreg.QueryValueEx(key, AutoStartManager.APP_NAME)
+            winreg.CloseKey(key)
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception:
+            return False
+
+class SqliteTaskStore:
+    """SQLite 任务存储，适合上万条提醒（在 config.json 中设置 "storage": "sqlite" 启用）
+
+    tasks 表以 id 为主键，fire_state 表记录上次/下次触发时间并对 next_fire 建索引，
+    upsert、delete 和查询最近到期任务都是 O(log n)。
+    同时实现了 SchedulerStateLog 的 load / record / forget / close 接口，可直接作为调度状态存储。
+    """
+    def __init__(self, path=None):
+        self.path = path or DB_FILE
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fire_state (
+                id TEXT PRIMARY KEY,
+                last_fired REAL NOT NULL,
+                next_fire REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_fire_state_next ON fire_state(next_fire);
+        """)
+
+    def _transaction(self, statements):
+        with self.lock:
+            cur = self.conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                for sql, params in statements:
+                    cur.execute(sql, params)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def all_tasks(self):
+        # rowid 在 upsert 时保持不变，因此按 rowid 排序即为创建顺序
+        with self.lock:
+            rows = self.conn.execute("SELECT data FROM tasks ORDER BY rowid").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, task_id):
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def apply(self, entries):
+        """在一个事务内应用一批 upsert / delete 日志条目"""
+        statements = []
+        for entry in entries:
+            if entry["op"] == "upsert":
+                task = entry["task"]
+                statements.append((
+                    "INSERT INTO tasks (id, data) VALUES (?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                    (str(task["id"]), json.dumps(task, ensure_ascii=False))
+                ))
+            elif entry["op"] == "delete":
+                statements.append(("DELETE FROM tasks WHERE id = ?", (str(entry["id"]),)))
+                statements.append(("DELETE FROM fire_state WHERE id = ?", (str(entry["id"]),)))
+        self._transaction(statements)
+
+    def upsert(self, task):
+        self.apply([{"op": "upsert", "task": task}])
+
+    def delete(self, task_id):
+        self.apply([{"op": "delete", "id": task_id}])
+
+    def next_due(self, limit=10):
+        """按下次触发时间返回最近到期的任务 [(next_fire, task)]，走 next_fire 索引"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT s.next_fire, t.data FROM fire_state s JOIN tasks t ON t.id = s.id "
+                "WHERE s.next_fire IS NOT NULL ORDER BY s.next_fire LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    # ---- 调度状态接口（与 SchedulerStateLog 一致） ----
+    def load(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT id, last_fired FROM fire_state").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def record(self, task_id, t, next_due=None):
+        self._transaction([(
+            "INSERT INTO fire_state (id, last_fired, next_fire) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET last_fired = excluded.last_fired, next_fire = excluded.next_fire",
+            (str(task_id), t, next_due)
+        )])
+
+    def import_state(self, state, tasks):
+        # 间隔无效的任务没有下次触发时间，跳过即可，不能让一次性迁移中断启动
+        intervals = {}
+        for task in tasks:
+            record = TaskRecord.compile(task)
+            if record.seconds is not None:
+                intervals[record.id] = record.seconds
+        self._transaction([(
+            "INSERT OR REPLACE INTO fire_state (id, last_fired, next_fire) VALUES (?, ?, ?)",
+            (str(task_id), t, t + intervals[task_id])
+        ) for task_id, t in state.items() if task_id in intervals])
+
+    def forget(self, task_id):
+        self._transaction([("DELETE FROM fire_state WHERE id = ?", (str(task_id),))])
+
+    def close(self):
+        # 连接与 ConfigManager 共享，调度线程退出时不关闭
+        pass
+
+
+class ConfigManager:
+    """配置存储：config.json 快照 + config.journal 追加日志
+
+    每次编辑任务只向日志追加一行（upsert / delete），开销与改动大小成正比；
+    load 时先读快照再按顺序重放日志。日志条目超过 COMPACT_THRESHOLD 时，
+    把完整数据写入临时文件后原子替换快照并清空日志，写到一半崩溃也不会损坏 config.json。
+    设置 "storage": "sqlite" 后任务改存到 tasks.db，首次加载时自动从 config.json 迁移。
+    """
+    COMPACT_THRESHOLD = 200
+    _journal_entries = 0
+    store = None # 启用 SQLite 存储时的 SqliteTaskStore，此时 config.json 只保存设置
+    known_hash = None # 本进程最后一次读取或写入的 config.json 内容哈希，用来识别外部修改
+
+    @staticmethod
+    def config_signature():
+        """config.json 的 (mtime, 大小)，用于低成本地判断文件是否可能被修改；文件不存在时返回 None"""
+        try:
+            st = os.stat(CONFIG_FILE)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def _file_hash():
+        try:
+            with open(CONFIG_FILE, 'rb') as f:
+                return hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    @staticmethod
+    def changed_externally():
+        """config.json 的内容与本进程最后一次读取或写入的不同（被外部脚本、同步盘等修改过）"""
+        if not os.path.exists(CONFIG_FILE):
+            return False
+        return ConfigManager._file_hash() != ConfigManager.known_hash
+
+    @staticmethod
+    @CONFIG_LOAD_SECONDS.time()
+    def load(strict=False):
+        """载入配置快照并重放日志；strict=True（运行中重新载入）时解析失败直接抛出 ValueError，
+        不移走文件，保持内存中的任务不变"""
+        if not os.path.exists(CONFIG_FILE) and not os.path.exists(JOURNAL_FILE):
+            default_config = {"tasks": []}
+            ConfigManager.save(default_config)
+            return default_config
+
+        data = {"tasks": []}
+        if os.path.exists(CONFIG_FILE):
+            try:
+                with open(CONFIG_FILE, 'rb') as f:
+                    raw = f.read()
+                data = json.loads(raw.decode('utf-8'))
+                if not isinstance(data, dict):
+                    raise ValueError("顶层必须是对象")
+                ConfigManager.known_hash = hashlib.sha1(raw).hexdigest()
+            except Exception as e:
+                if strict:
+                    raise ValueError(f"解析 config.json 失败: {e}")
+                # 保留损坏的文件以便手工恢复，而不是在下次保存时悄悄覆盖
+                broken = f"{CONFIG_FILE}.broken-{int(time.time())}"
+                logging.error(f"加载配置失败: {e}，已另存为 {broken}")
+                try:
+                    os.replace(CONFIG_FILE, broken)
+                except OSError:
+                    pass
+                data = {"tasks": []}
+        data.setdefault("tasks", [])
+
+        torn = ConfigManager._replay_journal(data)
+        if torn:
+            # 日志末尾有写了一半的行，立即压缩，避免后续追加接在半行后面
+            ConfigManager.save(data)
+        if data.get("storage") == "sqlite":
+            if ConfigManager.store is None:
+                ConfigManager._open_sqlite(data)
+            else:
+                ConfigManager._merge_into_store(data, strict)
+        return data
+
+    @staticmethod
+    def _merge_into_store(data, strict):
+        """运行中重新载入（SQLite 模式）：任务以数据库为准
+
+        config.json 此时只保存设置；脚本或同步工具写进其中 tasks 的任务按 id 新增或覆盖到数据库
+        （与首次迁移相同），随后 config.json 恢复为只有设置。删除任务需要通过界面、指令或本地接口。
+        """
+        if data["tasks"]:
+            try:
+                ConfigManager.store.apply([{"op": "upsert", "task": t} for t in data["tasks"]])
+            except Exception as e:
+                if strict:
+                    raise ValueError(f"把 config.json 中的任务写入数据库失败: {e}")
+                logging.error(f"把 config.json 中的任务写入数据库失败: {e}")
+            else:
+                logging.info(f"已把 config.json 中的 {len(data['tasks'])} 个任务合并进数据库")
+                ConfigManager.save(data)
+        data["tasks"] = ConfigManager.store.all_tasks()
+
+    @staticmethod
+    def _open_sqlite(data):
+        try:
+            store = SqliteTaskStore()
+        except Exception as e:
+            logging.error(f"打开任务数据库失败: {e}，继续使用 config.json")
+            return
+        if data["tasks"]:
+            # 一次性迁移：任务写入数据库后，config.json 只保留设置
+            store.apply([{"op": "upsert", "task": t} for t in data["tasks"]])
+            if os.path.exists(STATE_FILE):
+                store.import_state(SchedulerStateLog().load(), data["tasks"])
+                os.replace(STATE_FILE, STATE_FILE + ".migrated")
+            ConfigManager.store = store
+            ConfigManager.save(data)
+        ConfigManager.store = store
+        data["tasks"] = store.all_tasks()
+
+    @staticmethod
+    def open_state_log():
+        """调度状态存储：SQLite 模式下与任务共用数据库，否则使用追加日志"""
+        if ConfigManager.store is not None:
+            return ConfigManager.store
+        return SchedulerStateLog()
+
+    @staticmethod
+    def _replay_journal(data):
+        ConfigManager._journal_entries = 0
+        if not os.path.exists(JOURNAL_FILE):
+            return False
+        tasks = data["tasks"]
+        index = {t.get("id"): i for i, t in enumerate(tasks)}
+        torn = False
+        try:
+            with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        torn = True
+                        continue
+                    # 一次写入的多条编辑合并在同一行（batch），整行写完才生效
+                    batch = entry.get("entries", []) if entry.get("op") == "batch" else [entry]
+                    for entry in batch:
+                        ConfigManager._journal_entries += 1
+                        if entry.get("op") == "upsert":
+                            task = entry["task"]
+                            i = index.get(task.get("id"))
+                            if i is None:
+                                index[task.get("id")] = len(tasks)
+                                tasks.append(task)
+                            else:
+                                tasks[i] = task
+                        elif entry.get("op") == "delete":
+                            i = index.pop(entry.get("id"), None)
+                            if i is not None:
+                                tasks[i] = None
+        except Exception as e:
+            logging.error(f"重放配置日志失败: {e}")
+        data["tasks"] = [t for t in tasks if t is not None]
+        return torn
+
+    @staticmethod
+    @CONFIG_WRITE_SECONDS.time()
+    def append_entries(data, entries):
+        """写入一批编辑；写入数据库失败时抛出异常，由调用方保留这些编辑稍后重试"""
+        if ConfigManager.store is not None:
+            ConfigManager.store.apply(entries)
+            return
+        try:
+            # 多条编辑写成一行，崩溃时要么整批生效要么整批丢弃，不会只重放一半
+            line = entries[0] if len(entries) == 1 else {"op": "batch", "entries": entries}
+            with open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            ConfigManager._journal_entries += len(entries)
+        except Exception as e:
+            logging.error(f"写入配置日志失败: {e}")
+            ConfigManager.save(data)
+            return
+        if ConfigManager._journal_entries >= ConfigManager.COMPACT_THRESHOLD:
+            ConfigManager.save(data)
+
+    @staticmethod
+    def record_upsert(data, task):
+        """data 已包含改动，这里只追加一条日志"""
+        ConfigManager.append_entries(data, [{"op": "upsert", "task": task}])
+
+    @staticmethod
+    def record_delete(data, task_id):
+        ConfigManager.append_entries(data, [{"op": "delete", "id": task_id}])
+
+    @staticmethod
+    @CONFIG_SAVE_SECONDS.time()
+    def save(data):
+        """写完整快照（临时文件 + 原子替换），并清空日志
+
+        config.json 被外部修改且尚未重新载入时不覆盖它，编辑继续保留在日志中，
+        等 ConfigWatcher 重新载入（外部修改 + 日志重放）之后再压缩。
+        """
+        if ConfigManager.changed_externally():
+            logging.warning("config.json 已被外部修改，暂不覆盖，等待重新载入")
+            return False
+        tmp_path = CONFIG_FILE + ".tmp"
+        # 引擎传入的任务是不可变快照，这里只需转换回字典
+        data = dict(data)
+        tasks = data.get("tasks", [])
+        data["tasks"] = [TaskRecord.plain(t) for t in tasks] if ConfigManager.store is None else []
+        try:
+            raw = json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8')
+            with open(tmp_path, 'wb') as f:
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, CONFIG_FILE)
+            ConfigManager.known_hash = hashlib.sha1(raw).hexdigest()
+            if os.path.exists(JOURNAL_FILE):
+                os.remove(JOURNAL_FILE)
+            ConfigManager._journal_entries = 0
+            return True
+        except Exception as e:
+            logging.error(f"保存配置失败: {e}")
+            return False
+
+class SaveWorker(threading.Thread):
+    """后台持久化线程，让磁盘延迟不再影响 UI
+
+    编辑先按任务 id 合并（同一任务只保留最后一次操作），距最后一次编辑 debounce 秒
+    （最长不超过 max_delay 秒）后一次性写入日志。pending_writes 为尚未落盘的编辑数，
+    退出前调用 flush() 确保全部写完。写入失败（例如数据库被锁）时编辑放回队列，retry_delay 秒后重试。
+    """
+    def __init__(self, debounce=0.5, max_delay=3.0, retry_delay=5.0):
+        super().__init__(daemon=True)
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self.cond = threading.Condition()
+        self.pending = {} # task_id -> 日志条目
+        self.data = None
+        self.first_edit_at = 0.0
+        self.last_edit_at = 0.0
+        self.writing = 0
+        self.flush_requested = False
+        self.running = True
+
+    @property
+    def pending_writes(self):
+        with self.cond:
+            return len(self.pending) + self.writing
+
+    @staticmethod
+    def _entry_id(entry):
+        return entry["task"]["id"] if entry["op"] == "upsert" else entry["id"]
+
+    def _submit(self, data, task_id, entry):
+        with self.cond:
+            now = time.monotonic()
+            if not self.pending:
+                self.first_edit_at = now
+            self.last_edit_at = now
+            self.pending.pop(task_id, None) # 重新插入以保持最后一次操作的顺序
+            self.pending[task_id] = entry
+            self.data = data
+            self.cond.notify_all()
+
+    def submit_upsert(self, data, task):
+        self._submit(data, task["id"], {"op": "upsert", "task": task})
+
+    def submit_delete(self, data, task_id):
+        self._submit(data, task_id, {"op": "delete", "id": task_id})
+
+    def submit_batch(self, data, entries):
+        """一次提交多条编辑，保证它们在同一次写入（同一个事务 / 同一行日志）中落盘"""
+        with self.cond:
+            for entry in entries:
+                self._submit(data, self._entry_id(entry), entry)
+
+    def flush(self, timeout=5.0):
+        """立即写入所有待保存的编辑，返回是否全部落盘"""
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            self.flush_requested = True
+            self.cond.notify_all()
+            while self.pending or self.writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.is_alive():
+                    break
+                self.cond.wait(remaining)
+            done = not self.pending and not self.writing
+        if not done and not self.is_alive():
+            # 线程没有运行（例如启动失败），直接在当前线程写入
+            done = self._write_pending()
+        return done
+
+    def stop(self):
+        self.flush()
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def _write_pending(self):
+        """写入所有待保存的编辑，返回是否成功；失败时编辑放回队列"""
+        with self.cond:
+            entries = list(self.pending.values())
+            data = self.data
+            self.pending = {}
+            self.writing = len(entries)
+            self.flush_requested = False
+        ok = True
+        try:
+            if entries:
+                with log_context(phase="save"):
+                    ConfigManager.append_entries(data, entries)
+        except Exception as e:
+            ok = False
+            logging.error(f"保存任务失败，{self.retry_delay:g} 秒后重试: {e}")
+        finally:
+            with self.cond:
+                if not ok:
+                    # 放回队列；写入期间同一任务又有新编辑的，以新编辑为准
+                    restored = {self._entry_id(e): e for e in entries if self._entry_id(e) not in self.pending}
+                    restored.update(self.pending)
+                    self.pending = restored
+                    self.data = self.data or data
+                self.writing = 0
+                self.cond.notify_all()
+        return ok
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.running and not self.pending:
+                    self.cond.wait()
+                if not self.pending:
+                    return
+                # 防抖：连续编辑期间继续等待，但不超过 max_delay
+                while self.running and not self.flush_requested:
+                    deadline = min(self.last_edit_at + self.debounce, self.first_edit_at + self.max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+            if not self._write_pending():
+                with self.cond:
+                    if not self.running:
+                        return # 退出时仍未写入的编辑由 engine.stop 记录
+                    self.cond.wait(self.retry_delay)
+
+class SchedulerStateLog:
+    """调度状态的追加日志，用于跨重启保留每个任务的上次触发时间
+
+    每行一条 JSON 记录 {"id": 任务id, "t": 上次触发时间}，t 为 null 表示任务已删除。
+    启动时逐行重放（后写覆盖先写）；进程崩溃时最多留下一行不完整的记录，重放时直接忽略。
+    记录数超过存活任务数的 compact_ratio 倍时，写临时文件再原子替换完成压缩。
+    """
+    def __init__(self, path=None, compact_ratio=4, min_compact=256):
+        self.path = path or STATE_FILE # 在创建时取模块级路径，测试可以把它指向临时目录
+        self.compact_ratio = compact_ratio
+        self.min_compact = min_compact
+        self.state = {}
+        self.lines = 0
+        self.file = None
+
+    def load(self):
+        self.state = {}
+        self.lines = 0
+        if os.path.exists(self.path):
+            try:
+                torn = False
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        self.lines += 1
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            torn = True # 崩溃时写了一半的行
+                            continue
+                        if record.get("t") is None:
+                            self.state.pop(record.get("id"), None)
+                        else:
+                            self.state[record.get("id")] = float(record["t"])
+                if torn:
+                    # 重写一份干净的日志，避免后续追加接在半行后面
+                    self.compact()
+            except Exception as e:
+                logging.error(f"加载调度状态失败: {e}")
+        return dict(self.state)
+
+    def _append(self, task_id, t):
+        try:
+            if self.file is None:
+                self.file = open(self.path, 'a', encoding='utf-8')
+            self.file.write(json.dumps({"id": task_id, "t": t}) + "\n")
+            self.file.flush()
+            self.lines += 1
+            if self.lines > max(self.min_compact, self.compact_ratio * len(self.state)):
+                self.compact()
+        except Exception as e:
+            logging.error(f"写入调度状态失败: {e}", extra={"task_id": task_id})
+
+    def record(self, task_id, t, next_due=None):
+        self.state[task_id] = t
+        self._append(task_id, t)
+
+    def forget(self, task_id):
+        if self.state.pop(task_id, None) is not None:
+            self._append(task_id, None)
+
+    def compact(self):
+        self.close()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for task_id, t in self.state.items():
+                f.write(json.dumps({"id": task_id, "t": t}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.lines = len(self.state)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+# ==========================================
+# 任务导入与导出（JSON Lines / CSV）
+# ==========================================
+class TaskTransfer:
+    """批量导入导出：逐行流式读写，不把整个文件读进内存
+
+    每一行按任务设置对话框的规则（validate_task）校验，不合法的行记入报告后跳过，不中断导入。
+    JSON Lines 每行一个任务对象；CSV 第一行是列名，需要 title、content、interval 三列，
+    id、schedule 可选（有 id 时覆盖同 id 的任务，否则作为新任务）。
+    导出的 CSV 带 BOM，Excel 可以直接打开中文。
+    """
+    FORMATS = ("jsonl", "csv")
+    CSV_FIELDS = ("id", "title", "content", "interval", "schedule")
+    MAX_REPORTED_ERRORS = 20 # 报告中最多列出的错误行数，其余只计数
+
+    @staticmethod
+    def detect_format(path, fmt=None):
+        fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+        fmt = "jsonl" if fmt == "ndjson" else fmt
+        if fmt not in TaskTransfer.FORMATS:
+            raise ValueError(f"无法识别的文件格式: {os.path.basename(path)}（支持 .jsonl 和 .csv）")
+        return fmt
+
+    @staticmethod
+    def iter_rows(path, fmt):
+        """逐行产出 (行号, 任务字典)；无法解析的行产出 (行号, ValueError)"""
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            if fmt == "csv":
+                reader = csv.DictReader(f)
+                missing = {"title", "content", "interval"} - set(reader.fieldnames or ())
+                if missing:
+                    raise ValueError(f"CSV 缺少列: {', '.join(sorted(missing))}")
+                for row in reader:
+                    yield reader.line_num, row
+                return
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield n, ValueError(f"JSON 格式错误: {e}")
+                    continue
+                if not isinstance(row, dict):
+                    yield n, ValueError("每一行必须是一个 JSON 对象")
+                    continue
+                yield n, row
+
+    @staticmethod
+    def _field(row, key):
+        value = row.get(key)
+        return "" if value is None else value
+
+    @staticmethod
+    def read(path, fmt=None):
+        """读取并校验文件，返回 (TaskRecord 列表, 报告)；同一 id 出现多次时以最后一行为准
+
+        报告为 {"rows", "imported", "invalid", "errors"}，errors 最多列出 MAX_REPORTED_ERRORS 行。
+        """
+        fmt = TaskTransfer.detect_format(path, fmt)
+        field = TaskTransfer._field
+        records = {}
+        report = {"rows": 0, "imported": 0, "invalid": 0, "errors": []}
+        for line, row in TaskTransfer.iter_rows(path, fmt):
+            report["rows"] += 1
+            try:
+                if isinstance(row, ValueError):
+                    raise row
+                task_id = field(row, "id")
+                record = TaskRecord.compile(validate_task(
+                    field(row, "title"), field(row, "content"), field(row, "interval"),
+                    task_id=str(task_id) if task_id != "" else None, schedule=row.get("schedule")
+                ))
+            except ValueError as e:
+                report["invalid"] += 1
+                if len(report["errors"]) < TaskTransfer.MAX_REPORTED_ERRORS:
+                    report["errors"].append(f"第 {line} 行: {e}")
+                continue
+            records[record.id] = record
+        report["imported"] = len(records)
+        return list(records.values()), report
+
+    @staticmethod
+    def write(tasks, path, fmt=None):
+        """把任务逐行写到临时文件后原子替换，返回写出的任务数"""
+        fmt = TaskTransfer.detect_format(path, fmt)
+        tmp_path = path + ".tmp"
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8-sig' if fmt == "csv" else 'utf-8', newline='') as f:
+            if fmt == "csv":
+                writer = csv.writer(f)
+                writer.writerow(TaskTransfer.CSV_FIELDS)
+                for task in tasks:
+                    writer.writerow([TaskTransfer._field(task, key) for key in TaskTransfer.CSV_FIELDS])
+                    count += 1
+            else:
+                for task in tasks:
+                    f.write(json.dumps(TaskRecord.plain(task), ensure_ascii=False) + "\n")
+                    count += 1
+        os.replace(tmp_path, path)
+        return count
+
+    @staticmethod
+    def summarize(report):
+        """导入报告的文字说明（命令行和界面共用）"""
+        lines = [f"导入 {report['imported']} 个任务（共 {report['rows']} 行，{report['invalid']} 行不合法已跳过）"]
+        lines += report["errors"]
+        if report["invalid"] > len(report["errors"]):
+            lines.append(f"……另有 {report['invalid'] - len(report['errors'])} 行错误未列出")
+        return "\n".join(lines)
+
+# ==========================================
+# 任务调度与通知引擎
+# ==========================================
+class Notifier:
+    """通知后端接口：notify 可以很慢甚至阻塞，由派发线程池负责隔离"""
+    def notify(self, title, content):
+        raise NotImplementedError
+
+
+class ToastNotifier(Notifier):
+    """Windows 原生通知（win11toast）"""
+    def notify(self, title, content):
+        with STARTUP.timed_import("win11toast"):
+            from win11toast import toast
+        toast(title, content, app_id=APP_NAME)
+
+
+class ConsoleNotifier(Notifier):
+    """把提醒打印到标准输出，用于没有 Windows 通知中心的环境（如 Linux 上的 headless 引擎）"""
+    def notify(self, title, content):
+        print(f"[{time.strftime('%H:%M:%S')}] {title}: {content}", flush=True)
+
+
+def default_notifier():
+    return ToastNotifier() if sys.platform == "win32" else ConsoleNotifier()
+
+
+class MemoryNotifier(Notifier):
+    """内存中的假通知后端：只记录收到的通知，可模拟慢速后端，便于在 Linux 上验证派发流程"""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = [] # (title, content, time)
+        self.lock = threading.Lock()
+
+    def notify(self, title, content):
+        if self.delay:
+            time.sleep(self.delay)
+        with self.lock:
+            self.sent.append((title, content, time.time()))
+
+
+GROUP_DETAIL = 3 # 合并的提醒不超过这个数时保留每条提醒的内容
+
+def group_notification(items, limit=5):
+    """多条提醒合并成一条通知，返回 (标题, 内容)
+
+    items 为 [(标题, 内容)]；条数不多时每行列出「标题：内容」，否则只列标题，最多列出 limit 个任务。
+    """
+    detail = len(items) <= GROUP_DETAIL
+    lines = [f"{title}：{content}" if detail else title for title, content in items[:limit]]
+    if len(items) > limit:
+        lines.append(f"……另外 {len(items) - limit} 个")
+    return f"{len(items)} 个提醒同时到期", "\n".join(lines)
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 个令牌，最多积攒 burst 个（允许的突发数）"""
+    def __init__(self, rate, burst=1, clock=time.monotonic):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"限流参数无效: rate={rate}, burst={burst}")
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.clock = clock
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def take(self):
+        """取一个令牌，返回需要等待的秒数；令牌不足时预支，调用方等待这段时间后即视为已取得"""
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class NotificationDispatcher:
+    """有界的通知派发线程池
+
+    调度线程只负责 submit，真正的 notify 在工作线程中执行。队列满时按 policy 处理：
+      - "queue":       等待最多 block_timeout 秒（对调度线程施加背压），仍然满则丢弃
+      - "drop_new":    直接丢弃新提醒
+      - "drop_oldest": 丢弃队列中最旧的提醒，为新提醒腾出位置
+    每条提醒有 timeout 秒的有效期，排队超时的提醒不再弹出（过期的提醒没有意义）。
+    单次 notify 超过 notify_timeout 秒仍未返回时，监视线程放弃这个工作线程（记为 timed_out）
+    并补上一个新的，卡死的通知后端不会让后续提醒全部停摆。
+
+    rate 不为空时按令牌桶限制弹出通知的频率（每秒 rate 条，最多连续 burst 条）：
+    工作线程等到令牌后取走队列中积压的全部提醒，合并成一条汇总通知，等待期间不会丢弃提醒。
+    """
+    POLICIES = ("queue", "drop_new", "drop_oldest")
+
+    def __init__(self, notifier, workers=4, max_pending=100, timeout=60,
+                 policy="drop_oldest", block_timeout=0.5, rate=None, burst=5, notify_timeout=30):
+        if policy not in self.POLICIES:
+            raise ValueError(f"未知的派发策略: {policy}")
+        self.notifier = notifier
+        self.workers = workers
+        self.timeout = timeout
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.throttle_lock = threading.Lock() # 同一时间只有一个工作线程在等令牌并合并积压
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.threads = []
+        self.thread_ids = itertools.count()
+        self.notify_timeout = notify_timeout
+        self.busy = {} # 正在 notify 的工作线程 -> (截止时间, 提醒数)
+        self.busy_changed = threading.Condition()
+        self.stopping = False
+        self.stats = {"submitted": 0, "delivered": 0, "dropped": 0, "expired": 0, "failed": 0,
+                      "timed_out": 0, "notifications": 0, "coalesced": 0, "throttled": 0}
+        self.stats_lock = threading.Lock()
+
+    def _count(self, key, n=1):
+        with self.stats_lock:
+            self.stats[key] += n
+
+    @property
+    def pending(self):
+        return self.jobs.qsize()
+
+    def start(self):
+        if self.threads:
+            return
+        for _ in range(self.workers):
+            self._spawn()
+        if self.notify_timeout:
+            threading.Thread(target=self._watch, name="notify-watchdog", daemon=True).start()
+
+    def _spawn(self):
+        t = threading.Thread(target=self._worker, name=f"notify-{next(self.thread_ids)}", daemon=True)
+        t.start()
+        self.threads.append(t)
+
+    def stop(self):
+        with self.busy_changed:
+            self.stopping = True
+            self.busy_changed.notify()
+        for _ in self.threads:
+            try:
+                self.jobs.put_nowait(None)
+            except queue.Full:
+                break # 工作线程都是守护线程，队列满时直接放弃等待
+
+    def submit(self, task):
+        """提交一条提醒，返回是否成功入队；永远不会无限期阻塞调用方"""
+        job = (
+            time.time() + self.timeout,
+            task.get("title", "提醒"),
+            task.get("content", "时间到了！"),
+            time.perf_counter(),
+            task.get("id"),
+        )
+        self._count("submitted")
+        try:
+            if self.policy == "queue":
+                self.jobs.put(job, timeout=self.block_timeout)
+            else:
+                self.jobs.put_nowait(job)
+            return True
+        except queue.Full:
+            pass
+
+        if self.policy == "drop_oldest":
+            try:
+                self.jobs.get_nowait()
+                self._count("dropped")
+                self.jobs.put_nowait(job)
+                return True
+            except (queue.Empty, queue.Full):
+                pass
+        self._count("dropped")
+        logging.error(f"通知队列已满，丢弃提醒: {job[1]}", extra={"task_id": job[4]})
+        return False
+
+    def _worker(self):
+        with log_context(phase="notify"):
+            self._work()
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            if self.bucket is None:
+                jobs = [job]
+            else:
+                with self.throttle_lock:
+                    wait = self.bucket.take()
+                    if wait > 0:
+                        self._count("throttled")
+                        time.sleep(wait)
+                    jobs = [job] + self._drain()
+            if not self._deliver(jobs):
+                break # notify 超时后本线程已被放弃，由补上的新线程继续工作
+
+    def _watch(self):
+        """只在有 notify 正在执行时按最早的截止时间醒来，空闲时一直等待"""
+        with log_context(phase="notify"):
+            while True:
+                with self.busy_changed:
+                    if self.stopping:
+                        return
+                    now = time.monotonic()
+                    deadline = min((d for d, _ in self.busy.values()), default=None)
+                    if deadline is None or deadline > now:
+                        self.busy_changed.wait(None if deadline is None else deadline - now)
+                        continue
+                    stuck = [t for t, (d, _) in self.busy.items() if d <= now]
+                    jobs = sum(self.busy.pop(t)[1] for t in stuck)
+                for t in stuck:
+                    self.threads.remove(t)
+                    self._spawn()
+                self._count("timed_out", jobs)
+                logging.error(f"发送通知超过 {self.notify_timeout} 秒没有返回，已放弃 {len(stuck)} 个工作线程")
+
+    def _drain(self):
+        """取走队列中积压的提醒（遇到退出标记时放回去，留给其他工作线程）"""
+        jobs = []
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                return jobs
+            if job is None:
+                self.jobs.put(None)
+                return jobs
+            jobs.append(job)
+
+    def _deliver(self, jobs):
+        """发送一条（或合并后的一条）通知；本线程因超时被放弃时返回 False"""
+        started = time.perf_counter()
+        now = time.time()
+        live = []
+        for job in jobs:
+            NOTIFY_WAIT.observe(started - job[3])
+            if now > job[0]:
+                self._count("expired")
+            else:
+                live.append(job)
+        if not live:
+            return True
+        if len(live) == 1:
+            _, title, content, _, task_id = live[0]
+        else:
+            title, content = group_notification([(job[1], job[2]) for job in live])
+            task_id = None
+            self._count("coalesced", len(live) - 1)
+        me = threading.current_thread()
+        if self.notify_timeout:
+            with self.busy_changed:
+                self.busy[me] = (time.monotonic() + self.notify_timeout, len(live))
+                self.busy_changed.notify()
+        try:
+            self.notifier.notify(title, content)
+            error = None
+        except Exception as e:
+            error = e
+        if self.notify_timeout:
+            with self.busy_changed:
+                if self.busy.pop(me, None) is None:
+                    return False # 已经计入 timed_out
+        if error is None:
+            NOTIFY_SECONDS.observe(time.perf_counter() - started)
+            self._count("notifications")
+            self._count("delivered", len(live))
+        else:
+            self._count("failed", len(live))
+            logging.error(f"发送通知失败: {error}", extra={"task_id": task_id})
+        return True
+
+
+if hasattr(time, "CLOCK_BOOTTIME"):
+    def monotonic_clock():
+        """包含系统休眠时间的单调时钟（Linux 的 CLOCK_MONOTONIC 在休眠期间暂停计时）"""
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+else:
+    monotonic_clock = time.monotonic # Windows 的单调时钟本身包含休眠时间
+
+
+class ScheduleQueue:
+    """按下次触发时间排序的最小堆
+
+    每个任务在堆中只有一个有效条目；重新调度或删除时把旧条目标记为失效（惰性删除），
+    因此 push / remove 都是 O(log n)，取到期任务只触碰真正到期的条目。
+    """
+    _REMOVED = object()
+
+    def __init__(self):
+        self._heap = []      # [due, seq, task_id]
+        self._entries = {}   # task_id -> 当前有效条目
+        self._seq = itertools.count()
+        self._stale = 0      # 堆中已失效条目数
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, task_id):
+        return task_id in self._entries
+
+    def push(self, task_id, due):
+        if task_id in self._entries:
+            self.remove(task_id)
+        entry = [due, next(self._seq), task_id]
+        self._entries[task_id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, task_id):
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return
+        entry[-1] = self._REMOVED
+        self._stale += 1
+        # 失效条目过多时重建堆，避免频繁编辑导致堆无限膨胀
+        if self._stale > 64 and self._stale > len(self._entries):
+            self._heap = [e for e in self._heap if e[-1] is not self._REMOVED]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def clear(self):
+        self._heap.clear()
+        self._entries.clear()
+        self._stale = 0
+
+    def peek_due(self):
+        """返回最早的触发时间，没有任务时返回 None"""
+        heap = self._heap
+        while heap and heap[0][-1] is self._REMOVED:
+            heapq.heappop(heap)
+            self._stale -= 1
+        return heap[0][0] if heap else None
+
+    def due_of(self, task_id):
+        """任务当前的触发时间，不在堆中时返回 None"""
+        entry = self._entries.get(task_id)
+        return None if entry is None else entry[0]
+
+    def smallest(self, n):
+        """返回最早到期的 n 个任务 [(due, task_id)]，不修改堆"""
+        return [(e[0], e[-1]) for e in heapq.nsmallest(n, self._entries.values())]
+
+    def pop_due(self, now):
+        """弹出所有触发时间 <= now 的任务 [(due, task_id)]"""
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            task_id = entry[-1]
+            if task_id is self._REMOVED:
+                self._stale -= 1
+                continue
+            del self._entries[task_id]
+            due.append((entry[0], task_id))
+        return due
+
+
+class TaskScheduler(threading.Thread):
+    """调度线程：阻塞等待下一个到期时间或新的指令，空闲时不做任何轮询
+
+    任务的增删改和“试一下”都通过 task_queue 投递给调度线程处理，
+    因此调度堆只在本线程内访问，无需加锁。
+
+    排期固定在每个任务自己的相位上：下次触发时间 = 本次计划时间 + 间隔，而不是实际触发时间
+    + 间隔，唤醒稍晚也不会累积漂移。调度堆使用 monotonic 时钟（包含休眠时间），
+    clock（墙上时间）只用于持久化和对外显示，两者的差值在每次唤醒时重新测量：
+      - 系统时间被调整（差值变化超过 CLOCK_JUMP_TOLERANCE 秒）：提醒仍按实际经过的时间触发，
+        不会因为时间往前调而连续触发，也不会因为往后调而长时间沉默；
+      - 休眠或长时间卡顿后到期时间已落后一个完整间隔以上：与程序关闭期间错过的提醒一样，
+        按 catch_up 策略处理。
+
+    state_log 用于持久化上次触发的计划时间（相位）；错过的提醒按 catch_up 策略处理：
+      - "once":     立即补发一次，之后从现在重新计时
+      - "skip":     不补发，按原有节奏等待下一次
+      - "coalesce": 合并为一条提醒（注明错过次数）立即补发，之后保持原有节奏
+
+    通知风暴控制（大量任务同时到期，例如批量导入的同间隔任务）：
+      - coalesce_window > 0 时（默认关闭），有任务到期就把之后 coalesce_window 秒内到期的任务一并提前触发，
+        合并成一条汇总通知（订阅者仍逐个收到 fired 事件，各任务的相位不变）；
+      - stagger > 0 时，新任务的首次触发在 stagger 秒内按任务 id 确定性地错开，
+        同时创建的同间隔任务从此分散在不同相位上，且每次启动结果一致。
+
+    clock / monotonic 为返回当前时间的函数，基准测试中两者都替换为同一个虚拟时钟，
+    并直接调用 handle_message / fire_due 驱动调度而不启动线程（fire_due 的参数是 monotonic 时间）。
+    """
+    CATCH_UP_POLICIES = ("once", "skip", "coalesce")
+    CLOCK_JUMP_TOLERANCE = 1.0 # 秒；更小的差异视为时钟校准的正常误差
+    MAX_MISSED = 1000 # 按规则提醒的任务补发时最多逐个计算的错过次数
+    # 有任务时每次最多等待的秒数：等待超时所用的时钟在系统休眠期间暂停（Linux 的 CLOCK_MONOTONIC、
+    # Windows 8 之后的 Wait* 超时），只靠到期时间计算超时的话，唤醒后还要把剩余的等待睡完才能发现错过的提醒
+    MAX_WAIT = 60.0
+
+    def __init__(self, task_queue, dispatcher=None, state_log=None, catch_up="once", on_fire=None,
+                 clock=time.time, monotonic=monotonic_clock, coalesce_window=0.0, stagger=0.0):
+        super().__init__(daemon=True)
+        self.coalesce_window = coalesce_window
+        self.stagger = stagger
+        self.task_queue = task_queue
+        self.clock = clock
+        self.monotonic = monotonic
+        self.offset = clock() - monotonic() # 墙上时间 - monotonic 时间
+        self.dispatcher = dispatcher if dispatcher is not None else NotificationDispatcher(default_notifier())
+        self.on_fire = on_fire # on_fire(task, fired_at)：在调度线程中调用，必须立即返回
+        self.running = True
+        self.tasks = {} # task_id -> TaskRecord（间隔已换算成秒）
+        self.rule_tasks = set() # 按 schedule 规则（日历时间）提醒的任务
+        self.last_triggered = {} # task_id -> 上次触发的计划时间（墙上时间）
+        self.schedule = ScheduleQueue() # 到期时间为 monotonic 时间
+        # 唤醒计数：idle 表示既没有到期任务也没有新指令的空转唤醒；
+        # clock_jumps 为检测到的系统时间调整次数，catch_ups 为休眠 / 卡顿后按补发策略处理的提醒数，
+        # coalesced 为合并进汇总通知的提醒数
+        self.stats = {"wakeups": 0, "due": 0, "command": 0, "idle": 0, "clock_jumps": 0, "catch_ups": 0,
+                      "coalesced": 0}
+        self.armed_at = None # 第一次载入任务列表的时间 (perf_counter)，用于启动耗时报告
+
+        if catch_up not in self.CATCH_UP_POLICIES:
+            logging.error(f"未知的补发策略: {catch_up}，改用 once")
+            catch_up = "once"
+        self.catch_up = catch_up
+        self.state_log = state_log
+        self.restored = set() # 从状态日志恢复、尚未排期的任务
+        self.missed = {} # task_id -> (错过次数, 补发后的下次触发时间)
+        if state_log is not None:
+            self.last_triggered = state_log.load()
+            self.restored = set(self.last_triggered)
+
+    def update_tasks(self, tasks):
+        """全量替换任务列表（只对新增、变化和删除的任务重新调度）
+
+        传入的 TaskSnapshot 不可变，直接交给调度线程，不需要复制。
+        """
+        if not isinstance(tasks, TaskSnapshot):
+            tasks = list(tasks)
+        self.task_queue.put({"type": "replace", "tasks": tasks})
+
+    def upsert_task(self, task):
+        """新增或修改单个任务，O(log n)"""
+        self.task_queue.put({"type": "upsert", "task": task})
+
+    def remove_task(self, task_id):
+        """删除单个任务，O(log n)"""
+        self.task_queue.put({"type": "remove", "id": task_id})
+
+    def apply_batch(self, tasks, removed_ids):
+        """一条指令内完成多个任务的增删，调度线程一次处理完"""
+        self.task_queue.put({"type": "batch", "tasks": list(tasks), "removed": list(removed_ids)})
+
+    def next_due(self, limit=10):
+        """查询最近到期的任务，返回 Future，结果为 [(due, task)]
+
+        查询也作为指令交给调度线程处理，调用方不需要等待（可以用 asyncio.wrap_future 挂起）。
+        """
+        future = concurrent.futures.Future()
+        self.task_queue.put({"type": "next_due", "limit": limit, "future": future})
+        return future
+
+    def stop(self):
+        self.running = False
+        self.task_queue.put({"type": "stop"})
+        self.dispatcher.stop()
+
+    def _schedule_task(self, task, now):
+        """now 为 monotonic 时间"""
+        record = TaskRecord.compile(task) # 引擎传来的已是编译好的记录，这里不做任何解析
+        task_id = record.id
+        interval = record.seconds
+        rule = record.rule
+        if record.schedule and rule is None:
+            logging.error(f"提醒规则无效，不会提醒: {record.schedule}", extra={"task_id": task_id})
+            self._unschedule_task(task_id)
+            return
+        if rule is None and interval is None:
+            logging.error(f"任务间隔无效，不会提醒: {record.interval}", extra={"task_id": task_id})
+            self._unschedule_task(task_id)
+            return
+        self.tasks[task_id] = record
+        wall_now = now + self.offset
+        if rule is not None:
+            # 按规则提醒：重启时从上次触发起算（以便按 catch_up 补发），其余情况从现在起算
+            self.rule_tasks.add(task_id)
+            last = self.last_triggered.get(task_id)
+            due = rule.next_after(last if task_id in self.restored and last is not None else wall_now)
+        else:
+            # 新任务从现在开始计时（可按 id 错开）；已有任务沿用上次触发的相位，仅按新间隔重新排期
+            self.rule_tasks.discard(task_id)
+            if task_id not in self.last_triggered:
+                anchor = wall_now + self._stagger_offset(task_id, interval)
+                self.last_triggered[task_id] = anchor
+                if self.state_log is not None:
+                    self.state_log.record(task_id, anchor, anchor + interval)
+            due = self.last_triggered[task_id] + interval
+
+        if task_id in self.restored:
+            self.restored.discard(task_id)
+            if due is not None and due < wall_now:
+                due = self._catch_up(record, due, wall_now)
+        if due is None:
+            logging.warning(f"提醒规则之后不会再触发: {record.schedule}", extra={"task_id": task_id})
+            self.schedule.remove(task_id)
+            return
+        self.schedule.push(task_id, due - self.offset)
+
+    def _stagger_offset(self, task_id, interval):
+        """按任务 id 的哈希在 [0, stagger) 内取一个固定的偏移（不超过间隔本身）"""
+        if self.stagger <= 0:
+            return 0.0
+        return zlib.crc32(str(task_id).encode("utf-8")) / 2 ** 32 * min(self.stagger, interval)
+
+    def _catch_up(self, record, due, now):
+        """处理程序关闭期间错过的提醒（due 为错过的第一次），返回本次排期的触发时间（均为墙上时间）"""
+        missed, slot, next_due = self._occurrences(record, due, now)
+        if self.catch_up == "skip":
+            self.last_triggered[record.id] = slot
+            if self.state_log is not None:
+                self.state_log.record(record.id, slot, next_due)
+            return next_due
+        if self.catch_up == "coalesce":
+            self.missed[record.id] = (missed, next_due)
+        return now
+
+    def _occurrences(self, record, due, now):
+        """从 due（已错过）到 now 之间应触发的次数，以及最后一次错过的计划时间和 now 之后的
+        第一次触发时间（均为墙上时间；规则不再触发时后者为 None）"""
+        if record.rule is None:
+            interval = record.seconds
+            missed = int((now - due) // interval) + 1
+            next_due = due + missed * interval
+            return missed, next_due - interval, next_due
+        rule = record.rule
+        missed, t = 1, rule.next_after(due)
+        while t is not None and t <= now:
+            if missed >= self.MAX_MISSED: # 例如每分钟一次的规则休眠了好几天：不再逐个数
+                t = rule.next_after(now)
+                break
+            missed += 1
+            t = rule.next_after(t)
+        return missed, now, t
+
+    @staticmethod
+    def _missed_note(task, missed):
+        return dict(task, content=f"{task.get('content', '时间到了！')}（错过了 {missed} 次）")
+
+    def _unschedule_task(self, task_id):
+        self.tasks.pop(task_id, None)
+        self.rule_tasks.discard(task_id)
+        self.last_triggered.pop(task_id, None)
+        self.restored.discard(task_id)
+        self.missed.pop(task_id, None)
+        self.schedule.remove(task_id)
+        if self.state_log is not None:
+            self.state_log.forget(task_id)
+
+    def _replace_tasks(self, tasks, now):
+        new_ids = set()
+        for task in tasks:
+            record = TaskRecord.compile(task)
+            new_ids.add(record.id)
+            current = self.tasks.get(record.id)
+            if current is None or (current is not record and current != record):
+                self._schedule_task(record, now)
+        for task_id in list(self.tasks) + list(self.restored):
+            if task_id not in new_ids:
+                self._unschedule_task(task_id)
+
+    def handle_message(self, msg):
+        msg_type = msg["type"]
+        logging.debug("调度指令: %s", msg_type)
+        if msg_type == "test_trigger":
+            self.trigger_task(msg["task"])
+        elif msg_type == "upsert":
+            self._schedule_task(msg["task"], self.monotonic())
+        elif msg_type == "remove":
+            self._unschedule_task(msg["id"])
+        elif msg_type == "replace":
+            self._replace_tasks(msg["tasks"], self.monotonic())
+            if self.armed_at is None:
+                self.armed_at = time.perf_counter()
+        elif msg_type == "batch":
+            now = self.monotonic()
+            for task_id in msg["removed"]:
+                self._unschedule_task(task_id)
+            for task in msg["tasks"]:
+                self._schedule_task(task, now)
+        elif msg_type == "next_due":
+            offset = self.offset
+            result = [(due + offset, self.tasks[task_id]) for due, task_id in self.schedule.smallest(msg["limit"])]
+            msg["future"].set_result(result)
+
+    def sync_clocks(self):
+        """重新测量墙上时间与 monotonic 时间的差值，检测系统时间调整
+
+        按间隔提醒的任务在调度堆中不受影响，只把保存的相位（墙上时间）平移同样的量；
+        按规则提醒的任务跟随日历时间，按新的时间重新求下一次触发。
+        """
+        offset = self.clock() - self.monotonic()
+        delta = offset - self.offset
+        self.offset = offset
+        if abs(delta) > self.CLOCK_JUMP_TOLERANCE:
+            self.stats["clock_jumps"] += 1
+            logging.warning(f"检测到系统时间调整 {delta:+.1f} 秒，间隔提醒仍按实际经过的时间触发")
+            for task_id in self.last_triggered:
+                if task_id not in self.rule_tasks:
+                    self.last_triggered[task_id] += delta
+            self._reschedule_rules(offset - delta)
+        return delta
+
+    def _reschedule_rules(self, old_offset):
+        now = self.monotonic()
+        wall_now = now + self.offset
+        for task_id in self.rule_tasks:
+            due = self.schedule.due_of(task_id)
+            if due is None:
+                continue
+            if due + old_offset <= wall_now:
+                self.schedule.push(task_id, now) # 时间往前调而越过的提醒立即触发
+                continue
+            # 时间往后调：已经触发过的时刻不再重复
+            after = max(wall_now, self.last_triggered.get(task_id, wall_now))
+            next_due = self.tasks[task_id].rule.next_after(after)
+            if next_due is None:
+                self.schedule.remove(task_id)
+            else:
+                self.schedule.push(task_id, next_due - self.offset)
+
+    def fire_due(self, now):
+        """触发所有到期任务，now 为 monotonic 时间"""
+        fired = []
+        offset = self.offset
+        stalled = 0.0
+        horizon = now
+        if self.coalesce_window > 0:
+            first = self.schedule.peek_due()
+            if first is not None and first <= now:
+                horizon = now + self.coalesce_window # 合并窗口内即将到期的任务一起提前触发
+        for due, task_id in self.schedule.pop_due(horizon):
+            late = now - due
+            if late >= 0:
+                FIRE_LATENESS.observe(late) # 合并窗口提前触发的任务不算延迟
+            task = self.tasks[task_id]
+            slot = due # 本次触发对应的计划时间，下一次从这里起算
+            if task.rule is None:
+                next_due = due + task.seconds
+            else:
+                next_due = task.rule.next_after(due + offset)
+                next_due = None if next_due is None else next_due - offset
+            if task_id in self.missed:
+                missed, next_wall = self.missed.pop(task_id)
+                next_due = None if next_wall is None else next_wall - offset
+                task = self._missed_note(task, missed)
+            elif next_due is not None and next_due <= now:
+                # 落后一个完整周期以上（休眠或长时间卡顿）：按补发策略处理，不连续补发
+                missed, slot_wall, next_wall = self._occurrences(task, due + offset, now + offset)
+                stalled = max(stalled, late)
+                self.stats["catch_ups"] += 1
+                if self.catch_up == "once" and task.rule is None:
+                    slot, next_due = now, now + task.seconds # 间隔提醒从现在重新计时
+                else:
+                    slot = now if self.catch_up == "once" else slot_wall - offset
+                    next_due = None if next_wall is None else next_wall - offset
+                    if self.catch_up == "skip":
+                        task = None
+                    elif self.catch_up == "coalesce":
+                        task = self._missed_note(task, missed)
+            self.last_triggered[task_id] = slot + offset
+            if next_due is not None:
+                self.schedule.push(task_id, next_due)
+            if self.state_log is not None:
+                self.state_log.record(task_id, slot + offset, None if next_due is None else next_due + offset)
+            if task is not None:
+                fired.append(task)
+        if stalled:
+            logging.warning(f"调度暂停了约 {stalled:.0f} 秒（系统休眠或卡顿），错过的提醒按 {self.catch_up} 策略处理")
+
+        if len(fired) > 1 and self.coalesce_window > 0:
+            self.trigger_group(fired)
+        else:
+            for task in fired:
+                self.trigger_task(task)
+        return len(fired)
+
+    def run(self):
+        self.dispatcher.start()
+        try:
+            with log_context(phase="schedule"):
+                self._loop()
+        finally:
+            if self.state_log is not None:
+                self.state_log.close()
+
+    def _loop(self):
+        while self.running:
+            # 一直睡到最早的任务到期（最多 MAX_WAIT 秒，以便休眠唤醒后及时补发）；没有任务时无限期等待新指令
+            due = self.schedule.peek_due()
+            timeout = None if due is None else min(max(0.0, due - self.monotonic()), self.MAX_WAIT)
+            try:
+                msg = self.task_queue.get(timeout=timeout)
+            except queue.Empty:
+                msg = None
+
+            self.stats["wakeups"] += 1
+            self.sync_clocks()
+            has_command = msg is not None
+            if has_command:
+                self.stats["command"] += 1
+                # 一次唤醒处理完所有积压的指令
+                handled = 0
+                while msg is not None:
+                    self.handle_message(msg)
+                    handled += 1
+                    try:
+                        msg = self.task_queue.get_nowait()
+                    except queue.Empty:
+                        msg = None
+                COMMANDS_PER_WAKEUP.observe(handled)
+            if not self.running:
+                break
+
+            if self.fire_due(self.monotonic()):
+                self.stats["due"] += 1
+            elif not has_command:
+                self.stats["idle"] += 1
+
+    def trigger_task(self, task):
+        # 只负责交给派发线程池，慢速的通知后端不会拖慢调度
+        if logging.root.isEnabledFor(logging.INFO): # 热路径：默认级别下连消息都不格式化
+            logging.info(f"触发提醒: {task.get('title')}", extra={"task_id": task.get("id")})
+        self.dispatcher.submit(task)
+        self._notify_fired(task)
+
+    def trigger_group(self, tasks):
+        """同时到期的多个任务只提交一条汇总通知"""
+        title, content = group_notification(
+            [(task.get("title", "提醒"), task.get("content", "时间到了！")) for task in tasks]
+        )
+        if logging.root.isEnabledFor(logging.INFO):
+            logging.info(f"合并触发 {len(tasks)} 个提醒")
+        self.stats["coalesced"] += len(tasks)
+        self.dispatcher.submit({"id": None, "title": title, "content": content,
+                                "group": [task.get("id") for task in tasks]})
+        for task in tasks:
+            self._notify_fired(task)
+
+    def _notify_fired(self, task):
+        if self.on_fire is not None:
+            try:
+                self.on_fire(task, self.clock())
+            except Exception as e:
+                logging.error(f"触发回调失败: {e}", extra={"task_id": task.get("id")})
+
+class ConfigWatcher(threading.Thread):
+    """监视 config.json 的外部修改
+
+    每 interval 秒只做一次 os.stat；mtime 或大小变化后再比较内容哈希，与本进程最后一次
+    读取 / 写入的内容不同（不是自己保存的、也不只是 touch）才解析并交给 engine.reload 增量应用。
+    文件写到一半解析失败时保持现状，等文件再次变化后重试。
+    """
+    def __init__(self, engine, interval=2.0):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.signature = ConfigManager.config_signature()
+        self.stats = {"checks": 0, "changes": 0, "reloads": 0}
+
+    def run(self):
+        with log_context(phase="watch"):
+            while not self.stopped.wait(self.interval):
+                try:
+                    self.check()
+                except Exception as e:
+                    logging.error(f"检查配置文件失败: {e}")
+
+    def check(self):
+        """返回本次是否重新载入了配置"""
+        self.stats["checks"] += 1
+        signature = ConfigManager.config_signature()
+        if signature == self.signature:
+            return False
+        self.signature = signature
+        self.stats["changes"] += 1
+        if not ConfigManager.changed_externally():
+            return False
+        try:
+            diff = self.engine.reload()
+        except ValueError as e:
+            logging.error(f"重新载入配置失败: {e}")
+            return False
+        except RuntimeError as e:
+            logging.warning(f"暂不重新载入配置: {e}")
+            self.signature = None # 下次检查时重试
+            return False
+        self.stats["reloads"] += 1
+        logging.info(f"config.json 已重新载入: 新增 {diff['added']}，修改 {diff['changed']}，删除 {diff['removed']}")
+        return True
+
+    def stop(self):
+        self.stopped.set()
+
+# ==========================================
+# 提醒引擎（无界面）
+# ==========================================
+class ReminderEngine:
+    """调度与持久化核心：配置存储 + 后台保存 + 调度线程 + 通知派发，不依赖任何界面库
+
+    任务的增删改都经过引擎，由引擎同时更新内存中的任务列表、保存队列和调度线程，
+    再通知所有订阅者。图形界面只是通过 subscribe 挂在引擎上的一个可选客户端，
+    --headless 模式下只运行引擎本身。
+
+    任务保存在不可变的 TaskSnapshot 中：写操作在 self.lock 内生成新快照并整体替换
+    self.snapshot，读取（tasks、get_task、界面、本地接口、保存线程）直接使用当时的快照，无需加锁。
+    """
+    def __init__(self, notifier=None, api_port=None):
+        self.notifier = notifier
+        self.api_port = api_port
+        self.api = None
+        self.watcher = None
+        self.config = None # 其他配置项；config["tasks"] 始终是当前快照
+        self.snapshot = TaskSnapshot()
+        self.saver = None
+        self.scheduler = None
+        self.listeners = []
+        self.lock = threading.RLock()
+
+    def start(self):
+        with STARTUP.phase("load_config"):
+            config = ConfigManager.load()
+            self._swap(config, TaskSnapshot.build(config["tasks"]))
+            reserve_task_ids(self.snapshot.index)
+        with STARTUP.phase("arm_scheduler"):
+            self.saver = SaveWorker()
+            self.saver.start()
+            self.scheduler = TaskScheduler(
+                queue.Queue(),
+                dispatcher=NotificationDispatcher(
+                    self.notifier or default_notifier(),
+                    rate=float(self.config.get("notify_rate", 20)) / 60 or None,
+                    burst=int(self.config.get("notify_burst", 5)),
+                    notify_timeout=float(self.config.get("notify_timeout", 30))
+                ),
+                state_log=ConfigManager.open_state_log(),
+                catch_up=self.config.get("catch_up", "once"),
+                on_fire=lambda task, fired_at: self._publish("fired", dict(task, fired_at=fired_at)),
+                coalesce_window=float(self.config.get("coalesce_window", 0)),
+                stagger=float(self.config.get("stagger", 0))
+            )
+            self.scheduler.update_tasks(self.snapshot)
+            self.scheduler.start()
+        self._register_metrics()
+        try:
+            LogManager.configure(self.config)
+        except ValueError as e:
+            logging.error(f"日志配置无效: {e}")
+        watch_interval = float(self.config.get("watch_interval", 2.0))
+        if watch_interval > 0:
+            self.watcher = ConfigWatcher(self, watch_interval)
+            self.watcher.start()
+        # 端口 0 表示由系统分配空闲端口，不是关闭接口
+        port = self.api_port if self.api_port is not None else self.config.get("api_port")
+        if port is not None:
+            with STARTUP.phase("start_api"):
+                with STARTUP.timed_import("api"):
+                    import api
+                self.api = api.ApiServer(self, int(port)).start()
+            logging.info(f"本地 HTTP 接口: http://127.0.0.1:{self.api.port}")
+        return self
+
+    def _register_metrics(self):
+        """队列深度、派发统计等直接读取现有状态，只在查看或导出时取值"""
+        scheduler, dispatcher, saver = self.scheduler, self.scheduler.dispatcher, self.saver
+        METRICS.gauge("reminder_tasks", "任务数", lambda: len(self.snapshot))
+        METRICS.gauge("reminder_snapshot_version", "任务快照版本号", lambda: self.snapshot.version)
+        METRICS.gauge("scheduler_queue_depth", "调度指令队列深度", scheduler.task_queue.qsize)
+        METRICS.gauge("notify_queue_depth", "通知派发队列深度", lambda: dispatcher.pending)
+        METRICS.gauge("save_pending_writes", "尚未落盘的编辑数", lambda: saver.pending_writes)
+        METRICS.gauge("scheduler_wakeups_total", "调度线程唤醒次数",
+                      lambda: scheduler.stats["wakeups"], kind="counter")
+        METRICS.gauge("scheduler_idle_wakeups_total", "调度线程空转唤醒次数",
+                      lambda: scheduler.stats["idle"], kind="counter")
+        METRICS.gauge("scheduler_clock_jumps_total", "检测到的系统时间调整次数",
+                      lambda: scheduler.stats["clock_jumps"], kind="counter")
+        METRICS.gauge("scheduler_catch_ups_total", "休眠或卡顿后按补发策略处理的提醒数",
+                      lambda: scheduler.stats["catch_ups"], kind="counter")
+        METRICS.gauge("scheduler_coalesced_total", "同时到期、合并成汇总通知的提醒数",
+                      lambda: scheduler.stats["coalesced"], kind="counter")
+        for key, text in (("delivered", "已送达"), ("dropped", "因队列已满丢弃"),
+                          ("expired", "排队超时丢弃"), ("failed", "发送失败"), ("timed_out", "发送超时"),
+                          ("coalesced", "限流时合并"), ("throttled", "因限流等待")):
+            METRICS.gauge(f"notify_{key}_total", f"通知{text}数",
+                          lambda key=key: dispatcher.stats[key], kind="counter")
+        METRICS.gauge("notifications_total", "实际弹出的通知数（汇总通知只算一条）",
+                      lambda: dispatcher.stats["notifications"], kind="counter")
+        METRICS.gauge("process_resident_memory_bytes", "常驻内存（字节）", resident_memory)
+
+    def stop(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.api is not None:
+            self.api.stop()
+        # 先把尚未落盘的编辑写完，再停止调度
+        if not self.saver.flush():
+            logging.error(f"退出时仍有 {self.saver.pending_writes} 条编辑未保存")
+        self.saver.stop()
+        self.scheduler.stop()
+
+    def _swap(self, config, snapshot):
+        """整体替换快照（调用方持有 self.lock 或尚未启动）；config 同时换成新字典，保存线程手里的旧字典不受影响"""
+        self.snapshot = snapshot
+        self.config = dict(config, tasks=snapshot)
+
+    @property
+    def tasks(self):
+        """当前的任务快照（不可变，可以在任意线程中遍历）"""
+        return self.snapshot
+
+    def get_task(self, task_id):
+        return self.snapshot.get(task_id)
+
+    def subscribe(self, callback):
+        """callback(event, payload)：event 为 "upsert"（payload 为任务）、"remove"（payload 为任务 id）、
+        "reset"（payload 为新的任务快照）或 "fired"（payload 为触发的任务，附带 fired_at）。
+        回调可能来自任意线程（"fired" 来自调度线程，必须立即返回），界面客户端需要自行切回界面线程。"""
+        self.listeners.append(callback)
+
+    def _publish(self, event, payload):
+        for callback in list(self.listeners):
+            try:
+                callback(event, payload)
+            except Exception as e:
+                logging.error(f"通知订阅者失败: {e}")
+
+    def upsert_task(self, task):
+        record = TaskRecord.compile(task)
+        with self.lock:
+            self._swap(self.config, self.snapshot.apply(upserts=[record]))
+            self.saver.submit_upsert(self.config, record.to_dict())
+            self.scheduler.upsert_task(record)
+        self._publish("upsert", record)
+        return record
+
+    def delete_task(self, task_id):
+        with self.lock:
+            if task_id not in self.snapshot:
+                return False
+            self._swap(self.config, self.snapshot.apply(removes=[task_id]))
+            self.saver.submit_delete(self.config, task_id)
+            self.scheduler.remove_task(task_id)
+        self._publish("remove", task_id)
+        return True
+
+    def apply_batch(self, upserts=(), deletes=(), flush=False):
+        """批量增删：先校验全部任务，任何一条不合法都不做修改；
+        之后快照、保存队列和调度线程各只更新一次，保存时在同一个事务中落盘。
+        返回 (写入的任务列表, 实际删除的任务 id 列表, 是否已落盘)；flush=False 时不等待落盘，
+        最后一项为 None。落盘失败时改动仍保留在内存和保存队列中，由保存线程稍后重试。"""
+        records = []
+        for n, raw in enumerate(upserts):
+            try:
+                records.append(TaskRecord.compile(validate_task(
+                    raw.get("title", ""), raw.get("content", ""), raw.get("interval", ""),
+                    task_id=str(raw["id"]) if raw.get("id") else None, schedule=raw.get("schedule")
+                )))
+            except (ValueError, AttributeError) as e:
+                raise ValueError(f"第 {n + 1} 个任务不合法: {e}")
+        deleted, persisted = self._commit_batch(records, deletes, flush)
+        return records, deleted, persisted
+
+    def _commit_batch(self, records, deletes, flush):
+        """快照、保存队列（一个事务）和调度线程各更新一次，界面整体刷新；
+        返回 (实际删除的 id, 是否已落盘)，flush=False 时后者为 None"""
+        with self.lock:
+            deleted = [str(i) for i in deletes if str(i) in self.snapshot]
+            self._swap(self.config, self.snapshot.apply(records, deleted))
+            entries = [{"op": "delete", "id": i} for i in deleted]
+            entries += [{"op": "upsert", "task": r.to_dict()} for r in records]
+            self.saver.submit_batch(self.config, entries)
+            self.scheduler.apply_batch(records, deleted)
+            snapshot = self.snapshot
+        persisted = self.saver.flush() if flush else None
+        self._publish("reset", snapshot)
+        return deleted, persisted
+
+    def import_tasks(self, path, fmt=None):
+        """从 JSON Lines / CSV 文件导入任务（格式默认按扩展名判断）
+
+        逐行校验，不合法的行跳过并记入报告；合法的任务在一次批量写入中保存，调度线程只更新一次。
+        返回 TaskTransfer.read 的报告，另附导入后的任务总数 tasks。
+        """
+        records, report = TaskTransfer.read(path, fmt)
+        if records:
+            self._commit_batch(records, (), flush=True)
+        report["tasks"] = len(self.snapshot)
+        return report
+
+    def export_tasks(self, path, fmt=None):
+        """把当前快照导出为 JSON Lines / CSV 文件（快照不可变，导出期间不影响编辑），返回导出的任务数"""
+        return TaskTransfer.write(self.snapshot, path, fmt)
+
+    def next_due(self, limit=10):
+        """返回 Future，结果为最近到期的 [(due, task)]"""
+        return self.scheduler.next_due(limit)
+
+    def test_trigger(self, task):
+        self.scheduler.task_queue.put({"type": "test_trigger", "task": task})
+
+    RESET_THRESHOLD = 100 # 变化的任务超过这个数时界面直接整体刷新
+
+    def reload(self):
+        """从磁盘重新载入配置（外部脚本、同步盘修改之后）
+
+        与内存中的任务逐个比较，只把新增、修改和删除的任务交给调度线程和界面，
+        未变化任务的计时保持不变。配置文件无法解析时抛出 ValueError，内存中的任务不受影响。
+        返回 {"added", "changed", "removed", "tasks"} 各自的数量。
+
+        从落盘到替换快照全程持有 self.lock：期间界面或接口的编辑会等待，而不会被磁盘上的旧数据
+        当作外部修改覆盖回去。仍有编辑没能落盘时不重新载入，抛出 RuntimeError，稍后再试。
+        """
+        with self.lock:
+            if not self.saver.flush():
+                raise RuntimeError(f"还有 {self.saver.pending_writes} 条编辑未保存，稍后再重新载入")
+            config = ConfigManager.load(strict=True)
+            records = [TaskRecord.compile(t) for t in config["tasks"]]
+            reserve_task_ids(r.id for r in records)
+            current = self.snapshot
+            seen = set()
+            added, changed = [], []
+            for record in records:
+                seen.add(record.id)
+                old = current.get(record.id)
+                if old is None:
+                    added.append(record)
+                elif old != record:
+                    changed.append(record)
+            removed = [r.id for r in current if r.id not in seen]
+            upserts = added + changed
+            if upserts or removed:
+                self._swap(config, current.apply(upserts, removed))
+                self.scheduler.apply_batch(upserts, removed)
+            else:
+                self._swap(config, current) # 只有设置项变化
+            snapshot = self.snapshot
+        try:
+            LogManager.configure(config)
+        except ValueError as e:
+            logging.error(f"日志配置无效: {e}")
+
+        if len(upserts) + len(removed) > self.RESET_THRESHOLD:
+            self._publish("reset", snapshot)
+        else:
+            for record in upserts:
+                self._publish("upsert", record)
+            for task_id in removed:
+                self._publish("remove", task_id)
+        return {"added": len(added), "changed": len(changed), "removed": len(removed), "tasks": len(snapshot)}
+
+
+# ==========================================
+# 本地指令通道（单例与进程间通信）
+# ==========================================
+def ipc_address():
+    """Windows 上使用当前用户专属的命名管道，其他平台使用 Unix domain socket"""
+    if sys.platform == "win32":
+        user = os.environ.get("USERNAME", "user")
+        return rf"\\.\pipe\ReminderManager-{user}"
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"reminder-manager-{os.getuid()}.sock")
+
+def send_command(cmd, args=None, timeout=2.0):
+    """向正在运行的实例发送指令并返回回复；没有实例在运行时返回 None"""
+    try:
+        conn = Client(ipc_address())
+    except (OSError, EOFError):
+        return None
+    with conn:
+        conn.send_bytes(json.dumps({"cmd": cmd, "args": args or {}}, ensure_ascii=False).encode("utf-8"))
+        if not conn.poll(timeout):
+            return {"ok": False, "error": "等待回复超时"}
+        return json.loads(conn.recv_bytes().decode("utf-8"))
+
+
+class CommandServer(threading.Thread):
+    """正在运行的实例上的本地指令通道
+
+    后启动的实例通过 send_command 把 show / add_task / test / reload / import / export / quit 等指令转发过来，
+    然后立即退出。消息一律是 JSON（不用 pickle，避免反序列化任意对象）。
+    界面相关的指令（show、quit）由界面客户端通过 register 注册。
+    """
+    def __init__(self, engine=None):
+        super().__init__(daemon=True)
+        self.engine = engine # 可以先 bind 占住地址，引擎启动后再赋值
+        self.listener = None
+        self.handlers = {
+            "ping": lambda args: {"pid": os.getpid()},
+            "add_task": self._add_task,
+            "test": self._test,
+            "reload": lambda args: self.engine.reload(),
+            "log_level": lambda args: {"level": LogManager.set_level(args.get("level", ""))},
+            "import": self._import,
+            "export": lambda args: {"exported": self.engine.export_tasks(args["path"], args.get("format"))},
+        }
+
+    def register(self, cmd, handler):
+        """handler(args) 返回附加到回复中的字典（或 None），抛出异常表示失败"""
+        self.handlers[cmd] = handler
+
+    def _add_task(self, args):
+        task = validate_task(args.get("title", ""), args.get("content", ""), args.get("interval", ""),
+                             schedule=args.get("schedule"))
+        self.engine.upsert_task(task)
+        return {"id": task["id"]}
+
+    def _import(self, args):
+        report = self.engine.import_tasks(args["path"], args.get("format"))
+        return dict(report, summary=TaskTransfer.summarize(report))
+
+    def _test(self, args):
+        task = self.engine.get_task(str(args.get("id")))
+        if task is None:
+            raise ValueError("任务不存在")
+        self.engine.test_trigger(task)
+
+    def bind(self):
+        """开始监听，地址已被其他实例占用时返回 False"""
+        address = ipc_address()
+        if sys.platform != "win32" and os.path.exists(address):
+            if send_command("ping", timeout=0.5) is not None:
+                return False
+            os.remove(address) # 上次异常退出留下的 socket 文件
+        try:
+            self.listener = Listener(address)
+        except OSError as e:
+            logging.error(f"创建指令通道失败: {e}")
+            return False
+        return True
+
+    def run(self):
+        with log_context(phase="ipc"):
+            self._serve()
+
+    def _serve(self):
+        while self.listener is not None:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                break # 监听已关闭
+            with conn:
+                try:
+                    request = json.loads(conn.recv_bytes().decode("utf-8"))
+                    conn.send_bytes(json.dumps(self.handle(request), ensure_ascii=False).encode("utf-8"))
+                except (OSError, EOFError, ValueError) as e:
+                    logging.error(f"处理指令失败: {e}")
+
+    def handle(self, request):
+        handler = self.handlers.get(request.get("cmd"))
+        if handler is None:
+            return {"ok": False, "error": f"未知指令: {request.get('cmd')}"}
+        try:
+            reply = handler(request.get("args") or {}) or {}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        return dict(reply, ok=True)
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.close()
+
+
+def run_transfer(cmd, path, fmt=None):
+    """没有实例在运行时直接读写任务数据完成 import / export 指令，回复格式与指令通道相同
+
+    调用方已经占住单例，不会有其他实例同时写入；导入的任务作为一个批次写入日志（或数据库）。
+    """
+    config = ConfigManager.load()
+    snapshot = TaskSnapshot.build(config["tasks"])
+    reserve_task_ids(snapshot.index)
+    if cmd == "export":
+        return {"exported": TaskTransfer.write(snapshot, path, fmt)}
+    records, report = TaskTransfer.read(path, fmt)
+    if records:
+        snapshot = snapshot.apply(records)
+        entries = [{"op": "upsert", "task": r.to_dict()} for r in records]
+        ConfigManager.append_entries(dict(config, tasks=snapshot), entries)
+    report["tasks"] = len(snapshot)
+    return dict(report, summary=TaskTransfer.summarize(report))
+
+
+def run_headless(server=None, api_port=None, log_level=None):
+    """--headless 入口：只运行引擎，收到 SIGINT / SIGTERM 或 quit 指令后保存并退出"""
+    engine = ReminderEngine(api_port=api_port).start()
+    if log_level:
+        LogManager.set_level(log_level)
+    stop = threading.Event()
+
+    def handle_signal(signum, frame):
+        stop.set()
+
+    if server is not None:
+        server.engine = engine
+        server.register("show", lambda args: {"headless": True})
+        server.register("quit", lambda args: stop.set())
+        server.start()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    print(f"{APP_NAME} 引擎已启动（headless），共 {len(engine.tasks)} 个任务，按 Ctrl+C 退出", flush=True)
+    if engine.api is not None:
+        print(f"本地 HTTP 接口: http://127.0.0.1:{engine.api.port}", flush=True)
+    # POSIX 上信号可以打断无限期等待；Windows 上的等待无法被 Ctrl+C 打断，只能定期醒来检查
+    timeout = 1.0 if os.name == "nt" else None
+    while not stop.wait(timeout):
+        pass
+    if server is not None:
+        server.close()
+    engine.stop()
+    METRICS.write() # 没有托盘菜单，退出时把运行指标导出到 metrics.prom
@@ -0,0 +1,1107 @@
+import os
+import sys
+import json
+import logging
+import threading
+import hashlib
+import math
+import gc
+import time
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+from core import (
+    APP_NAME, BASE_DIR, ICON_FILE, METRICS, MAIN_SCRIPT, STARTUP, AutoStartManager, LogManager,
+    TaskSearchIndex, TaskTransfer, describe_schedule, new_task_id, resident_memory, trim_working_set, validate_task
+)
+
+# 界面相关的重量级依赖只在需要界面时随本模块一起导入
+with STARTUP.timed_import("customtkinter"):
+    import customtkinter as ctk
+with STARTUP.timed_import("PIL"):
+    from PIL import Image, ImageDraw
+with STARTUP.timed_import("pystray"):
+    import pystray
+    from pystray import MenuItem as item
+
+# ==========================================
+# 视觉与 UI 规范 (UI/UX) - 现代 macOS 风格
+# ==========================================
+COLORS = {
+    "accent": "#007AFF",         # 标准 iOS/macOS 蓝色
+    "accent_hover": "#0062CC",   # 深蓝色 (悬停)
+    "accent_light": "#E5F1FF",   # 极浅蓝色 (用于“试一下”按钮)
+    "background": "#F5F5F7",     # macOS 系统浅色背景
+    "card_bg": "#FFFFFF",
+    "text_main": "#1D1D1F",      # 深黑色 (Apple 规范)
+    "text_secondary": "#86868B", # 次要灰色 (Apple 规范)
+    "border": "#D2D2D7",
+    "danger": "#FF3B30",         # 标准 iOS 红色
+    "danger_light": "#FFE9E8",   # 极浅红色 (用于删除按钮背景)
+    "success": "#34C759",        # 标准 iOS 绿色
+    "hover": "#E8E8ED"
+}
+
+FONT_NAME = "Microsoft YaHei UI"
+
+# 从托盘打开主界面的目标耗时（秒），包括释放后重建任务卡片
+SHOW_LATENCY_TARGET = 0.2
+UI_REFRESH_SECONDS = METRICS.histogram("ui_refresh_seconds", "任务列表刷新耗时")
+UI_SHOW_SECONDS = METRICS.histogram("ui_show_seconds", "主界面从点击到可见的耗时")
+UI_SEARCH_SECONDS = METRICS.histogram("ui_search_seconds", "搜索框输入到列表过滤完成的耗时")
+
+ASSET_CACHE_DIR = os.path.join(BASE_DIR, "cache")
+
+# 图标绘制指令：(ImageDraw 方法, 坐标, 参数)。指令本身的哈希就是磁盘缓存的键，
+# 修改图标后哈希变化，旧缓存自然失效。带 "file" 的图标优先使用随程序发布的文件。
+ICON_SPECS = {
+    "app": {
+        "size": 256,
+        "ops": [
+            # 背景圆角矩形
+            ("rounded_rectangle", [16, 16, 240, 240], {"radius": 60, "fill": "#007AFF"}),
+            # 简单的闹钟形状 (白色)
+            ("ellipse", [60, 80, 196, 216], {"outline": "white", "width": 12}),
+            ("line", [128, 148, 128, 112], {"fill": "white", "width": 12}),
+            ("line", [128, 148, 168, 148], {"fill": "white", "width": 12}),
+            ("arc", [40, 40, 100, 100], {"start": 180, "end": 0, "fill": "white", "width": 12}),
+            ("arc", [156, 40, 216, 100], {"start": 180, "end": 0, "fill": "white", "width": 12}),
+        ]
+    },
+    "tray": {
+        # 深蓝色圆角闹钟图标
+        "size": 64,
+        "ops": [
+            ("rounded_rectangle", [4, 4, 60, 60], {"radius": 15, "fill": "#003366"}),
+            ("ellipse", [15, 20, 49, 54], {"outline": "white", "width": 3}),
+            ("line", [32, 37, 32, 28], {"fill": "white", "width": 3}),
+            ("line", [32, 37, 42, 37], {"fill": "white", "width": 3}),
+            ("arc", [10, 10, 25, 25], {"start": 180, "end": 0, "fill": "white", "width": 3}),
+            ("arc", [39, 10, 54, 25], {"start": 180, "end": 0, "fill": "white", "width": 3}),
+        ]
+    },
+    "delete": {
+        # 精致的红色垃圾桶图标
+        "file": os.path.join(BASE_DIR, "delete_icon.png"),
+        "size": 64,
+        "ops": [
+            # 垃圾桶盖子
+            ("rounded_rectangle", [16, 12, 48, 18], {"radius": 2, "fill": COLORS["danger"]}),
+            ("rounded_rectangle", [26, 8, 38, 12], {"radius": 2, "fill": COLORS["danger"]}),
+            # 垃圾桶桶身
+            ("rounded_rectangle", [18, 20, 46, 56], {"radius": 4, "fill": COLORS["danger"]}),
+            # 桶身上的竖线
+            ("line", [24, 28, 24, 48], {"fill": "white", "width": 3}),
+            ("line", [32, 28, 32, 48], {"fill": "white", "width": 3}),
+            ("line", [40, 28, 40, 48], {"fill": "white", "width": 3}),
+        ]
+    },
+}
+
+class AssetCache:
+    """进程内共享的图片缓存
+
+    每个图标在进程内只解码 / 绘制一次，所有卡片共享同一个 PIL.Image 和 CTkImage；
+    绘制出的图标按指令哈希保存在 cache 目录，之后的启动直接读取文件，不再重新绘制。
+    """
+    _images = {}
+    _ctk_images = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _cache_path(name, spec):
+        payload = json.dumps({"size": spec["size"], "ops": spec["ops"]}, sort_keys=True)
+        digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(ASSET_CACHE_DIR, f"{name}-{digest}.png")
+
+    @staticmethod
+    def _render(spec):
+        size = spec["size"]
+        image = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        for method, xy, kwargs in spec["ops"]:
+            getattr(draw, method)(xy, **kwargs)
+        return image
+
+    @staticmethod
+    def _load(name):
+        spec = ICON_SPECS[name]
+        if spec.get("file") and os.path.exists(spec["file"]):
+            image = Image.open(spec["file"])
+            image.load()
+            return image
+
+        path = AssetCache._cache_path(name, spec)
+        if os.path.exists(path):
+            try:
+                image = Image.open(path)
+                image.load()
+                return image
+            except Exception as e:
+                logging.error(f"读取图标缓存失败: {e}")
+
+        image = AssetCache._render(spec)
+        try:
+            os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+            tmp_path = path + ".tmp"
+            image.save(tmp_path, format="PNG")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.error(f"写入图标缓存失败: {e}")
+        return image
+
+    @staticmethod
+    def get_image(name):
+        with AssetCache._lock:
+            image = AssetCache._images.get(name)
+            if image is None:
+                image = AssetCache._load(name)
+                AssetCache._images[name] = image
+            return image
+
+    @staticmethod
+    def get_ctk_image(name, size):
+        key = (name, size)
+        image = AssetCache._ctk_images.get(key)
+        if image is None:
+            pil_image = AssetCache.get_image(name)
+            image = ctk.CTkImage(light_image=pil_image, dark_image=pil_image, size=size)
+            AssetCache._ctk_images[key] = image
+        return image
+
+def create_app_icon():
+    """生成应用图标文件"""
+    if os.path.exists(ICON_FILE):
+        return
+    try:
+        AssetCache.get_image("app").save(ICON_FILE, format='ICO')
+    except Exception as e:
+        logging.error(f"生成图标失败: {e}")
+
+def init_appearance():
+    # 设置外观
+    ctk.set_appearance_mode("Light")
+    ctk.set_default_color_theme("blue")
+
+# ==========================================
+# UI 界面：主窗口与组件
+# ==========================================
+class CustomConfirmDialog(ctk.CTkToplevel):
+    def __init__(self, master, title, message, on_confirm):
+        super().__init__(master)
+        self.title(title)
+        self.geometry("340x200")
+        self.configure(fg_color=COLORS["card_bg"])
+        self.on_confirm = on_confirm
+        
+        # 隐藏标题栏以实现更圆润的外观 (可选，但为了吸引力，我们可以保持标准但增加内容圆润度)
+        self.attributes("-topmost", True)
+        self.resizable(False, False)
+        
+        # 居中显示
+        self.update_idletasks()
+        x = master.winfo_x() + (master.winfo_width() // 2) - (340 // 2)
+        y = master.winfo_y() + (master.winfo_height() // 2) - (200 // 2)
+        self.geometry(f"+{x}+{y}")
+
+        # 容器
+        self.main_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.main_frame.pack(fill="both", expand=True, padx=25, pady=25)
+
+        # 标题
+        ctk.CTkLabel(
+            self.main_frame, text=title, font=(FONT_NAME, 18, "bold"), 
+            text_color=COLORS["text_main"]
+        ).pack(pady=(0, 10))
+
+        # 消息
+        ctk.CTkLabel(
+            self.main_frame, text=message, font=(FONT_NAME, 13), 
+            text_color=COLORS["text_secondary"], wraplength=280
+        ).pack(pady=(0, 20))
+
+        # 按钮容器
+        btn_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        btn_frame.pack(side="bottom", fill="x")
+
+        self.cancel_btn = ctk.CTkButton(
+            btn_frame, text="算啦", width=120, height=38,
+            fg_color="#F2F2F2", text_color=COLORS["text_main"],
+            hover_color="#E8E8E8", corner_radius=19,
+            font=(FONT_NAME, 12),
+            command=self.destroy
+        )
+        self.cancel_btn.pack(side="left", padx=(0, 10))
+
+        self.confirm_btn = ctk.CTkButton(
+            btn_frame, text="确定", width=120, height=38,
+            fg_color=COLORS["danger"], text_color="white",
+            hover_color="#FF7070", corner_radius=19,
+            font=(FONT_NAME, 12, "bold"),
+            command=self.confirm
+        )
+        self.confirm_btn.pack(side="right")
+
+    def confirm(self):
+        self.on_confirm()
+        self.destroy()
+
+class MetricsDialog(ctk.CTkToplevel):
+    """托盘菜单中的“运行指标”：查看摘要，或导出为 Prometheus 文本格式的 metrics.prom"""
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("运行指标")
+        self.geometry("560x420")
+        self.configure(fg_color=COLORS["card_bg"])
+        self.attributes("-topmost", True)
+
+        main_frame = ctk.CTkFrame(self, fg_color="transparent")
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        ctk.CTkLabel(
+            main_frame, text="运行指标", font=(FONT_NAME, 18, "bold"),
+            text_color=COLORS["text_main"]
+        ).pack(anchor="w", pady=(0, 10))
+
+        self.textbox = ctk.CTkTextbox(
+            main_frame, font=(FONT_NAME, 12), text_color=COLORS["text_main"],
+            fg_color=COLORS["background"], corner_radius=12, wrap="word"
+        )
+        self.textbox.pack(fill="both", expand=True)
+
+        btn_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        btn_frame.pack(fill="x", pady=(12, 0))
+        ctk.CTkButton(
+            btn_frame, text="刷新", width=110, height=34,
+            fg_color=COLORS["accent_light"], text_color=COLORS["accent"],
+            hover_color="#D1E8FF", corner_radius=17, font=(FONT_NAME, 12),
+            command=self.refresh
+        ).pack(side="left")
+        ctk.CTkButton(
+            btn_frame, text="导出", width=110, height=34,
+            fg_color=COLORS["accent"], hover_color=COLORS["accent_hover"],
+            corner_radius=17, font=(FONT_NAME, 12, "bold"),
+            command=self.export
+        ).pack(side="right")
+
+        self.refresh()
+
+    def refresh(self):
+        self.textbox.configure(state="normal")
+        self.textbox.delete("1.0", "end")
+        self.textbox.insert("1.0", "\n".join(METRICS.summary()))
+        self.textbox.configure(state="disabled")
+
+    def export(self):
+        path = METRICS.write()
+        if path:
+            messagebox.showinfo("导出成功", f"运行指标已导出到：\n{path}", parent=self)
+        else:
+            messagebox.showerror("导出失败", "导出运行指标失败，详情请查看 error.log", parent=self)
+
+# TaskCard 创建 / 销毁的控件累计数量（含 customtkinter 内部控件），用于衡量每次界面更新的开销
+WIDGET_STATS = {"created": 0, "destroyed": 0}
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+class TaskCard(ctk.CTkFrame):
+    def __init__(self, master, task, on_edit, on_test, on_delete):
+        super().__init__(
+            master, 
+            fg_color=COLORS["card_bg"], 
+            corner_radius=24, 
+            border_width=0
+        )
+        self.task = task
+        
+        # 布局
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_propagate(False) # 高度由列表固定，卡片可被回收复用
+        
+        # 左侧蓝色装饰条 (匹配图片风格)
+        self.accent_bar = ctk.CTkFrame(
+            self, width=6, fg_color=COLORS["accent"], corner_radius=3
+        )
+        self.accent_bar.place(relx=0, rely=0.2, relheight=0.6, x=15)
+
+        # 容器：内容区 (调整内边距，移除圆圈空间)
+        self.content_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.content_frame.grid(row=0, column=0, sticky="nsew", padx=(30, 20), pady=16)
+        
+        self.title_label = ctk.CTkLabel(
+            self.content_frame, text=task["title"], 
+            font=(FONT_NAME, 16, "bold"), 
+            text_color=COLORS["text_main"]
+        )
+        self.title_label.pack(anchor="w")
+        
+        self.content_label = ctk.CTkLabel(
+            self.content_frame, text=task["content"], 
+            font=(FONT_NAME, 13), 
+            text_color=COLORS["text_secondary"]
+        )
+        self.content_label.pack(anchor="w", pady=(2, 4))
+        
+        self.info_label = ctk.CTkLabel(
+            self.content_frame, text=describe_schedule(task), 
+            font=(FONT_NAME, 12), 
+            text_color=COLORS["accent"]
+        )
+        self.info_label.pack(anchor="w")
+        
+        # 容器：操作区
+        self.action_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.action_frame.grid(row=0, column=1, padx=(0, 20))
+        
+        self.test_btn = ctk.CTkButton(
+            self.action_frame, text="试一下", width=60, height=32,
+            fg_color=COLORS["accent_light"], text_color=COLORS["accent"],
+            hover_color="#D1E8FF",
+            corner_radius=16, font=(FONT_NAME, 11, "bold"),
+            command=lambda: on_test(self.task)
+        )
+        self.test_btn.pack(side="left", padx=3)
+        self.test_btn.configure(cursor="hand2")
+
+        self.edit_btn = ctk.CTkButton(
+            self.action_frame, text="编辑", width=60, height=32,
+            fg_color=COLORS["accent"], text_color="white",
+            hover_color=COLORS["accent_hover"],
+            corner_radius=16, font=(FONT_NAME, 11, "bold"),
+            command=lambda: on_edit(self.task)
+        )
+        self.edit_btn.pack(side="left", padx=3)
+        self.edit_btn.configure(cursor="hand2")
+
+        # 删除图标：所有卡片共享同一个 CTkImage
+        self.del_img = AssetCache.get_ctk_image("delete", (16, 16))
+
+        self.del_btn = ctk.CTkButton(
+            self.action_frame, image=self.del_img, text="", width=32, height=32,
+            fg_color=COLORS["danger_light"], hover_color="#FFDADA",
+            corner_radius=16,
+            command=lambda: on_delete(self.task)
+        )
+        self.del_btn.pack(side="left", padx=(10, 0))
+        self.del_btn.configure(cursor="hand2")
+
+        # 绑定事件
+        for widget in [self, self.content_frame, self.title_label, self.content_label, self.info_label]:
+            widget.bind("<Double-1>", lambda e: on_edit(self.task))
+            widget.bind("<Button-3>", self.show_menu)
+        
+        self.menu = tk.Menu(self, tearoff=0)
+        self.menu.add_command(label="编辑任务", command=lambda: on_edit(self.task))
+        self.menu.add_command(label="立即测试", command=lambda: on_test(self.task))
+        self.menu.add_separator()
+        self.menu.add_command(label="删除任务", command=lambda: on_delete(self.task), foreground="red")
+
+        self.widget_count = count_widgets(self)
+        WIDGET_STATS["created"] += self.widget_count
+
+    def destroy(self):
+        WIDGET_STATS["destroyed"] += self.widget_count
+        super().destroy()
+
+    def set_task(self, task):
+        """把卡片重新绑定到另一个任务（虚拟列表回收卡片时调用）"""
+        self.task = task
+        self.title_label.configure(text=task["title"])
+        self.content_label.configure(text=task["content"])
+        self.info_label.configure(text=describe_schedule(task))
+
+    def show_menu(self, event):
+        self.menu.post(event.x_root, event.y_root)
+
+class VirtualTaskList(ctk.CTkFrame):
+    """虚拟化任务列表
+
+    所有行高度固定，画布的滚动区域按任务总数计算，但只创建足够铺满可视区域的
+    TaskCard；滚动时第 i 行始终由 pool[i % len(pool)] 显示，滚动一行只需重新绑定一张卡片。
+    渲染耗时和控件数量只与窗口高度有关，与任务数量无关。
+
+    upsert / remove 按任务 id 增量更新：只重新绑定受影响的可见卡片，不创建也不销毁控件。
+    release() 销毁全部卡片但保留行数据，之后第一次 render() 会按需重新创建可见的卡片。
+    last_op 记录最近一次操作创建 / 销毁的控件数。
+    """
+    CARD_HEIGHT = 112
+    ROW_GAP = 16
+
+    def __init__(self, master, on_edit, on_test, on_delete):
+        super().__init__(master, fg_color="transparent")
+        self.on_edit = on_edit
+        self.on_test = on_test
+        self.on_delete = on_delete
+        self.tasks = []
+        self.index = {} # task_id -> 行号
+        self.last_op = None
+        self.pool = [] # [(card, 画布窗口 id)]
+        self.shown = {} # 卡片槽位 -> 当前显示的行号
+        self.released = False
+
+        self.canvas = tk.Canvas(
+            self, bg=COLORS["background"], highlightthickness=0, bd=0,
+            yscrollincrement=20
+        )
+        self.scrollbar = ctk.CTkScrollbar(
+            self, command=self.canvas.yview,
+            button_color="#E0E0E0", button_hover_color="#CCCCCC"
+        )
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self.canvas.bind("<Configure>", self._on_resize)
+        self.bind_all("<MouseWheel>", self._on_mousewheel, add="+")
+
+    def _scaled(self, value):
+        return int(round(value * ctk.ScalingTracker.get_widget_scaling(self)))
+
+    def _row_height(self):
+        return self._scaled(self.CARD_HEIGHT + self.ROW_GAP)
+
+    def _measure(self, op, func, *args):
+        created, destroyed = WIDGET_STATS["created"], WIDGET_STATS["destroyed"]
+        with UI_REFRESH_SECONDS.time():
+            func(*args)
+        self.last_op = {
+            "op": op,
+            "created": WIDGET_STATS["created"] - created,
+            "destroyed": WIDGET_STATS["destroyed"] - destroyed
+        }
+
+    def set_tasks(self, tasks):
+        self._measure("reset", self._set_tasks, tasks)
+
+    def _set_tasks(self, tasks):
+        self.tasks = list(tasks)
+        self.index = {t["id"]: i for i, t in enumerate(tasks)}
+        self.shown.clear()
+        self._update_scrollregion()
+        self.render()
+
+    def upsert(self, task):
+        """新增或修改一个任务：修改只更新对应卡片的文字，新增追加到末尾"""
+        op = "update" if task["id"] in self.index else "insert"
+        self._measure(op, self._upsert, task)
+
+    def _upsert(self, task):
+        i = self.index.get(task["id"])
+        if i is None:
+            self.index[task["id"]] = len(self.tasks)
+            self.tasks.append(task)
+            self._update_scrollregion()
+        else:
+            self.tasks[i] = task
+        self.render()
+
+    def remove(self, task_id):
+        self._measure("remove", self._remove, task_id)
+
+    def _remove(self, task_id):
+        i = self.index.pop(task_id, None)
+        if i is None:
+            return
+        del self.tasks[i]
+        for j in range(i, len(self.tasks)):
+            self.index[self.tasks[j]["id"]] = j
+        self._update_scrollregion()
+        self.render()
+
+    def _update_scrollregion(self):
+        height = len(self.tasks) * self._row_height()
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), height))
+
+    def _ensure_pool(self):
+        needed = math.ceil(max(self.canvas.winfo_height(), 1) / self._row_height()) + 1
+        needed = min(needed, len(self.tasks))
+        width = self.canvas.winfo_width()
+        card_height = self._scaled(self.CARD_HEIGHT)
+        while len(self.pool) < needed:
+            card = TaskCard(
+                self.canvas, self.tasks[len(self.pool)],
+                on_edit=self.on_edit,
+                on_test=self.on_test,
+                on_delete=self.on_delete
+            )
+            window = self.canvas.create_window(
+                0, -2 * card_height, window=card, anchor="nw",
+                width=width, height=card_height
+            )
+            self.pool.append((card, window))
+        if len(self.pool) != len(self.shown):
+            self.shown.clear() # 池大小变化后槽位映射失效
+
+    def release(self):
+        """销毁所有卡片（窗口长时间隐藏时调用），行数据保留在 tasks 中"""
+        self._measure("release", self._release)
+
+    def _release(self):
+        for card, window in self.pool:
+            self.canvas.delete(window)
+            card.destroy()
+        self.pool = []
+        self.shown.clear()
+        self.released = True
+
+    def restore(self):
+        self.released = False
+        self._measure("restore", self.render)
+
+    def render(self):
+        if self.released:
+            return # 卡片已释放，数据变化只更新 tasks，等 restore 时再渲染
+        self._ensure_pool()
+        size = len(self.pool)
+        if not size:
+            return
+        row = self._row_height()
+        first = max(int(self.canvas.canvasy(0) // row), 0)
+        offset = self._scaled(self.ROW_GAP) // 2
+        for i in range(first, first + size):
+            slot = i % size
+            card, window = self.pool[slot]
+            if i < len(self.tasks):
+                if self.shown.get(slot) != i or card.task is not self.tasks[i]:
+                    card.set_task(self.tasks[i])
+                    self.canvas.coords(window, 0, i * row + offset)
+                    self.shown[slot] = i
+            elif self.shown.get(slot) is not None:
+                # 多余的卡片移出滚动区域
+                self.canvas.coords(window, 0, -2 * row)
+                self.shown[slot] = None
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.render()
+
+    def _on_resize(self, event):
+        for _, window in self.pool:
+            self.canvas.itemconfigure(window, width=event.width)
+        self._update_scrollregion()
+        self.render()
+
+    def _on_mousewheel(self, event):
+        # bind_all 会收到整个应用的滚轮事件，只处理鼠标位于列表内的情况
+        widget = self.winfo_containing(event.x_root, event.y_root)
+        if widget is None or not str(widget).startswith(str(self)):
+            return
+        self.canvas.yview_scroll(int(-event.delta / 40), "units")
+
+class SettingsDialog(ctk.CTkToplevel):
+    def __init__(self, master, task=None, on_save=None):
+        super().__init__(master)
+        
+        # 1. 基础配置
+        self.title("任务设置")
+        self.geometry("400x610") # 增加高度
+        self.configure(fg_color=COLORS["card_bg"])
+        self.on_save = on_save
+        self.task_id = task["id"] if task else new_task_id()
+        
+        # 2. 窗口行为增强
+        self.protocol("WM_DELETE_WINDOW", self.destroy)
+        self.transient(master)
+        self.grab_set()
+        self.resizable(False, False)
+        
+        # 3. 居中显示
+        self.update_idletasks()
+        win_w, win_h = 400, 610
+        x = master.winfo_x() + (master.winfo_width() // 2) - (win_w // 2)
+        y = master.winfo_y() + (master.winfo_height() // 2) - (win_h // 2)
+        self.geometry(f"{win_w}x{win_h}+{x}+{y}")
+
+        # 4. 界面构建
+        self.setup_ui(task)
+        
+        # 5. 事件绑定
+        self.bind("<Return>", lambda e: self.save())
+        self.bind("<Escape>", lambda e: self.destroy())
+
+    def setup_ui(self, task):
+        # 标题区域 (Top)
+        header_frame = ctk.CTkFrame(self, fg_color="transparent")
+        header_frame.pack(fill="x", pady=(30, 15), padx=40)
+        
+        ctk.CTkLabel(
+            header_frame, text="任务设置", 
+            font=(FONT_NAME, 26, "bold"), 
+            text_color=COLORS["accent"]
+        ).pack(side="left")
+
+        # 底部按钮 (Bottom) - 先 pack 底部，确保不被截断
+        footer_frame = ctk.CTkFrame(self, fg_color="transparent")
+        footer_frame.pack(side="bottom", fill="x", padx=40, pady=(10, 30))
+
+        self.save_btn = ctk.CTkButton(
+            footer_frame, text="保存设置", height=46,
+            fg_color=COLORS["accent"], hover_color=COLORS["accent_hover"],
+            text_color="white", font=(FONT_NAME, 14, "bold"), corner_radius=23,
+            command=self.save
+        )
+        self.save_btn.pack(side="right", fill="x", expand=True, padx=(12, 0))
+
+        self.cancel_btn = ctk.CTkButton(
+            footer_frame, text="取消", height=46, width=90,
+            fg_color="#F2F2F7", text_color=COLORS["text_main"],
+            hover_color="#E8E8ED", font=(FONT_NAME, 14), corner_radius=23,
+            command=self.destroy
+        )
+        self.cancel_btn.pack(side="right")
+
+        # 内容容器 (Middle) - 填充剩余空间
+        container = ctk.CTkFrame(self, fg_color="transparent")
+        container.pack(fill="both", expand=True, padx=40)
+
+        # 封装输入项构建逻辑
+        self.title_entry = self.create_input_item(container, "任务名称", "例如：喝水提醒", task["title"] if task else "")
+        self.content_entry = self.create_input_item(container, "提醒内容", "例如：该喝水啦！", task["content"] if task else "")
+        self.interval_entry = self.create_input_item(container, "循环间隔 (分钟)", "30", str(task["interval"]) if task else "30")
+        self.schedule_entry = self.create_input_item(
+            container, "提醒规则 (可选)", "如：工作日 09:00,14:30 / 工作日 09:00-18:00 / 0 9 * * 1-5",
+            task.get("schedule", "") if task else ""
+        )
+
+    def create_input_item(self, parent, label_text, placeholder, initial_value):
+        item_frame = ctk.CTkFrame(parent, fg_color="transparent")
+        item_frame.pack(fill="x", pady=(0, 18)) # 稍微减少间距
+        
+        ctk.CTkLabel(
+            item_frame, text=label_text, 
+            font=(FONT_NAME, 13, "bold"), 
+            text_color=COLORS["text_secondary"]
+        ).pack(anchor="w", pady=(0, 6))
+        
+        entry = ctk.CTkEntry(
+            item_frame, height=44, placeholder_text=placeholder,
+            fg_color="#F2F2F7", border_width=0,
+            text_color=COLORS["text_main"], corner_radius=10,
+            font=(FONT_NAME, 14)
+        )
+        entry.pack(fill="x")
+        if initial_value:
+            entry.insert(0, initial_value)
+        return entry
+
+    def save(self):
+        try:
+            task = validate_task(
+                self.title_entry.get(),
+                self.content_entry.get(),
+                self.interval_entry.get(),
+                task_id=self.task_id,
+                schedule=self.schedule_entry.get()
+            )
+            if self.on_save:
+                self.on_save(task)
+            self.destroy()
+        except Exception as e:
+            messagebox.showwarning("提示", str(e))
+
+class ReminderApp(ctk.CTk):
+    def __init__(self, engine, silent=True):
+        super().__init__()
+        self.title(APP_NAME)
+        self.geometry("480x600")
+        self.configure(fg_color=COLORS["background"])
+        
+        # 界面是挂在引擎上的客户端：引擎（调度线程）在导入界面模块之前就已启动
+        self.engine = engine
+        self.engine.subscribe(self.on_engine_event)
+        
+        self.ui_ready = False
+        self.release_job = None
+        self.memory_report = None # 最近一次释放界面前后的常驻内存
+        # 释放效果作为运行指标发布（托盘「运行指标」和 metrics.prom 中可见），尚未释放过时为空
+        METRICS.gauge("ui_release_memory_before_bytes", "最近一次释放界面前的常驻内存（字节）",
+                      lambda: (self.memory_report or {}).get("before"))
+        METRICS.gauge("ui_release_memory_after_bytes", "最近一次释放界面后的常驻内存（字节）",
+                      lambda: (self.memory_report or {}).get("after"))
+        METRICS.gauge("ui_release_widgets", "最近一次释放界面销毁的控件数",
+                      lambda: ((self.memory_report or {}).get("widgets") or {}).get("destroyed"))
+        self.last_show_latency = None
+        self.metrics_dialog = None
+        self.search_index = None # 后台构建完成前为 None
+        self.search_generation = 0
+        self.pending_index_events = [] # 索引构建期间到达的引擎事件，构建完成后补上
+        self.query = ""
+        self.search_job = None
+        self.protocol("WM_DELETE_WINDOW", self.hide_to_tray)
+
+        if silent:
+            # 初始隐藏，主界面等第一次打开时再构建
+            self.withdraw()
+        else:
+            self.setup_ui()
+
+        # 托盘图标在进入主循环后立即创建；快捷方式检查推迟到后台空闲阶段
+        self.after(0, self.create_tray_icon)
+        self.after(3000, self.start_idle_tasks)
+
+    def setup_ui(self):
+        # 顶部标题栏 (仅此处允许拖动窗口)
+        self.header_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.header_frame.pack(fill="x", padx=30, pady=(40, 20))
+        
+        # 绑定拖动事件到标题栏及其子组件
+        for widget in [self.header_frame]:
+            widget.bind("<Button-1>", self.start_move)
+            widget.bind("<B1-Motion>", self.do_move)
+
+        self.title_label = ctk.CTkLabel(
+            self.header_frame, text=APP_NAME, 
+            font=(FONT_NAME, 32, "bold"), 
+            text_color=COLORS["text_main"]
+        )
+        self.title_label.pack(side="left")
+        self.title_label.bind("<Button-1>", self.start_move)
+        self.title_label.bind("<B1-Motion>", self.do_move)
+
+        # 自启动开关
+        self.autostart_switch = ctk.CTkSwitch(
+            self.header_frame, text="开机自启动", 
+            font=(FONT_NAME, 12),
+            text_color=COLORS["text_secondary"],
+            progress_color=COLORS["accent"],
+            command=self.toggle_autostart
+        )
+        self.autostart_switch.pack(side="left", padx=(20, 0), pady=(8, 0))
+        
+        # 根据当前状态初始化开关
+        if AutoStartManager.is_autostart_enabled():
+            self.autostart_switch.select()
+        
+        self.add_btn = ctk.CTkButton(
+            self.header_frame, text="+ 新建任务", width=110, height=38,
+            fg_color=COLORS["accent"], hover_color=COLORS["accent_hover"],
+            text_color="white",
+            font=(FONT_NAME, 13, "bold"), corner_radius=19,
+            command=self.open_add_dialog
+        )
+        self.add_btn.pack(side="right")
+        self.add_btn.configure(cursor="hand2")
+
+        # 搜索框：按标题和内容实时过滤
+        self.search_entry = ctk.CTkEntry(
+            self, height=36, corner_radius=18, border_width=1,
+            border_color="#E0E0E0", fg_color=COLORS["card_bg"],
+            text_color=COLORS["text_main"], font=(FONT_NAME, 13),
+            placeholder_text="搜索任务（标题或内容）"
+        )
+        self.search_entry.pack(fill="x", padx=30, pady=(0, 15))
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
+        self.search_entry.bind("<Escape>", self.clear_search)
+
+        # 任务列表（虚拟化，只为可见行创建卡片）
+        self.task_list = VirtualTaskList(
+            self,
+            on_edit=self.open_edit_dialog,
+            on_test=self.trigger_test,
+            on_delete=self.delete_task
+        )
+        self.task_list.pack(fill="both", expand=True, padx=25, pady=(0, 25))
+        
+        self.refresh_list()
+        self.ui_ready = True
+
+    def toggle_autostart(self):
+        enable = self.autostart_switch.get() == 1
+        AutoStartManager.set_autostart(enable)
+
+    def start_move(self, event):
+        self.x = event.x
+        self.y = event.y
+
+    def do_move(self, event):
+        deltax = event.x - self.x
+        deltay = event.y - self.y
+        x = self.winfo_x() + deltax
+        y = self.winfo_y() + deltay
+        self.geometry(f"+{x}+{y}")
+
+    def refresh_list(self):
+        snapshot = self.engine.tasks
+        self.build_search_index(snapshot)
+        self.task_list.set_tasks(self.visible_tasks(snapshot))
+
+    # ---------- 搜索 ----------
+    def build_search_index(self, snapshot):
+        """在后台线程中从不可变快照构建索引，不阻塞主界面的首次显示"""
+        self.search_generation += 1
+        generation = self.search_generation
+        self.search_index = None
+        self.pending_index_events = []
+
+        def build():
+            index = TaskSearchIndex()
+            try:
+                index.build(snapshot)
+            except Exception as e:
+                logging.error(f"构建搜索索引失败: {e}")
+                return
+            self.after(0, self._search_index_ready, index, generation)
+
+        threading.Thread(target=build, daemon=True).start()
+
+    def _search_index_ready(self, index, generation):
+        if generation != self.search_generation:
+            return # 构建期间任务列表被整体替换，已经有更新的构建
+        for event, payload in self.pending_index_events:
+            if event == "upsert":
+                index.add(payload)
+            else:
+                index.remove(payload)
+        self.pending_index_events = []
+        self.search_index = index
+        if self.query:
+            # 索引就绪前输入的查询（或整体刷新时保留的查询）当时只能显示全部任务，现在补上过滤
+            self.apply_search(force=True)
+
+    def on_search_key(self, event=None):
+        # 连续输入时只在空闲时过滤一次
+        if self.search_job is None:
+            self.search_job = self.after_idle(self.apply_search)
+
+    def clear_search(self, event=None):
+        self.search_entry.delete(0, "end")
+        self.focus() # 失去焦点后重新显示占位提示
+        self.on_search_key()
+
+    def apply_search(self, force=False):
+        self.search_job = None
+        query = self.search_entry.get().strip()
+        if query == self.query and not force:
+            return
+        self.query = query
+        with UI_SEARCH_SECONDS.time():
+            self.task_list.set_tasks(self.visible_tasks(self.engine.tasks))
+
+    def visible_tasks(self, snapshot):
+        """当前查询匹配的任务，保持原有顺序；索引尚未就绪时先显示全部"""
+        if not self.query or self.search_index is None:
+            return snapshot
+        ids = self.search_index.search(self.query)
+        if ids is None:
+            return snapshot
+        if len(ids) * 4 > len(snapshot):
+            return [r for r in snapshot.records if r.id in ids]
+        records = snapshot.records
+        return [records[i] for i in sorted(snapshot.index[task_id] for task_id in ids)]
+
+    def open_add_dialog(self):
+        SettingsDialog(self, on_save=self.save_task)
+
+    def open_edit_dialog(self, task):
+        SettingsDialog(self, task=task, on_save=self.save_task)
+
+    def save_task(self, task):
+        # 更新或添加；列表通过引擎事件按 id 只更新对应的一张卡片
+        self.engine.upsert_task(task)
+
+    def delete_task(self, task):
+        def do_delete():
+            self.engine.delete_task(task["id"])
+            
+        CustomConfirmDialog(
+            self, 
+            title="删除任务", 
+            message=f"确定要删除任务 '{task['title']}' 吗？\n删除后将无法恢复。", 
+            on_confirm=do_delete
+        )
+
+    def trigger_test(self, task):
+        self.engine.test_trigger(task)
+
+    def on_engine_event(self, event, payload):
+        if event == "fired":
+            return # 触发事件供本地 API 推送使用，界面不需要
+        # 引擎事件可能来自其他线程，切回界面线程处理
+        self.after(0, self.apply_engine_event, event, payload)
+
+    def apply_engine_event(self, event, payload):
+        if not self.ui_ready:
+            return # 主界面尚未构建，构建时会直接读取引擎中的最新任务
+        if event == "reset":
+            self.build_search_index(payload)
+            self.task_list.set_tasks(self.visible_tasks(payload))
+            return
+        index = self.search_index
+        if index is None:
+            self.pending_index_events.append((event, payload))
+        elif event == "upsert":
+            index.add(payload)
+        else:
+            index.remove(payload)
+        if event == "remove":
+            self.task_list.remove(payload)
+        elif not self.query or index is None or index.matches(payload["id"], self.query):
+            self.task_list.upsert(payload)
+        else:
+            self.task_list.remove(payload["id"]) # 修改后不再匹配当前查询
+
+    def hide_to_tray(self):
+        self.withdraw()
+        # 隐藏超过 release_after 秒后释放任务卡片，节省常驻托盘时的内存（<= 0 表示不释放）
+        release_after = float(self.engine.config.get("release_after", 300))
+        if self.ui_ready and release_after > 0 and self.release_job is None:
+            self.release_job = self.after(int(release_after * 1000), self.release_widgets)
+
+    def release_widgets(self):
+        self.release_job = None
+        if self.state() != "withdrawn" or self.task_list.released:
+            return
+        before = resident_memory()
+        self.task_list.release()
+        gc.collect()
+        trim_working_set()
+        after = resident_memory()
+        self.memory_report = {"before": before, "after": after, "widgets": self.task_list.last_op}
+        if before and after:
+            logging.info(f"隐藏到托盘后释放界面: {before / 1048576:.1f} MB -> {after / 1048576:.1f} MB")
+
+    def show_window(self):
+        start = time.perf_counter()
+        if self.release_job is not None:
+            self.after_cancel(self.release_job)
+            self.release_job = None
+        if not self.ui_ready:
+            self.setup_ui()
+        elif self.task_list.released:
+            self.task_list.restore()
+        self.deiconify()
+        self.lift()
+        self.focus_force()
+        # 窗口内容绘制完成后记录从点击到可见的耗时
+        self.after_idle(self._record_show_latency, start)
+
+    def _record_show_latency(self, start):
+        self.last_show_latency = time.perf_counter() - start
+        UI_SHOW_SECONDS.observe(self.last_show_latency)
+        if self.last_show_latency > SHOW_LATENCY_TARGET:
+            logging.warning(f"主界面显示耗时 {self.last_show_latency * 1000:.0f} ms，超过目标 {SHOW_LATENCY_TARGET * 1000:.0f} ms")
+
+    def create_tray_icon(self):
+        if hasattr(self, 'tray_icon'):
+            return
+        image = AssetCache.get_image("tray")
+
+        # 菜单回调运行在 pystray 的线程中，涉及界面的操作一律用 after 切回界面线程
+        menu = (
+            item('显示主界面', lambda: self.after(0, self.show_window), default=True),
+            item('导入任务…', lambda: self.after(0, self.import_tasks)),
+            item('导出任务…', lambda: self.after(0, self.export_tasks)),
+            item('运行指标', lambda: self.after(0, self.show_metrics)),
+            item('日志级别', pystray.Menu(*(
+                item(
+                    level, lambda icon, menu_item: LogManager.set_level(menu_item.text),
+                    checked=lambda menu_item: LogManager.get_level() == menu_item.text, radio=True
+                )
+                for level in LogManager.LEVELS
+            ))),
+            item('退出', lambda: self.after(0, self.quit_app))
+        )
+        self.tray_icon = pystray.Icon("remind_manager", image, "提醒管家", menu)
+        # 双击托盘图标显示窗口 (部分平台支持)
+        self.tray_icon.on_activate = lambda: self.after(0, self.show_window)
+        threading.Thread(target=self.tray_icon.run, daemon=True).start()
+
+    # ---------- 导入导出 ----------
+    TRANSFER_FILETYPES = [("JSON Lines", "*.jsonl"), ("CSV", "*.csv")]
+
+    def import_tasks(self):
+        path = filedialog.askopenfilename(
+            parent=self, title="导入任务", filetypes=self.TRANSFER_FILETYPES + [("所有文件", "*.*")]
+        )
+        if path:
+            self._run_transfer("导入任务", lambda: TaskTransfer.summarize(self.engine.import_tasks(path)))
+
+    def export_tasks(self):
+        path = filedialog.asksaveasfilename(
+            parent=self, title="导出任务", defaultextension=".jsonl",
+            filetypes=self.TRANSFER_FILETYPES, initialfile="tasks.jsonl"
+        )
+        if path:
+            self._run_transfer("导出任务", lambda: f"已导出 {self.engine.export_tasks(path)} 个任务到\n{path}")
+
+    def _run_transfer(self, title, work):
+        """几万行的文件放到后台线程处理，完成后回到界面线程显示结果；列表通过引擎的 reset 事件整体刷新"""
+        def run():
+            try:
+                message, show = work(), messagebox.showinfo
+            except Exception as e:
+                logging.error(f"{title}失败: {e}")
+                message, show = str(e), messagebox.showwarning
+            self.after(0, lambda: show(title, message, parent=self))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_metrics(self):
+        if self.metrics_dialog is not None and self.metrics_dialog.winfo_exists():
+            self.metrics_dialog.refresh()
+            self.metrics_dialog.lift()
+            return
+        self.metrics_dialog = MetricsDialog(self)
+
+    def quit_app(self):
+        if hasattr(self, 'tray_icon'):
+            self.tray_icon.stop()
+        # 退出前把尚未落盘的编辑写完
+        self.engine.stop()
+        self.quit()
+        sys.exit(0)
+
+    def start_idle_tasks(self):
+        """后台空闲阶段：快捷方式检查涉及 COM 调用，放到独立线程，不阻塞界面"""
+        threading.Thread(target=self.create_shortcut, daemon=True).start()
+
+    def create_shortcut(self):
+        try:
+            with STARTUP.timed_import("win32com"):
+                import pythoncom
+                import winshell
+                from win32com.client import Dispatch
+        except ImportError as e:
+            logging.error(f"创建快捷方式失败: {e}")
+            return
+        # 后台线程使用 COM 前需要先初始化
+        pythoncom.CoInitialize()
+        try:
+            create_app_icon()
+            desktop = winshell.desktop()
+            path = os.path.join(desktop, f"{APP_NAME}.lnk")
+            
+            # 使用 pythonw.exe 隐藏控制台
+            python_exe = sys.executable
+            pythonw_exe = python_exe.replace("python.exe", "pythonw.exe")
+            if not os.path.exists(pythonw_exe):
+                pythonw_exe = python_exe
+
+            # 检查是否需要更新快捷方式
+            # 手动点击快捷方式时不带 --silent，以便显示主界面
+            should_create = True
+            if os.path.exists(path):
+                try:
+                    shell = Dispatch('WScript.Shell')
+                    shortcut = shell.CreateShortCut(path)
+                    if "pythonw.exe" in shortcut.Targetpath.lower() and \
+                       shortcut.WorkingDirectory == BASE_DIR and \
+                       "--silent" not in shortcut.Arguments:
+                        should_create = False
+                except:
+                    pass
+            
+            if should_create:
+                shell = Dispatch('WScript.Shell')
+                shortcut = shell.CreateShortCut(path)
+                shortcut.Targetpath = pythonw_exe
+                shortcut.Arguments = f'"{MAIN_SCRIPT}"'
+                shortcut.WorkingDirectory = BASE_DIR
+                shortcut.IconLocation = ICON_FILE if os.path.exists(ICON_FILE) else pythonw_exe
+                shortcut.Description = "提醒管家 - macOS 风格提醒工具"
+                shortcut.save()
+        except Exception as e:
+            logging.error(f"创建快捷方式失败: {e}")
+        finally:
+            pythoncom.CoUninitialize()
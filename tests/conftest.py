@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import logging.handlers
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import core
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """配置、日志、数据库和调度状态全部写到临时目录，不碰 src/ 下的真实数据"""
+    for name, filename in (("CONFIG_FILE", "config.json"), ("JOURNAL_FILE", "config.journal"),
+                           ("DB_FILE", "tasks.db"), ("STATE_FILE", "scheduler_state.log"),
+                           ("METRICS_FILE", "metrics.prom")):
+        monkeypatch.setattr(core, name, str(tmp_path / filename))
+    monkeypatch.setattr(core.ConfigManager, "store", None)
+    monkeypatch.setattr(core.ConfigManager, "known_hash", None)
+    monkeypatch.setattr(core.ConfigManager, "_journal_entries", 0)
+    return tmp_path
+
+
+@pytest.fixture(autouse=True, scope="session")
+def log_file(tmp_path_factory):
+    """日志写入线程换成写临时目录中的 error.log"""
+    core.LOG_FILE = str(tmp_path_factory.mktemp("log") / "error.log")
+    core.LogManager.stop()
+    core.LogManager.listener = logging.handlers.QueueListener(
+        core.LogManager.queue, core.LogManager._file_handler(**core.LogManager.options)
+    )
+    core.LogManager.listener.start()
+    yield core.LOG_FILE
+    core.LogManager.stop()
+
+
+def wait_for(predicate, timeout=3.0):
+    """等待后台线程完成某件事，超时返回 False"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class FakeClock:
+    """可以手动推进的墙上时间 / 单调时钟"""
+    def __init__(self, wall=1_780_000_000.0, mono=1000.0):
+        self.wall = wall
+        self.mono = mono
+
+    def time(self):
+        return self.wall
+
+    def monotonic(self):
+        return self.mono
+
+    def advance(self, seconds):
+        """正常经过（或系统休眠：单调时钟包含休眠时间）"""
+        self.wall += seconds
+        self.mono += seconds
+
+    def jump(self, seconds):
+        """只调整系统时间"""
+        self.wall += seconds
+
+
+class RecordingDispatcher:
+    """记录提交的提醒，代替通知派发线程池"""
+    def __init__(self):
+        self.sent = []
+
+    def submit(self, task):
+        self.sent.append(task)
+        return True
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def make_scheduler(clock):
+    def make(tasks=(), catch_up="once", state_log=None, **kwargs):
+        dispatcher = RecordingDispatcher()
+        scheduler = core.TaskScheduler(
+            None, dispatcher=dispatcher, state_log=state_log, catch_up=catch_up,
+            clock=clock.time, monotonic=clock.monotonic, **kwargs
+        )
+        scheduler.handle_message({"type": "replace", "tasks": list(tasks)})
+        return scheduler, dispatcher
+    return make
+
+
+@pytest.fixture
+def engine():
+    """完整的引擎（保存线程、调度线程、派发线程池），通知只记录在内存中"""
+    engine = core.ReminderEngine(notifier=core.MemoryNotifier()).start()
+    yield engine
+    engine.stop()
@@ -0,0 +1,158 @@
+"""界面测试用的替身：customtkinter / PIL / pystray 以及 tk.Canvas、tk.Menu
+
+替身只记录控件树和配置，不创建真实窗口，测试不需要显示器。
+after / after_idle 只把回调记入 Root.jobs，由测试调用 run_jobs() 在当前线程中执行，
+相当于手动推进 Tk 主循环。
+"""
+import itertools
+import types
+
+
+class Widget:
+    def __init__(self, master=None, *args, **kwargs):
+        self.master = master
+        self._children = []
+        self.options = dict(kwargs)
+        self.destroyed = False
+        if isinstance(master, Widget):
+            master._children.append(self)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None # pack、grid、bind 等布局和事件方法一律忽略
+
+    def winfo_children(self):
+        return list(self._children)
+
+    def winfo_exists(self):
+        return not self.destroyed
+
+    def winfo_width(self):
+        return 480
+
+    def winfo_height(self):
+        return 600
+
+    def configure(self, **kwargs):
+        self.options.update(kwargs)
+
+    config = configure
+
+    def cget(self, key):
+        return self.options.get(key)
+
+    def destroy(self):
+        for child in list(self._children):
+            child.destroy()
+        if isinstance(self.master, Widget) and self in self.master._children:
+            self.master._children.remove(self)
+        self.destroyed = True
+
+
+class Root(Widget):
+    def __init__(self, *args, **kwargs):
+        super().__init__(None)
+        self.jobs = []
+        self._job_ids = itertools.count(1)
+
+    def after(self, ms, func=None, *args):
+        job = next(self._job_ids)
+        self.jobs.append((job, ms, func, args))
+        return job
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def after_cancel(self, job):
+        self.jobs = [j for j in self.jobs if j[0] != job]
+
+    def run_jobs(self):
+        """执行所有立即到期的回调（包括执行过程中新加入的），延迟执行的回调保留不动"""
+        while True:
+            ready = [j for j in self.jobs if j[1] == 0]
+            if not ready:
+                return
+            self.jobs = [j for j in self.jobs if j[1] != 0]
+            for _, _, func, args in ready:
+                func(*args)
+
+
+class Entry(Widget):
+    def __init__(self, master=None, *args, **kwargs):
+        super().__init__(master, *args, **kwargs)
+        self.text = ""
+
+    def get(self):
+        return self.text
+
+    def insert(self, index, text):
+        self.text = self.text + text if index == "end" else text + self.text
+
+    def delete(self, first, last=None):
+        self.text = ""
+
+
+class Canvas(Widget):
+    def __init__(self, master=None, *args, **kwargs):
+        super().__init__(master, *args, **kwargs)
+        self.items = {}
+        self._item_ids = itertools.count(1)
+
+    def create_window(self, x, y, window=None, **kwargs):
+        item = next(self._item_ids)
+        self.items[item] = [x, y]
+        return item
+
+    def coords(self, item, x, y):
+        self.items[item] = [x, y]
+
+    def delete(self, item):
+        self.items.pop(item, None)
+
+    def canvasy(self, y):
+        return float(y)
+
+
+class Image:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def load(self):
+        pass
+
+    def save(self, path, format=None):
+        with open(path, "wb") as f:
+            f.write(b"")
+
+
+class ScalingTracker:
+    @staticmethod
+    def get_widget_scaling(widget):
+        return 1.0
+
+
+def modules():
+    """要放进 sys.modules 的替身模块"""
+    ctk = types.ModuleType("customtkinter")
+    ctk.CTk = Root
+    ctk.CTkEntry = Entry
+    for name in ("CTkFrame", "CTkToplevel", "CTkLabel", "CTkButton", "CTkScrollbar", "CTkSwitch",
+                 "CTkTextbox", "CTkImage"):
+        setattr(ctk, name, type(name, (Widget,), {}))
+    ctk.ScalingTracker = ScalingTracker
+    ctk.set_appearance_mode = ctk.set_default_color_theme = lambda *args: None
+
+    pil = types.ModuleType("PIL")
+    pil.Image = types.ModuleType("PIL.Image")
+    pil.Image.new = pil.Image.open = Image
+    pil.ImageDraw = types.ModuleType("PIL.ImageDraw")
+    pil.ImageDraw.Draw = Widget
+
+    pystray = types.ModuleType("pystray")
+    pystray.Icon = Widget
+    pystray.Menu = Widget
+    pystray.MenuItem = lambda *args, **kwargs: args
+
+    return {"customtkinter": ctk, "PIL": pil, "PIL.Image": pil.Image, "PIL.ImageDraw": pil.ImageDraw,
+            "pystray": pystray}
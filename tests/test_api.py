@@ -0,0 +1,104 @@
+import http.client
+import json
+import socket
+
+import pytest
+
+import api
+import core
+from conftest import wait_for
+
+
+@pytest.fixture
+def server(engine):
+    server = api.ApiServer(engine, 0).start()
+    yield server
+    server.stop()
+
+
+def request(server, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    conn.request(method, path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    data = response.read().decode("utf-8")
+    conn.close()
+    return response.status, json.loads(data) if response.getheader("Content-Type", "").startswith("application/json") else data
+
+
+def post_batch(server, payload):
+    return request(server, "POST", "/tasks/batch", json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                   {"Content-Type": "application/json"})
+
+
+def test_engine_starts_api_on_a_system_assigned_port(data_dir):
+    engine = core.ReminderEngine(notifier=core.MemoryNotifier(), api_port=0).start()
+    try:
+        assert engine.api is not None and engine.api.port > 0
+        assert request(engine.api, "GET", "/health")[0] == 200
+    finally:
+        engine.stop()
+
+
+@pytest.mark.parametrize("host, status", [
+    (None, 200), # http.client 自动填写 127.0.0.1:端口
+    ("localhost:{port}", 200),
+    ("evil.example:{port}", 421),
+    ("127.0.0.1:1", 421),
+    ("", 421),
+])
+def test_host_check(server, host, status):
+    headers = {} if host is None else {"Host": host.format(port=server.port)}
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    conn.putrequest("GET", "/health", skip_host=host is not None)
+    for name, value in headers.items():
+        conn.putheader(name, value)
+    conn.endheaders()
+    assert conn.getresponse().status == status
+    conn.close()
+
+
+def test_batch_requires_json_content_type(server):
+    status, reply = request(server, "POST", "/tasks/batch", b'{"upsert": []}', {"Content-Type": "text/plain"})
+    assert status == 415 and reply["ok"] is False
+
+
+def test_batch_is_validated_as_a_whole(server, engine):
+    status, reply = post_batch(server, {"upsert": [
+        {"title": "喝水", "content": "起来喝水", "interval": 30},
+        {"title": "", "content": "没有标题", "interval": 30},
+    ]})
+    assert status == 400 and "第 2 个任务" in reply["error"]
+    assert len(engine.tasks) == 0
+
+    status, reply = post_batch(server, {"upsert": [{"id": "a", "title": "喝水", "content": "c", "interval": 30},
+                                                   {"id": "b", "title": "站立", "content": "c", "interval": 45}]})
+    assert status == 200 and reply == {"ok": True, "persisted": True, "upserted": ["a", "b"], "deleted": []}
+    status, reply = post_batch(server, {"delete": ["a", "missing"]})
+    assert reply["deleted"] == ["a"]
+    assert [t["id"] for t in core.ConfigManager.load()["tasks"]] == ["b"]
+    assert request(server, "GET", "/tasks")[1]["tasks"] == engine.tasks.to_dicts()
+
+
+def test_batch_reports_a_failed_save(server, engine, monkeypatch):
+    # 只在这次请求期间让落盘失败，退出时 engine.stop() 仍要把改动写进临时目录
+    with monkeypatch.context() as m:
+        m.setattr(engine.saver, "flush", lambda timeout=5.0: False)
+        status, reply = post_batch(server, {"upsert": [{"id": "a", "title": "喝水", "content": "c", "interval": 30}]})
+    assert status == 503
+    assert reply["ok"] is False and reply["persisted"] is False and reply["upserted"] == ["a"]
+    assert engine.get_task("a") is not None # 改动已生效，等待后台重试落盘
+
+
+def test_fired_events_are_streamed(server, engine):
+    task = engine.upsert_task(core.validate_task("喝水", "起来喝水", "30"))
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as sock:
+        sock.sendall(f"GET /events HTTP/1.1\r\nHost: 127.0.0.1:{server.port}\r\n\r\n".encode("latin-1"))
+        f = sock.makefile("rb")
+        assert f.readline().startswith(b"HTTP/1.1 200")
+        while f.readline() != b"\r\n":
+            pass
+        assert wait_for(lambda: server.streams) # 等服务端登记这个客户端
+        engine.test_trigger(task)
+        assert f.readline() == b"event: fired\n"
+        event = json.loads(f.readline()[len(b"data: "):])
+        assert event["id"] == task["id"] and "fired_at" in event
@@ -0,0 +1,41 @@
+import json
+
+import core
+
+
+def write_config(data_dir, tasks):
+    (data_dir / "config.json").write_text(json.dumps({"tasks": tasks}, ensure_ascii=False), encoding="utf-8")
+
+
+def test_journal_replay_ignores_torn_last_line(data_dir):
+    write_config(data_dir, [
+        {"id": "1", "title": "喝水", "content": "起来喝水", "interval": 30},
+        {"id": "2", "title": "站立", "content": "活动一下", "interval": 45},
+    ])
+    entries = [
+        {"op": "upsert", "task": {"id": "1", "title": "喝水", "content": "喝一杯", "interval": 20}},
+        {"op": "batch", "entries": [
+            {"op": "delete", "id": "2"},
+            {"op": "upsert", "task": {"id": "3", "title": "远眺", "content": "看看远处", "interval": 60}},
+        ]},
+    ]
+    lines = [json.dumps(e, ensure_ascii=False) for e in entries]
+    torn = json.dumps({"op": "upsert", "task": {"id": "4", "title": "写了一半"}}, ensure_ascii=False)[:25]
+    (data_dir / "config.journal").write_text("\n".join(lines) + "\n" + torn, encoding="utf-8")
+
+    data = core.ConfigManager.load()
+
+    assert [(t["id"], t["content"]) for t in data["tasks"]] == [("1", "喝一杯"), ("3", "看看远处")]
+    # 末尾的半行触发压缩：快照已包含重放结果，日志被清空
+    assert not (data_dir / "config.journal").exists()
+    saved = json.loads((data_dir / "config.json").read_text(encoding="utf-8"))
+    assert [t["id"] for t in saved["tasks"]] == ["1", "3"]
+
+
+def test_journal_edits_survive_reload(data_dir):
+    write_config(data_dir, [])
+    data = core.ConfigManager.load()
+    task = {"id": "1", "title": "喝水", "content": "起来喝水", "interval": 30}
+    data["tasks"].append(task)
+    core.ConfigManager.record_upsert(data, task)
+    assert core.ConfigManager.load()["tasks"] == [task]
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import core
+from conftest import wait_for
+
+
+def reminder(i):
+    return {"id": str(i), "title": f"任务{i}", "content": f"内容{i}"}
+
+
+def test_slow_notifier_does_not_block_submit():
+    notifier = core.MemoryNotifier(delay=0.2)
+    dispatcher = core.NotificationDispatcher(notifier, workers=2)
+    dispatcher.start()
+    started = time.perf_counter()
+    for i in range(6):
+        assert dispatcher.submit(reminder(i))
+    assert time.perf_counter() - started < 0.1
+    assert wait_for(lambda: dispatcher.stats["delivered"] == 6)
+    assert sorted(title for title, _, _ in notifier.sent) == [f"任务{i}" for i in range(6)]
+    dispatcher.stop()
+
+
+def test_full_queue_drops_oldest():
+    gate = threading.Event()
+
+    class Blocked(core.Notifier):
+        def notify(self, title, content):
+            gate.wait()
+
+    dispatcher = core.NotificationDispatcher(Blocked(), workers=1, max_pending=2, notify_timeout=0)
+    dispatcher.start()
+    for i in range(5):
+        dispatcher.submit(reminder(i))
+        time.sleep(0.02) # 让工作线程先取走第一条
+    assert dispatcher.stats["dropped"] == 2
+    gate.set()
+    assert wait_for(lambda: dispatcher.stats["delivered"] == 3)
+    dispatcher.stop()
+
+
+def test_hung_notifier_is_abandoned_and_replaced():
+    release = threading.Event()
+    calls = []
+
+    class Hangs(core.Notifier):
+        def notify(self, title, content):
+            calls.append(title)
+            if len(calls) <= 2:
+                release.wait() # 前两次调用永远不返回（直到测试结束）
+
+    dispatcher = core.NotificationDispatcher(Hangs(), workers=2, notify_timeout=0.2)
+    dispatcher.start()
+    for i in range(8):
+        dispatcher.submit(reminder(i))
+    assert wait_for(lambda: dispatcher.stats["delivered"] == 6)
+    assert dispatcher.stats["timed_out"] == 2
+    assert len(dispatcher.threads) == 2
+    release.set()
+    dispatcher.stop()
+
+
+def test_rate_limit_groups_backlog_with_content():
+    notifier = core.MemoryNotifier()
+    dispatcher = core.NotificationDispatcher(notifier, workers=1, rate=5, burst=1)
+    for i in range(3):
+        dispatcher.submit(reminder(i))
+    dispatcher.start()
+    assert wait_for(lambda: dispatcher.stats["delivered"] == 3)
+    assert dispatcher.stats["notifications"] < 3
+    assert any("内容" in content for _, content, _ in notifier.sent)
+    dispatcher.stop()
+
+
+def test_group_notification_keeps_content_for_small_groups():
+    title, content = core.group_notification([("喝水", "起来喝水"), ("站立", "活动一下")])
+    assert "2" in title and "起来喝水" in content and "活动一下" in content
+    items = [(f"任务{i}", f"内容{i}") for i in range(8)]
+    title, content = core.group_notification(items)
+    assert "内容" not in content # 超过 GROUP_DETAIL 条只列标题
+    assert "任务4" in content and "任务5" not in content
@@ -0,0 +1,35 @@
+import sys
+import threading
+
+import core
+import main
+
+
+def test_engine_runs_without_gui(engine):
+    events = []
+    engine.subscribe(lambda event, payload: events.append((event, payload)))
+    task = core.validate_task("喝水", "起来喝水", "30")
+    engine.upsert_task(task)
+    assert [e for e, _ in events] == ["upsert"]
+    assert engine.get_task(task["id"])["title"] == "喝水"
+    # 无界面模式不能加载任何界面库
+    for name in ("gui", "customtkinter", "pystray", "PIL"):
+        assert name not in sys.modules
+
+
+def test_test_trigger_notifies_and_publishes_fired(engine):
+    fired = threading.Event()
+    engine.subscribe(lambda event, payload: event == "fired" and fired.set())
+    task = engine.upsert_task(core.validate_task("喝水", "起来喝水", "30"))
+    engine.test_trigger(task)
+    assert fired.wait(3)
+    assert engine.saver.flush()
+    assert [t["title"] for t in core.ConfigManager.load()["tasks"]] == ["喝水"]
+
+
+def test_launch_against_headless_engine_tells_the_user(monkeypatch):
+    shown = []
+    monkeypatch.setattr(main, "send_command", lambda cmd, args, timeout: {"ok": True, "headless": True})
+    monkeypatch.setattr(main, "show_info", shown.append)
+    main.hand_off(main.parse_args([]))
+    assert shown == [main.HEADLESS_NOTICE]
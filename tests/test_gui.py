@@ -0,0 +1,162 @@
+import importlib
+import sys
+import threading
+
+import pytest
+
+import fake_ui
+from conftest import wait_for
+
+
+@pytest.fixture
+def gui(monkeypatch, data_dir):
+    """用替身控件导入 gui 模块，测试结束后卸载，不影响其他测试对“未加载界面库”的检查"""
+    for name, module in fake_ui.modules().items():
+        monkeypatch.setitem(sys.modules, name, module)
+    sys.modules.pop("gui", None)
+    gui = importlib.import_module("gui")
+    monkeypatch.setattr(gui.tk, "Canvas", fake_ui.Canvas)
+    monkeypatch.setattr(gui.tk, "Menu", fake_ui.Widget)
+    monkeypatch.setattr(gui, "ASSET_CACHE_DIR", str(data_dir / "cache"))
+    yield gui
+    sys.modules.pop("gui", None)
+
+
+def task(i, **extra):
+    return dict({"id": str(i), "title": f"任务{i}", "content": "时间到了", "interval": 30}, **extra)
+
+
+@pytest.fixture
+def task_list(gui):
+    task_list = gui.VirtualTaskList(fake_ui.Widget(), on_edit=None, on_test=None, on_delete=None)
+    task_list.set_tasks([task(i) for i in range(50)])
+    return task_list
+
+
+@pytest.fixture
+def rebinds(gui, monkeypatch):
+    """记录 TaskCard.set_task 的调用（卡片重新绑定到任务）"""
+    calls = []
+    set_task = gui.TaskCard.set_task
+
+    def record(card, task):
+        calls.append(task["id"])
+        set_task(card, task)
+
+    monkeypatch.setattr(gui.TaskCard, "set_task", record)
+    return calls
+
+
+def test_initial_render_creates_only_visible_cards(gui, task_list):
+    # 600 像素高的列表、每行 128 像素：5 张卡片铺满可视区域，外加 1 张滚动用
+    assert len(task_list.pool) == 6
+    assert task_list.last_op["op"] == "reset"
+    assert task_list.last_op["created"] == gui.WIDGET_STATS["created"] > 0
+    assert task_list.last_op["destroyed"] == 0
+
+
+def test_edit_rebinds_only_its_own_card(task_list, rebinds):
+    task_list.upsert(task(2, title="改过"))
+    assert task_list.last_op == {"op": "update", "created": 0, "destroyed": 0}
+    assert rebinds == ["2"]
+    card = next(card for card, _ in task_list.pool if card.task["id"] == "2")
+    assert card.title_label.cget("text") == "改过"
+
+
+def test_edit_outside_the_viewport_touches_no_card(task_list, rebinds):
+    task_list.upsert(task(40, title="改过"))
+    assert task_list.last_op == {"op": "update", "created": 0, "destroyed": 0}
+    assert rebinds == []
+
+
+def test_insert_and_remove_create_and_destroy_no_widgets(task_list, rebinds):
+    task_list.upsert(task(99))
+    assert task_list.last_op == {"op": "insert", "created": 0, "destroyed": 0}
+    assert rebinds == [] # 追加在末尾，不在可视区域内
+    task_list.remove("3")
+    assert task_list.last_op == {"op": "remove", "created": 0, "destroyed": 0}
+    # 只有被删除行之后的可见行上移一行
+    assert rebinds == ["4", "5", "6"]
+    assert [t["id"] for t in task_list.tasks[2:5]] == ["2", "4", "5"]
+    assert task_list.index["99"] == 49
+
+
+def test_release_and_restore(task_list):
+    task_list.release()
+    assert task_list.last_op["destroyed"] > 0 and task_list.pool == []
+    task_list.upsert(task(1, title="隐藏期间修改"))
+    assert task_list.last_op["created"] == 0 # 释放期间只更新行数据
+    task_list.restore()
+    assert len(task_list.pool) == 6
+    assert task_list.pool[1][0].task["title"] == "隐藏期间修改"
+
+
+@pytest.fixture
+def index_gate(gui, monkeypatch):
+    """后台构建搜索索引时先等这个事件，模拟任务很多、索引迟迟没有就绪的情况"""
+    gate = threading.Event()
+    build = gui.TaskSearchIndex.build
+
+    def gated_build(index, tasks):
+        gate.wait(5)
+        build(index, tasks)
+
+    monkeypatch.setattr(gui.TaskSearchIndex, "build", gated_build)
+    return gate
+
+
+def finish_index(app, gate):
+    gate.set()
+    # 构建线程通过 after 把索引交回界面线程
+    assert wait_for(lambda: any(func == app._search_index_ready for _, _, func, _ in app.jobs))
+    app.run_jobs()
+    assert app.search_index is not None
+
+
+def search(app, query):
+    app.search_entry.delete(0, "end")
+    app.search_entry.insert(0, query)
+    app.on_search_key()
+    app.run_jobs()
+
+
+def titles(app):
+    return [t["title"] for t in app.task_list.tasks]
+
+
+def test_query_typed_before_the_index_is_ready_is_applied(gui, engine, index_gate):
+    engine.apply_batch([task(i, title="喝水" if i % 2 else "站立") for i in range(10)])
+    app = gui.ReminderApp(engine, silent=False)
+    app.run_jobs()
+    search(app, "喝水")
+    assert len(titles(app)) == 10 # 索引还没好，先显示全部
+    finish_index(app, index_gate)
+    assert titles(app) == ["喝水"] * 5
+
+
+def test_query_survives_a_reset_that_rebuilds_the_index(gui, engine, index_gate):
+    engine.apply_batch([task(i, title="喝水" if i % 2 else "站立") for i in range(10)])
+    app = gui.ReminderApp(engine, silent=False)
+    finish_index(app, index_gate)
+    search(app, "喝水")
+    assert len(titles(app)) == 5
+
+    index_gate.clear()
+    engine.apply_batch([task(i, title="喝水") for i in range(10, 20)]) # 导入 / 批量接口：整体刷新
+    app.run_jobs()
+    assert app.search_index is None
+    finish_index(app, index_gate)
+    assert titles(app) == ["喝水"] * 15
+
+
+def test_edits_follow_the_current_query(gui, engine, index_gate):
+    engine.apply_batch([task(i, title="喝水" if i % 2 else "站立") for i in range(10)])
+    app = gui.ReminderApp(engine, silent=False)
+    finish_index(app, index_gate)
+    search(app, "喝水")
+    engine.upsert_task(task(1, title="站立")) # 改后不再匹配
+    engine.upsert_task(task(2, title="喝水")) # 改后开始匹配
+    app.run_jobs()
+    assert sorted(t["id"] for t in app.task_list.tasks) == ["2", "3", "5", "7", "9"]
+    search(app, "")
+    assert len(titles(app)) == 10
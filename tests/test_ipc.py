@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+import core
+
+
+@pytest.fixture(autouse=True)
+def runtime_dir(monkeypatch):
+    # Unix socket 路径长度有限，使用较短的临时目录，也不会连到正在运行的真实实例
+    path = tempfile.mkdtemp(prefix="rm-")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", path)
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def server(engine):
+    server = core.CommandServer(engine)
+    assert server.bind()
+    server.start()
+    yield server
+    server.close()
+
+
+def test_round_trip(server, engine):
+    assert core.send_command("ping") == {"pid": os.getpid(), "ok": True}
+    reply = core.send_command("add_task", {"title": "喝水", "content": "起来喝水", "interval": "30"})
+    assert reply["ok"]
+    assert engine.get_task(reply["id"])["title"] == "喝水"
+    assert core.send_command("test", {"id": reply["id"]}) == {"ok": True}
+
+
+def test_errors_are_replied_not_raised(server):
+    assert core.send_command("bogus") == {"ok": False, "error": "未知指令: bogus"}
+    reply = core.send_command("add_task", {"title": "", "content": "c", "interval": "30"})
+    assert reply["ok"] is False and reply["error"]
+    assert core.send_command("test", {"id": "none"}) == {"ok": False, "error": "任务不存在"}
+
+
+def test_registered_handlers(server):
+    shown = []
+    server.register("show", lambda args: shown.append(args))
+    assert core.send_command("show", {"from": "test"}) == {"ok": True}
+    assert shown == [{"from": "test"}]
+
+
+def test_second_instance_cannot_bind(server):
+    assert not core.CommandServer().bind()
+
+
+def test_no_instance_and_stale_socket(runtime_dir):
+    assert core.send_command("ping") is None
+    open(core.ipc_address(), "w").close() # 上次异常退出留下的 socket 文件
+    server = core.CommandServer()
+    assert server.bind()
+    server.close()
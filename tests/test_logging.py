@@ -0,0 +1,72 @@
+import logging
+import logging.handlers
+
+import pytest
+
+import core
+
+
+@pytest.fixture
+def log_manager(tmp_path, monkeypatch, log_file):
+    """日志改写到本测试的临时目录，结束后恢复会话级的写入线程和日志级别"""
+    level = logging.getLogger().level
+    options, config_level = core.LogManager.options, core.LogManager.config_level
+    core.LogManager.stop()
+    monkeypatch.setattr(core, "LOG_FILE", str(tmp_path / "error.log"))
+    core.LogManager.listener = logging.handlers.QueueListener(
+        core.LogManager.queue, core.LogManager._file_handler(**options)
+    )
+    core.LogManager.listener.start()
+    yield tmp_path
+    core.LogManager.stop()
+    core.LOG_FILE = log_file
+    core.LogManager.options, core.LogManager.config_level = options, config_level
+    core.LogManager.listener = logging.handlers.QueueListener(
+        core.LogManager.queue, core.LogManager._file_handler(**options)
+    )
+    core.LogManager.listener.start()
+    logging.getLogger().setLevel(level)
+
+
+def read_log(log_dir):
+    core.LogManager.stop() # 写完队列中的记录
+    return (log_dir / "error.log").read_text(encoding="utf-8")
+
+
+def test_set_level_switches_at_runtime(log_manager):
+    assert core.LogManager.set_level("info") == "INFO"
+    assert core.LogManager.get_level() == "INFO"
+    logging.info("看得到")
+    core.LogManager.set_level("ERROR")
+    logging.info("看不到")
+    with pytest.raises(ValueError):
+        core.LogManager.set_level("verbose")
+    assert core.LogManager.get_level() == "ERROR"
+    text = read_log(log_manager)
+    assert "看得到" in text and "看不到" not in text
+
+
+def test_reload_keeps_a_runtime_level_unless_the_config_changes(log_manager):
+    core.LogManager.configure({"log_level": "ERROR"})
+    core.LogManager.set_level("DEBUG") # --log-level 或托盘菜单
+    core.LogManager.configure({"log_level": "ERROR"}) # 重新载入，配置中的级别没有变化
+    assert core.LogManager.get_level() == "DEBUG"
+    core.LogManager.configure({"log_level": "warning"})
+    assert core.LogManager.get_level() == "WARNING"
+
+
+def test_records_carry_context(log_manager):
+    with core.log_context(phase="schedule"):
+        logging.error("触发失败", extra={"task_id": "42"})
+    assert "触发失败 [phase=schedule task_id=42]" in read_log(log_manager)
+
+
+def test_size_rotation(log_manager):
+    core.LogManager.configure({"log_level": "ERROR", "log_max_bytes": 300, "log_backups": 2})
+    assert core.LogManager.options == {"rotation": "size", "max_bytes": 300, "backups": 2}
+    for i in range(40):
+        logging.error(f"第 {i} 条记录")
+    read_log(log_manager)
+    names = sorted(p.name for p in log_manager.iterdir())
+    assert names == ["error.log", "error.log.1", "error.log.2"] # 只保留 2 份旧日志
+    assert "第 39 条记录" in (log_manager / "error.log").read_text(encoding="utf-8")
@@ -0,0 +1,61 @@
+import core
+
+
+def test_render_prometheus_text():
+    registry = core.MetricsRegistry()
+    requests = registry.counter("requests_total", "请求数")
+    requests.inc(3)
+    latency = registry.histogram("latency_seconds", "延迟", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value)
+    registry.gauge("queue_depth", "队列深度", lambda: 7)
+    registry.gauge("broken", "取值失败", lambda: 1 / 0)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total 请求数",
+        "# TYPE requests_total counter",
+        "requests_total 3",
+        "# HELP latency_seconds 延迟",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 6.05",
+        "latency_seconds_count 4",
+        "# HELP queue_depth 队列深度",
+        "# TYPE queue_depth gauge",
+        "queue_depth 7",
+        "# HELP broken 取值失败",
+        "# TYPE broken gauge", # 取值失败的仪表只输出说明，不输出样本
+    ]
+
+
+def test_registering_twice_keeps_counters_and_replaces_gauges():
+    registry = core.MetricsRegistry()
+    first = registry.counter("requests_total", "请求数")
+    assert registry.counter("requests_total", "请求数") is first
+    registry.gauge("tasks", "任务数", lambda: 1)
+    registry.gauge("tasks", "任务数", lambda: 2)
+    assert registry.metrics["tasks"].value == 2
+
+
+def test_quantiles_and_summary():
+    registry = core.MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "延迟", buckets=(0.01, 0.1, 1.0))
+    assert registry.summary() == ["延迟: 暂无数据"]
+    for _ in range(99):
+        latency.observe(0.005)
+    latency.observe(0.5)
+    assert latency.quantile(0.5) == 0.01
+    assert latency.quantile(1.0) == 0.5 # 不超过实际最大值
+    registry.gauge("memory_bytes", "内存", lambda: 3 * 1048576)
+    assert registry.summary() == ["延迟: 100 次，p50 ≤ 10.0 ms，p99 ≤ 10.0 ms，最大 500.0 ms", "内存: 3.0 MB"]
+
+
+def test_write_is_atomic(data_dir):
+    registry = core.MetricsRegistry()
+    registry.counter("requests_total", "请求数").inc()
+    path = registry.write()
+    assert path == str(data_dir / "metrics.prom")
+    assert (data_dir / "metrics.prom").read_text(encoding="utf-8") == registry.render()
+    assert not (data_dir / "metrics.prom.tmp").exists()
@@ -0,0 +1,124 @@
+import json
+import threading
+
+import pytest
+
+import core
+
+
+def task(i, **extra):
+    return dict({"id": str(i), "title": f"任务{i}", "content": "时间到了", "interval": 30}, **extra)
+
+
+def write_config(data_dir, tasks, **settings):
+    data = dict(settings, watch_interval=0, tasks=tasks)
+    (data_dir / "config.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+@pytest.fixture
+def start_engine(data_dir):
+    engines = []
+
+    def start(tasks, **settings):
+        write_config(data_dir, tasks, **settings)
+        engine = core.ReminderEngine(notifier=core.MemoryNotifier()).start()
+        engines.append(engine)
+        return engine
+
+    yield start
+    for engine in engines:
+        engine.stop()
+
+
+def scheduled(engine):
+    """等调度线程处理完之前的指令，返回 {任务 id: 上次触发的计划时间}"""
+    engine.next_due().result(timeout=2)
+    return dict(engine.scheduler.last_triggered)
+
+
+def test_reload_applies_only_the_diff(start_engine, data_dir):
+    engine = start_engine([task(1), task(2), task(3)])
+    events = []
+    engine.subscribe(lambda event, payload: events.append((event, payload if event == "remove" else payload.id)))
+    before = scheduled(engine)
+
+    write_config(data_dir, [task(1), task(2, title="改过", interval=45), task(4)])
+    assert engine.reload() == {"added": 1, "changed": 1, "removed": 1, "tasks": 3}
+
+    after = scheduled(engine)
+    assert after["1"] == before["1"] # 未变化的任务保持原来的计时
+    assert after["2"] == before["2"] # 修改间隔也沿用原来的相位
+    assert "3" not in after and "4" in after
+    assert sorted(events) == [("remove", "3"), ("upsert", "2"), ("upsert", "4")]
+    assert engine.get_task("2").title == "改过"
+
+
+def test_watcher_reloads_only_external_changes(start_engine, data_dir):
+    engine = start_engine([task(1)])
+    watcher = core.ConfigWatcher(engine)
+    assert not watcher.check() # 没有变化
+
+    engine.upsert_task(task(2))
+    engine.saver.flush()
+    core.ConfigManager.save(dict(engine.config)) # 本进程自己写的快照不算外部修改
+    assert not watcher.check()
+
+    (data_dir / "config.json").write_text('{"tasks": [', encoding="utf-8") # 写到一半
+    assert not watcher.check()
+    assert len(engine.tasks) == 2
+
+    write_config(data_dir, [task(1), task(2), task(3)])
+    assert watcher.check()
+    assert watcher.stats["reloads"] == 1
+    assert [t.id for t in engine.tasks] == ["1", "2", "3"]
+
+
+def test_edits_during_reload_are_not_rolled_back(start_engine, data_dir, monkeypatch):
+    engine = start_engine([task(1)])
+    write_config(data_dir, [task(1), task(2)]) # 外部修改
+    editor = threading.Thread(target=engine.upsert_task, args=(task(1, title="界面修改"),))
+    real_load = core.ConfigManager.load
+
+    def load(strict=False):
+        # 重新载入读盘期间，界面线程提交一次编辑：它必须等到重新载入结束
+        editor.start()
+        editor.join(0.2)
+        assert editor.is_alive()
+        return real_load(strict)
+
+    monkeypatch.setattr(core.ConfigManager, "load", load)
+    engine.reload()
+    editor.join()
+
+    assert engine.get_task("1").title == "界面修改"
+    assert engine.saver.flush()
+    monkeypatch.setattr(core.ConfigManager, "load", real_load)
+    assert [t["title"] for t in core.ConfigManager.load()["tasks"]] == ["界面修改", "任务2"]
+
+
+def test_reload_waits_for_unsaved_edits(start_engine, data_dir, monkeypatch):
+    engine = start_engine([task(1)])
+    monkeypatch.setattr(engine.saver, "flush", lambda timeout=5.0: False)
+    watcher = core.ConfigWatcher(engine)
+    write_config(data_dir, [])
+    with pytest.raises(RuntimeError):
+        engine.reload()
+    assert not watcher.check()
+    assert watcher.signature is None # 下次检查时重试
+    assert len(engine.tasks) == 1
+
+
+def test_sqlite_reload_merges_tasks_from_config_json(start_engine, data_dir):
+    engine = start_engine([task(1), task(2)], storage="sqlite")
+    assert json.loads((data_dir / "config.json").read_text(encoding="utf-8"))["tasks"] == []
+
+    watcher = core.ConfigWatcher(engine)
+    write_config(data_dir, [task(2, title="脚本修改"), task(3)], storage="sqlite")
+    assert watcher.check()
+
+    assert [(t.id, t.title) for t in engine.tasks] == [("1", "任务1"), ("2", "脚本修改"), ("3", "任务3")]
+    assert [t["id"] for t in core.ConfigManager.store.all_tasks()] == ["1", "2", "3"]
+    # 合并之后 config.json 恢复为只保存设置，下次保存也不会覆盖掉这些任务
+    saved = json.loads((data_dir / "config.json").read_text(encoding="utf-8"))
+    assert saved["tasks"] == [] and saved["storage"] == "sqlite"
+    assert not core.ConfigManager.changed_externally()
@@ -0,0 +1,65 @@
+import datetime
+
+import pytest
+
+import core
+
+# 2026 年 6 月 1 日是周一，6 月 5 日是周五
+
+
+def at(day, hour, minute=0):
+    return datetime.datetime(2026, 6, day, hour, minute).timestamp()
+
+
+def next_after(text, t, step=None):
+    result = core.compile_schedule(text, step).next_after(t)
+    return None if result is None else datetime.datetime.fromtimestamp(result)
+
+
+@pytest.mark.parametrize("text, start, expected", [
+    ("0 9 * * 1-5", at(1, 8, 59), (1, 9, 0)),
+    ("0 9 * * 1-5", at(1, 9, 0), (2, 9, 0)), # 不含起点本身
+    ("0 9 * * 1-5", at(5, 10), (8, 9, 0)), # 周五之后跳过周末
+    ("*/20 9-17 * * mon-fri", at(1, 9, 5), (1, 9, 20)),
+    ("*/20 9-17 * * mon-fri", at(5, 17, 50), (8, 9, 0)),
+    ("30 12 15 * *", at(1, 0), (15, 12, 30)),
+])
+def test_cron_rule(text, start, expected):
+    assert isinstance(core.compile_schedule(text), core.CronRule)
+    assert next_after(text, start) == datetime.datetime(2026, 6, *expected)
+
+
+def test_cron_rule_that_never_matches():
+    assert core.compile_schedule("0 0 31 2 *").next_after(at(1, 0)) is None
+
+
+@pytest.mark.parametrize("text, start, expected", [
+    ("工作日 09:00,14:30", at(1, 10), (1, 14, 30)),
+    ("工作日 09:00,14:30", at(1, 14, 30), (2, 9, 0)),
+    ("工作日 09:00,14:30", at(5, 15), (8, 9, 0)),
+    ("周末 10:00", at(1, 10), (6, 10, 0)),
+    ("12:00", at(7, 12, 1), (8, 12, 0)),
+])
+def test_times_rule(text, start, expected):
+    assert isinstance(core.compile_schedule(text), core.TimesRule)
+    assert next_after(text, start) == datetime.datetime(2026, 6, *expected)
+
+
+@pytest.mark.parametrize("text, start, expected", [
+    ("工作日 09:00-18:00", at(1, 8), (1, 9, 0)),
+    ("工作日 09:00-18:00", at(1, 9, 10), (1, 9, 30)),
+    ("工作日 09:00-18:00", at(1, 17, 30), (2, 9, 0)), # 结束时刻不算在时段内
+    ("工作日 09:00-18:00", at(5, 17, 45), (8, 9, 0)),
+    ("fri-mon 22:00-02:00", at(6, 1, 0), (6, 1, 30)), # 周五晚上开始、跨过午夜的时段
+    ("fri-mon 22:00-02:00", at(6, 1, 30), (6, 22, 0)),
+    ("fri-mon 22:00-02:00", at(9, 3, 0), (12, 22, 0)),
+])
+def test_window_rule(text, start, expected):
+    assert isinstance(core.compile_schedule(text, 1800), core.WindowRule)
+    assert next_after(text, start, step=1800) == datetime.datetime(2026, 6, *expected)
+
+
+@pytest.mark.parametrize("text", ["", "工作日", "0 9 * *", "bogus 09:00", "09:00-09:00"])
+def test_invalid_rules(text):
+    with pytest.raises(ValueError):
+        core.compile_schedule(text, 1800)
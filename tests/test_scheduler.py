@@ -0,0 +1,182 @@
+import json
+import queue
+import time
+
+import pytest
+
+import core
+from conftest import wait_for
+
+
+def task(task_id="1", interval=1, **extra):
+    return dict({"id": task_id, "title": f"任务{task_id}", "content": "时间到了", "interval": interval}, **extra)
+
+
+def tick(scheduler, clock):
+    """模拟调度线程的一次唤醒"""
+    scheduler.sync_clocks()
+    return scheduler.fire_due(clock.monotonic())
+
+
+def test_idle_scheduler_does_not_wake_up():
+    scheduler = core.TaskScheduler(queue.Queue(), dispatcher=core.NotificationDispatcher(core.MemoryNotifier()))
+    scheduler.start()
+    time.sleep(0.3)
+    assert scheduler.stats["wakeups"] == 0
+    scheduler.upsert_task(task(interval=60))
+    assert wait_for(lambda: scheduler.stats["command"] == 1)
+    time.sleep(0.2)
+    assert scheduler.stats["wakeups"] == 1
+    assert scheduler.stats["idle"] == 0
+    scheduler.stop()
+
+
+def test_query_is_answered_while_waiting_for_the_next_due_time():
+    scheduler = core.TaskScheduler(queue.Queue(), dispatcher=core.NotificationDispatcher(core.MemoryNotifier()))
+    scheduler.start()
+    scheduler.upsert_task(task(interval=60))
+    future = scheduler.next_due()
+    [(due, record)] = future.result(timeout=1) # 调度线程正在等 60 秒后的任务，指令立即唤醒它
+    assert record.id == "1" and due > time.time() + 55
+    scheduler.stop()
+
+
+@pytest.mark.parametrize("policy, fired, note", [
+    ("once", 1, None),
+    ("skip", 0, None),
+    ("coalesce", 1, "错过了 3 次"),
+])
+def test_restart_catch_up_from_state_log(make_scheduler, clock, data_dir, policy, fired, note):
+    path = data_dir / "state.log"
+    # 上次触发在 3 分钟前，间隔 1 分钟：关闭期间错过 3 次
+    path.write_text(json.dumps({"id": "1", "t": clock.wall - 180}) + "\n", encoding="utf-8")
+    scheduler, sent = make_scheduler([task()], catch_up=policy, state_log=core.SchedulerStateLog(str(path)))
+    assert tick(scheduler, clock) == fired
+    if note:
+        assert note in sent.sent[0]["content"]
+    clock.advance(60)
+    assert tick(scheduler, clock) == 1
+
+
+def test_state_log_ignores_torn_last_line(data_dir):
+    path = data_dir / "state.log"
+    path.write_text(json.dumps({"id": "1", "t": 100.0}) + "\n" + '{"id": "2", "t": 2', encoding="utf-8")
+    log = core.SchedulerStateLog(str(path))
+    assert log.load() == {"1": 100.0}
+    # 重写为干净的日志，之后的追加不会接在半行后面
+    assert path.read_text(encoding="utf-8").endswith("\n")
+    assert core.SchedulerStateLog(str(path)).load() == {"1": 100.0}
+
+
+def test_interval_keeps_phase_when_woken_late(make_scheduler, clock):
+    scheduler, sent = make_scheduler([task()])
+    clock.advance(59.75)
+    assert tick(scheduler, clock) == 0
+    clock.advance(0.5) # 晚醒了 0.25 秒
+    assert tick(scheduler, clock) == 1
+    clock.advance(59.5) # 下一次仍在第 120 秒，而不是 120.25 秒
+    assert tick(scheduler, clock) == 0
+    clock.advance(0.25)
+    assert tick(scheduler, clock) == 1
+    assert len(sent.sent) == 2
+
+
+def test_backward_clock_jump_does_not_refire(make_scheduler, clock):
+    scheduler, sent = make_scheduler([task()])
+    clock.advance(60)
+    assert tick(scheduler, clock) == 1
+    clock.jump(-3600)
+    assert tick(scheduler, clock) == 0
+    clock.advance(59)
+    assert tick(scheduler, clock) == 0
+    clock.advance(1)
+    assert tick(scheduler, clock) == 1
+    assert scheduler.stats["clock_jumps"] == 1
+    assert len(sent.sent) == 2
+
+
+def test_forward_clock_jump_does_not_burst(make_scheduler, clock):
+    scheduler, sent = make_scheduler([task()])
+    clock.jump(3600)
+    assert tick(scheduler, clock) == 0
+    clock.advance(60)
+    assert tick(scheduler, clock) == 1
+    assert scheduler.stats["clock_jumps"] == 1
+
+
+@pytest.mark.parametrize("policy, fired, note", [
+    ("once", 1, None),
+    ("skip", 0, None),
+    ("coalesce", 1, "错过了 10 次"),
+])
+def test_suspend_catch_up(make_scheduler, clock, policy, fired, note):
+    scheduler, sent = make_scheduler([task()], catch_up=policy)
+    clock.advance(630) # 休眠 10 分半，错过 10 次
+    assert tick(scheduler, clock) == fired
+    assert scheduler.stats["catch_ups"] == 1
+    if note:
+        assert note in sent.sent[0]["content"]
+    elif fired:
+        assert sent.sent[0]["content"] == "时间到了"
+    # 补发之后不会连续触发
+    assert tick(scheduler, clock) == 0
+
+
+def test_suspend_once_restarts_the_interval(make_scheduler, clock):
+    scheduler, _ = make_scheduler([task()], catch_up="once")
+    clock.advance(630)
+    tick(scheduler, clock)
+    clock.advance(59.75)
+    assert tick(scheduler, clock) == 0
+    clock.advance(0.25)
+    assert tick(scheduler, clock) == 1
+
+
+def test_suspend_skip_and_coalesce_keep_the_phase(make_scheduler, clock):
+    for policy in ("skip", "coalesce"):
+        start = clock.mono
+        scheduler, _ = make_scheduler([task()], catch_up=policy)
+        clock.advance(630)
+        tick(scheduler, clock)
+        clock.mono = start + 659.9
+        assert tick(scheduler, clock) == 0
+        clock.mono = start + 660
+        assert tick(scheduler, clock) == 1
+
+
+def test_resume_from_suspend_is_noticed_within_max_wait(make_scheduler, clock, monkeypatch):
+    # 休眠期间等待超时不计时：单调时钟（包含休眠时间）已经越过到期时间，线程仍在等待
+    monkeypatch.setattr(core.TaskScheduler, "MAX_WAIT", 0.05)
+    scheduler, sent = make_scheduler([task(interval=60)])
+    scheduler.task_queue = queue.Queue()
+    scheduler.start()
+    assert wait_for(lambda: scheduler.stats["wakeups"] >= 1) # 已经进入下一次等待
+    clock.advance(2 * 3600)
+    assert wait_for(lambda: sent.sent)
+    assert scheduler.stats["catch_ups"] == 1
+    scheduler.stop()
+
+
+def test_coalesce_window_groups_and_keeps_content(make_scheduler, clock):
+    scheduler, sent = make_scheduler([task("1"), task("2", content="喝水")], coalesce_window=2.0)
+    clock.advance(60)
+    assert tick(scheduler, clock) == 2
+    assert len(sent.sent) == 1
+    assert "喝水" in sent.sent[0]["content"]
+
+
+def test_coalescing_is_off_by_default(make_scheduler, clock):
+    scheduler, sent = make_scheduler([task("1"), task("2")])
+    clock.advance(60)
+    assert tick(scheduler, clock) == 2
+    assert len(sent.sent) == 2 and scheduler.stats["coalesced"] == 0
+
+
+def test_stagger_spreads_first_fires_deterministically(make_scheduler, clock):
+    tasks = [task(str(i), interval=10) for i in range(20)]
+    scheduler, _ = make_scheduler(tasks, stagger=300)
+    dues = {task_id: due for due, task_id in scheduler.schedule.smallest(20)}
+    assert len(set(dues.values())) == 20
+    assert all(clock.mono + 600 <= due < clock.mono + 900 for due in dues.values())
+    again, _ = make_scheduler(tasks, stagger=300)
+    assert {task_id: due for due, task_id in again.schedule.smallest(20)} == dues
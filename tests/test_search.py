@@ -0,0 +1,80 @@
+import random
+import re
+
+import pytest
+
+import core
+
+CJK = "喝水休息站起来活动眼睛远眺开会周报吃药拉伸深呼吸整理桌面回复邮件"
+WORDS = ["drink", "water", "stand", "stretch", "standup", "meeting", "report", "email", "walk", "v2", "Ｄｒｉｎｋ", "REVIEW"]
+QUERIES = ["喝", "喝水", "水喝", "深呼吸", "活动眼睛", "d", "dri", "drink", "STAND", "ｗａｔｅｒ", "v",
+           "喝 dr", "眼睛 st", "re wa", "不存在", "zzz", "喝水 walk report"]
+
+
+def make_tasks(n, seed=1):
+    rng = random.Random(seed)
+    def text():
+        parts = ["".join(rng.choice(CJK) for _ in range(rng.randint(1, 5))) for _ in range(rng.randint(0, 2))]
+        parts += rng.sample(WORDS, rng.randint(0, 3))
+        rng.shuffle(parts)
+        return " ".join(parts)
+    return [{"id": str(i), "title": text() or "x", "content": text(), "interval": 30} for i in range(n)]
+
+
+def brute_force(tasks, query):
+    """逐个任务直接比对：中文按子串，英文按单词前缀"""
+    terms = core.normalize_text(query).split()
+    result = set()
+    for task in tasks:
+        text = core.normalize_text(f"{task['title']}\n{task['content']}")
+        words = re.findall(r"[a-z0-9]+", text)
+        if all(term in text if "一" <= term[0] <= "鿿" else any(w.startswith(term) for w in words)
+               for term in terms):
+            result.add(task["id"])
+    return result
+
+
+@pytest.fixture
+def tasks():
+    return make_tasks(2000)
+
+
+def test_search_matches_brute_force(tasks):
+    index = core.TaskSearchIndex()
+    index.build(tasks)
+    for query in QUERIES:
+        assert index.search(query) == brute_force(tasks, query), query
+        for task in tasks[:50]:
+            assert index.matches(task["id"], query) == (task["id"] in brute_force([task], query)), query
+
+
+def test_empty_query_does_not_filter(tasks):
+    index = core.TaskSearchIndex()
+    index.build(tasks)
+    assert index.search("") is None
+    assert index.search("  ，。 ") is None
+
+
+def test_incremental_updates_match_rebuild(tasks):
+    rng = random.Random(2)
+    index = core.TaskSearchIndex()
+    index.build(tasks[:1000])
+    current = {t["id"]: t for t in tasks[:1000]}
+    replacements = make_tasks(300, seed=3)
+    for task in tasks[1000:1500]:
+        index.add(task)
+        current[task["id"]] = task
+    for task_id in rng.sample(sorted(current), 200):
+        index.remove(task_id)
+        del current[task_id]
+    for task_id, replacement in zip(rng.sample(sorted(current), 300), replacements):
+        task = dict(replacement, id=task_id)
+        index.add(task)
+        current[task_id] = task
+
+    rebuilt = core.TaskSearchIndex()
+    rebuilt.build(current.values())
+    assert len(index) == len(current)
+    assert index.sorted_words == rebuilt.sorted_words
+    for query in QUERIES:
+        assert index.search(query) == rebuilt.search(query) == brute_force(current.values(), query), query
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+import core
+
+
+def task(i, **extra):
+    return dict({"id": str(i), "title": f"任务{i}", "content": "时间到了", "interval": 30}, **extra)
+
+
+def test_apply_returns_a_new_snapshot_and_leaves_the_old_one_alone():
+    old = core.TaskSnapshot.build([task(i) for i in range(5)], version=3)
+    records, index = old.records, dict(old.index)
+    new = old.apply(upserts=[core.TaskRecord.compile(task(2, title="改过")), core.TaskRecord.compile(task(9))],
+                    removes=["0", "missing"])
+
+    assert old.records is records and old.index == index and old.version == 3
+    assert [r.title for r in old] == [f"任务{i}" for i in range(5)]
+    assert new.version == 4
+    assert [r.id for r in new] == ["1", "2", "3", "4", "9"]
+    assert new.get("2").title == "改过" and "0" not in new
+    assert {r.id: i for i, r in enumerate(new.records)} == new.index
+    # 未修改的记录在新旧快照之间共享，不复制
+    assert new.get("3") is old.get("3")
+
+
+def test_records_are_immutable_and_round_trip():
+    raw = task(1, schedule="工作日 09:00", color="red")
+    record = core.TaskRecord.compile(raw)
+    assert record.to_dict() == raw and record == raw
+    assert record.seconds == 1800 and isinstance(record.rule, core.TimesRule)
+    assert dict(record)["color"] == "red"
+    with pytest.raises(AttributeError):
+        record.note = "x" # __slots__ 固定字段，不能添加新属性
+    assert core.TaskRecord.compile(record) is record
+    assert core.TaskRecord.compile(task(2, interval="abc")).seconds is None
+
+
+def test_readers_never_see_a_half_applied_batch(engine):
+    engine.apply_batch([task(i) for i in range(100)])
+    stop = threading.Event()
+    seen = []
+
+    def read():
+        while not stop.is_set():
+            snapshot = engine.tasks
+            titles = {r.title for r in snapshot}
+            seen.append((snapshot.version, len(snapshot), len(titles)))
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for n in range(20):
+        engine.apply_batch([task(i, title=f"第{n}批") for i in range(100)])
+    stop.set()
+    reader.join()
+    # 第一批之后的每个快照里，100 个任务的标题都来自同一批次
+    assert seen and all(count == 100 and titles == 1 for version, count, titles in seen if version > 1)
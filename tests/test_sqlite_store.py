@@ -0,0 +1,83 @@
+import json
+import sqlite3
+
+import core
+from conftest import wait_for
+
+
+def task(task_id, interval=30, **extra):
+    return dict({"id": task_id, "title": f"任务{task_id}", "content": "时间到了", "interval": interval}, **extra)
+
+
+def test_upsert_delete_and_next_due(data_dir):
+    store = core.SqliteTaskStore(str(data_dir / "tasks.db"))
+    for i in range(5):
+        store.upsert(task(str(i)))
+    store.upsert(task("2", title="改过"))
+    assert [t["id"] for t in store.all_tasks()] == ["0", "1", "2", "3", "4"] # 修改不改变顺序
+    assert store.get("2")["title"] == "改过"
+
+    for i, t in enumerate([500.0, 100.0, 300.0, 200.0]):
+        store.record(str(i), t - 30, t)
+    store.record("4", 50.0, None) # 不会再触发
+    store.delete("1")
+    assert store.count() == 4 and store.get("1") is None
+    assert [(due, t["id"]) for due, t in store.next_due(2)] == [(200.0, "3"), (300.0, "2")]
+    assert "1" not in store.load() # 删除任务同时删除调度状态
+    store.forget("4")
+    assert set(store.load()) == {"0", "2", "3"}
+
+
+def test_failed_batch_is_rolled_back(data_dir):
+    store = core.SqliteTaskStore(str(data_dir / "tasks.db"))
+    store.upsert(task("1"))
+    try:
+        store.apply([{"op": "delete", "id": "1"}, {"op": "upsert", "task": {"title": "没有 id"}}])
+    except KeyError:
+        pass
+    assert store.get("1") is not None
+
+
+def test_migrates_tasks_and_fire_state_from_json(data_dir):
+    (data_dir / "config.json").write_text(json.dumps({"storage": "sqlite", "theme": "dark", "tasks": [
+        task("1"), task("2", interval="abc"), task("3", interval=5)
+    ]}), encoding="utf-8")
+    (data_dir / "scheduler_state.log").write_text(
+        "\n".join(json.dumps({"id": i, "t": 1000.0}) for i in ("1", "2", "3")) + "\n", encoding="utf-8")
+
+    data = core.ConfigManager.load()
+
+    assert [t["id"] for t in data["tasks"]] == ["1", "2", "3"]
+    saved = json.loads((data_dir / "config.json").read_text(encoding="utf-8"))
+    assert saved == {"storage": "sqlite", "theme": "dark", "tasks": []}
+    assert not (data_dir / "scheduler_state.log").exists()
+    assert (data_dir / "scheduler_state.log.migrated").exists()
+    # 间隔无效的任务跳过调度状态，不中断迁移
+    assert core.ConfigManager.store.load() == {"1": 1000.0, "3": 1000.0}
+    assert [(due, t["id"]) for due, t in core.ConfigManager.store.next_due()] == [(1300.0, "3"), (2800.0, "1")]
+    assert core.ConfigManager.open_state_log() is core.ConfigManager.store
+
+
+def test_save_worker_retries_a_failed_write(data_dir, monkeypatch):
+    (data_dir / "config.json").write_text(json.dumps({"storage": "sqlite", "tasks": []}), encoding="utf-8")
+    data = core.ConfigManager.load()
+    store = core.ConfigManager.store
+    real_apply = store.apply
+    failures = []
+
+    def flaky_apply(entries):
+        if not failures:
+            failures.append(entries)
+            raise sqlite3.OperationalError("database is locked")
+        real_apply(entries)
+
+    monkeypatch.setattr(store, "apply", flaky_apply)
+    saver = core.SaveWorker(debounce=0.01, retry_delay=0.05)
+    saver.start()
+    saver.submit_upsert(data, task("1", title="旧"))
+    assert wait_for(lambda: failures)
+    assert saver.pending_writes == 1 # 第一次写入失败，编辑放回队列而不是丢掉
+    saver.submit_upsert(data, task("1", title="新"))
+    assert saver.flush()
+    assert store.get("1")["title"] == "新"
+    saver.stop()
@@ -0,0 +1,100 @@
+import csv
+import json
+
+import pytest
+
+import core
+
+
+def write_jsonl(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(row if isinstance(row, str) else json.dumps(row, ensure_ascii=False))
+            f.write("\n")
+
+
+def test_jsonl_import_report(data_dir):
+    path = data_dir / "tasks.jsonl"
+    write_jsonl(path, [
+        {"title": "喝水", "content": "起来喝水", "interval": 30},
+        "not json",
+        "",
+        [1, 2],
+        {"title": "", "content": "没有标题", "interval": 5},
+        {"title": "t", "content": "c", "interval": 0},
+        {"title": "t", "content": "c", "interval": "abc"},
+        {"title": "t", "content": "c", "interval": 5, "schedule": "bogus 09:00"},
+        {"id": "fixed", "title": "旧", "content": "c", "interval": 5, "schedule": "工作日 09:00"},
+        {"id": "fixed", "title": "新", "content": "c", "interval": 5},
+    ])
+    records, report = core.TaskTransfer.read(str(path))
+
+    assert report["rows"] == 9 # 空行不计
+    assert report["invalid"] == 6
+    assert report["imported"] == 2
+    assert [e.split(":")[0] for e in report["errors"]] == [f"第 {n} 行" for n in (2, 4, 5, 6, 7, 8)]
+    by_id = {r.id: r for r in records}
+    assert by_id["fixed"].title == "新" # 同一 id 以最后一行为准
+    assert "导入 2 个任务（共 9 行，6 行不合法已跳过）" in core.TaskTransfer.summarize(report)
+
+
+def test_csv_import_report(data_dir):
+    path = data_dir / "tasks.csv"
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["title", "content", "interval", "schedule", "note"])
+        writer.writerow(["喝水", "起来喝水", "30", "", "忽略的列"])
+        writer.writerow(["开会", "周会", "10", "0 10 * * mon", ""])
+        writer.writerow(["缺内容", "", "10", "", ""])
+        writer.writerow(["短行"])
+    records, report = core.TaskTransfer.read(str(path))
+
+    assert report["imported"] == 2
+    assert report["invalid"] == 2
+    assert [e.split(":")[0] for e in report["errors"]] == ["第 4 行", "第 5 行"]
+    assert [r.schedule for r in records] == [None, "0 10 * * mon"]
+
+
+def test_report_lists_a_bounded_number_of_errors(data_dir):
+    path = data_dir / "bad.jsonl"
+    write_jsonl(path, ["{"] * 50)
+    _, report = core.TaskTransfer.read(str(path))
+    assert report["invalid"] == 50
+    assert len(report["errors"]) == core.TaskTransfer.MAX_REPORTED_ERRORS
+    assert "另有 30 行错误未列出" in core.TaskTransfer.summarize(report)
+
+
+def test_csv_missing_columns_and_unknown_format(data_dir):
+    path = data_dir / "bad.csv"
+    path.write_text("title,content\na,b\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="interval"):
+        core.TaskTransfer.read(str(path))
+    with pytest.raises(ValueError):
+        core.TaskTransfer.read(str(data_dir / "tasks.txt"))
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_export_then_import_round_trip(data_dir, fmt):
+    tasks = [
+        {"id": "1", "title": "喝水", "content": "起来, 喝\"水\"", "interval": 30.0},
+        {"id": "2", "title": "开会", "content": "周会\n带电脑", "interval": 10.0, "schedule": "工作日 09:00"},
+    ]
+    path = str(data_dir / f"out.{fmt}")
+    assert core.TaskTransfer.write(core.TaskSnapshot.build(tasks), path) == 2
+    records, report = core.TaskTransfer.read(path)
+    assert report["invalid"] == 0
+    assert [r.to_dict() for r in records] == tasks
+
+
+def test_offline_import_writes_one_batch(data_dir):
+    (data_dir / "config.json").write_text(json.dumps({"tasks": [
+        {"id": "1", "title": "旧", "content": "c", "interval": 5}
+    ]}), encoding="utf-8")
+    path = data_dir / "in.jsonl"
+    write_jsonl(path, [{"title": f"任务{i}", "content": "c", "interval": 5} for i in range(20)] + ["{"])
+    reply = core.run_transfer("import", str(path))
+    assert (reply["imported"], reply["invalid"], reply["tasks"]) == (20, 1, 21)
+    journal = (data_dir / "config.journal").read_text(encoding="utf-8").splitlines()
+    assert len(journal) == 1 and json.loads(journal[0])["op"] == "batch"
+    tasks = core.ConfigManager.load()["tasks"]
+    assert len({t["id"] for t in tasks}) == 21